@@ -12,4 +12,5 @@ setup(
     download_url='https://github.com/twdb/tbtools/archive/0.2.tar.gz',
     keywords=['TxBLEND'],
     classifiers=[],
+    entry_points={'console_scripts': ['tbtools=tbtools.__main__:main']},
     )
@@ -6,6 +6,19 @@
     files for the Texas Water Development Board's TxBLEND model.
 '''
 
-from . import read, write, ptrac
+import importlib
+from . import read, write, ptrac, proj, stats, compare, skill, tidal, flux, shared, preflight
+
+#modules pulling in scipy, pyarrow, matplotlib, asyncio or http.server are
+#imported on first use (tbt.spatial, tbt.store, tbt.render, ...)
+_LAZY = ['store', 'spatial', 'interp', 'zones', 'aio', 'serve', 'render']
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return importlib.import_module('.' + name, __name__)
+    if name == 'dataset':
+        return importlib.import_module('.store', __name__).dataset
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
 
 __version__ = '0.6.3'
\ No newline at end of file
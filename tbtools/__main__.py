@@ -0,0 +1,45 @@
+''' Command line entry points: tbtools serve ROOT, tbtools preflight ROOT '''
+
+import sys
+import json
+import argparse
+from . import serve, preflight
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='tbtools')
+    sub = parser.add_subparsers(dest='command')
+    p = sub.add_parser('serve', help='serve node/date-range queries against run directories')
+    p.add_argument('root', help='directory holding one TxBLEND run directory per run')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8750)
+    p.add_argument('--cache-mb', type=float, default=1024,
+                   help='memory limit of the cache of decoded series (MB)')
+    p.add_argument('--full', action='store_true',
+                   help='decode and serve float64 instead of float32')
+    p = sub.add_parser('preflight', help='check the input files of many run directories')
+    p.add_argument('paths', nargs='+', help='run directories, or one directory of runs')
+    p.add_argument('--workers', type=int, default=None)
+    p.add_argument('--out', default=None, help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        print('Serving {} on http://{}:{}'.format(args.root, args.host, args.port))
+        serve.serve(args.root, args.host, args.port, args.cache_mb, not args.full)
+    elif args.command == 'preflight':
+        paths = args.paths[0] if len(args.paths) == 1 else args.paths
+        try:
+            reports = preflight.batch(paths, workers=args.workers)
+        except (ValueError, IOError) as e:
+            print('tbtools preflight: {}'.format(e), file=sys.stderr)
+            return 2
+        out = open(args.out, 'w') if args.out else sys.stdout
+        json.dump(reports, out, indent=1)
+        if args.out:
+            out.close()
+        return 0 if all(r['ok'] for r in reports) else 1
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
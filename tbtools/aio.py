@@ -0,0 +1,127 @@
+''' Asyncio counterparts of the main TxBLEND output readers '''
+
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from . import read
+
+#parsing runs on this bounded executor (see set_workers)
+WORKERS = min(4, os.cpu_count() or 1)
+_executor = None
+
+#in-flight parses: key -> [future, number of waiting requests]
+_inflight = {}
+
+
+def set_workers(workers):
+    '''
+    Set the number of parses that may run at once (default is
+    min(4, number of CPUs)); parses already running are not affected
+    '''
+    global _executor, WORKERS
+    old = _executor
+    WORKERS = workers
+    _executor = None
+    if old is not None:
+        old.shutdown(wait=False)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(WORKERS, thread_name_prefix='tbtools-aio')
+    return _executor
+
+
+def _done(key, fut):
+    if _inflight.get(key, [None])[0] is fut:
+        del _inflight[key]
+    if not fut.cancelled():
+        #mark the exception retrieved in case every request gave up
+        fut.exception()
+
+
+async def _parse(func, fil, *args, timeout=None):
+    '''
+    Run func(fil, *args) on the executor, joining a parse of the same file
+    with the same arguments that is already in flight
+    '''
+    loop = asyncio.get_running_loop()
+    key = (id(loop), func.__name__, os.path.abspath(fil)) + args
+    entry = _inflight.get(key)
+    if entry is None or entry[0].done():
+        #a finished or cancelled parse is not joined, start a new one
+        fut = loop.run_in_executor(_get_executor(), functools.partial(func, fil, *args))
+        entry = _inflight[key] = [fut, 0]
+        fut.add_done_callback(functools.partial(_done, key))
+    fut = entry[0]
+    entry[1] += 1
+    try:
+        #shield so one request timing out or being cancelled does not cancel
+        #the parse the other requests are waiting on
+        return await asyncio.wait_for(asyncio.shield(fut), timeout)
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and not fut.done():
+            #nobody is waiting anymore: forget the parse right away so a
+            #request arriving before _done runs starts a new one, and drop it
+            #if it has not started
+            if _inflight.get(key) is entry:
+                del _inflight[key]
+            fut.cancel()
+
+
+async def outflw1(path='', compact=False, timeout=None):
+    '''
+    Asyncio version of read.outflw1
+
+    Concurrent requests for the same run share one parse, and the result is
+    shared between them (copy it before modifying it)
+
+    Parameters
+    ----------
+    path : string
+        path to the directory where TxBLEND was run
+    compact : bool
+        if True, values are returned as float32 instead of float64
+    timeout : float
+        seconds to wait before raising asyncio.TimeoutError (default is no limit)
+
+    Example
+    -------
+    import tbtools as tbt
+
+    out = await tbt.aio.outflw1(path, timeout=30)
+
+    Returns
+    -------
+    outflw1 : dictionary
+        see read.outflw1
+    '''
+    return await _parse(read.outflw1, path, compact, timeout=timeout)
+
+
+async def outflw2(path, compact=False, timeout=None):
+    '''Asyncio version of read.outflw2 (see outflw1 for timeout and sharing)'''
+    return await _parse(read.outflw2, path, compact, timeout=timeout)
+
+
+async def vel(fil, compact=False, timeout=None):
+    '''Asyncio version of read.vel (see outflw1 for timeout and sharing)'''
+    return await _parse(read.vel, fil, compact, timeout=timeout)
+
+
+async def avesalD(fil, compact=False, timeout=None):
+    '''Asyncio version of read.avesalD (see outflw1 for timeout and sharing)'''
+    return await _parse(read.avesalD, fil, compact, timeout=timeout)
+
+
+async def coords(fil, zone_number=14, out_type='ll', compact=False, timeout=None):
+    '''Asyncio version of read.coords (see outflw1 for timeout and sharing)'''
+    return await _parse(read.coords, fil, zone_number, out_type, compact, timeout=timeout)
+
+
+async def start_end(path, timeout=None):
+    '''Asyncio version of read.start_end (see outflw1 for timeout and sharing)'''
+    return await _parse(read.start_end, path, timeout=timeout)
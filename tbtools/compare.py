@@ -0,0 +1,101 @@
+''' Streaming run-to-run comparison of daily mesh node outputs '''
+
+import numpy as np
+import pandas as pd
+from itertools import zip_longest
+from . import read
+
+STATS = ['max', 'min', 'mean', 'absmean']
+
+
+def _stream(src):
+    '''Daily blocks of a file, or the current speed of a (velx, vely) pair'''
+    if isinstance(src, (tuple, list)):
+        return read._speed(src[0], src[1])
+    return read.blocks(src)
+
+
+def diff(base, scenario, out=None, dtype=np.float32):
+    '''
+    Node-wise difference (scenario - base) of two runs' daily outputs, read
+    block by block in lockstep so neither run is loaded whole
+
+    Parameters
+    ----------
+    base : string or tuple
+        avesalD.w, velx or vely file of the baseline run
+        *a (velx, vely) tuple compares the current speed
+    scenario : string or tuple
+        the same file of the scenario run
+    out : string
+        if given, the full difference field is written to this raw binary
+        file and returned as a read-only memory map of shape (days x nodes)
+    dtype : dtype
+        dtype of the difference field written to out
+
+    Example
+    -------
+    import tbtools as tbt
+
+    d = tbt.compare.diff('base/avesalD.w', 'scen/avesalD.w', out='dsal.dat')
+    d['node']['absmean']      # summary map
+    d['daily']['max']         # daily series
+    d['field'][100]           # difference on day 101
+
+    Returns
+    -------
+    diff : dictionary
+        'node' - DataFrame, index is node number, columns max/min/mean/absmean
+        'daily' - DataFrame, index is datetime, columns max/min/mean/absmean
+        'field' - numpy memmap of the differences (None if out is not given)
+    '''
+    fout = open(out, 'wb') if out is not None else None
+    dates = []
+    daily = []
+    count = total = abstotal = dmax = dmin = None
+    try:
+        for a, b in zip_longest(_stream(base), _stream(scenario)):
+            if a is None or b is None:
+                raise ValueError('Runs have a different number of days')
+            if a[0] != b[0]:
+                raise ValueError('Run dates do not line up: {} {}'.format(a[0], b[0]))
+            if len(a[1]) != len(b[1]):
+                raise ValueError('Runs have a different number of nodes')
+            d = b[1] - a[1]
+            if count is None:
+                count = np.zeros(len(d), dtype=np.int64)
+                total = np.zeros(len(d))
+                abstotal = np.zeros(len(d))
+                dmax = np.full(len(d), np.nan)
+                dmin = np.full(len(d), np.nan)
+            ok = ~np.isnan(d)
+            dz = np.where(ok, d, 0.)
+            count += ok
+            total += dz
+            abstotal += np.abs(dz)
+            dmax = np.fmax(dmax, d)
+            dmin = np.fmin(dmin, d)
+            n = ok.sum()
+            if n:
+                daily.append([d[ok].max(), d[ok].min(), dz.sum() / n, np.abs(dz).sum() / n])
+            else:
+                daily.append([np.nan] * 4)
+            dates.append(a[0])
+            if fout is not None:
+                fout.write(d.astype(dtype).tobytes())
+    finally:
+        if fout is not None:
+            fout.close()
+    if count is None:
+        raise ValueError('No daily blocks to compare')
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        node = pd.DataFrame({'max': dmax, 'min': dmin, 'mean': total / count,
+                             'absmean': abstotal / count},
+                            index=pd.Index(np.arange(1, len(count) + 1), name='node'),
+                            columns=STATS)
+    daily = pd.DataFrame(daily, index=pd.DatetimeIndex(dates, name='Date'), columns=STATS)
+    field = None
+    if out is not None:
+        field = np.memmap(out, dtype=dtype, mode='r', shape=(len(dates), len(count)))
+    return {'node': node, 'daily': daily, 'field': field}
@@ -0,0 +1,142 @@
+''' Pass flux accounting on outflw2 flows '''
+
+import numpy as np
+import pandas as pd
+from . import read, tidal
+
+SUMMARY = ['net_flow', 'flood_volume', 'ebb_volume', 'net_volume', 'gross_volume',
+           'flood_fraction']
+
+
+def _runs(flows):
+    '''
+    Stack a single outflw2 frame or a dictionary of run -> outflw2 frame
+    into one frame with (run, pass) columns
+    '''
+    if isinstance(flows, dict):
+        return pd.concat(flows, axis=1, names=['run', 'pass'])
+    return flows
+
+
+def load(paths, compact=False):
+    '''
+    Read the outflw2 files of many runs
+
+    Parameters
+    ----------
+    paths : dictionary or list
+        run name -> run directory, or a list of run directories (named by
+        their directory name)
+    compact : bool
+        if True, flows are returned as float32 instead of float64
+
+    Returns
+    -------
+    flows : dictionary
+        run name -> outflw2 DataFrame (see read.outflw2)
+    '''
+    if not isinstance(paths, dict):
+        paths = dict((p.rstrip('/\\').replace('\\', '/').split('/')[-1], p) for p in paths)
+    return dict((run, read.outflw2(paths[run], compact)) for run in paths)
+
+
+def _seconds(index):
+    return tidal._step_hours(index) * 3600.
+
+
+def net_flow(flows, method='godin', **kwargs):
+    '''
+    Tidally averaged (low-passed) net flow through every pass
+
+    Parameters
+    ----------
+    flows : DataFrame or dictionary
+        read.outflw2 frame, or run -> read.outflw2 frame
+    method : string
+        'godin' or 'lanczos' (keyword arguments are passed to the filter)
+
+    Returns
+    -------
+    net : DataFrame
+        index is datetime
+        columns are passes ((run, pass) for a dictionary of runs)
+    '''
+    return tidal.separate(_runs(flows), method, **kwargs)['subtidal']
+
+
+def cumulative(flows):
+    '''
+    Cumulative volume through every pass (flow x time step, e.g. ft3 for cfs)
+
+    Returns
+    -------
+    volume : DataFrame
+        index is datetime
+        columns are passes ((run, pass) for a dictionary of runs)
+    '''
+    df = _runs(flows)
+    dt = _seconds(df.index)
+    return pd.DataFrame(np.nancumsum(df.values * dt, axis=0), index=df.index,
+                        columns=df.columns)
+
+
+def partition(flows, freq=None, sign=1):
+    '''
+    Flood/ebb partitioning of the volume exchanged through every pass,
+    computed for all passes (and runs) at once
+
+    Parameters
+    ----------
+    flows : DataFrame or dictionary
+        read.outflw2 frame, or run -> read.outflw2 frame
+    freq : string
+        if given, summarize every period of this pandas period frequency
+        (e.g. 'D', 'M', 'Y', as in read.outflw2 agg) instead of the whole record
+    sign : int
+        1 if positive flow is flood (into the bay), -1 if it is ebb
+
+    Example
+    -------
+    import tbtools as tbt
+
+    flows = tbt.flux.load({'base': base_path, 'slr': slr_path})
+    tbt.flux.partition(flows)
+    tbt.flux.partition(flows, freq='M')['net_volume']
+    tbt.flux.partition(flows, freq='Y')
+
+    Returns
+    -------
+    summary : DataFrame
+        for the whole record: index is pass ((run, pass) for many runs),
+        columns are net_flow (mean flow, positive is flood), flood_volume,
+        ebb_volume, net_volume (flood - ebb), gross_volume and flood_fraction
+        for periods: index is the period start, columns are (statistic, pass)
+    '''
+    df = _runs(flows)
+    dt = _seconds(df.index)
+    q = df.values.astype(np.float64) * sign
+    flood = np.where(q > 0, q, 0.) * dt
+    ebb = np.where(q < 0, -q, 0.) * dt
+    ok = (~np.isnan(q)).astype(np.float64)
+    if freq is None:
+        n = ok.sum(axis=0)
+        stats = {'net_flow': np.nansum(q, axis=0) / n,
+                 'flood_volume': flood.sum(axis=0),
+                 'ebb_volume': ebb.sum(axis=0)}
+        out = pd.DataFrame(stats, index=df.columns)
+    else:
+        starts = pd.PeriodIndex(df.index, freq=freq).to_timestamp()
+        starts.name = 'Date'
+        frames = {}
+        for name, values in [('q', np.where(np.isnan(q), 0., q)), ('n', ok),
+                             ('flood_volume', flood), ('ebb_volume', ebb)]:
+            frames[name] = pd.DataFrame(values, index=df.index, columns=df.columns).groupby(starts).sum()
+        out = {'net_flow': frames['q'] / frames['n'],
+               'flood_volume': frames['flood_volume'],
+               'ebb_volume': frames['ebb_volume']}
+    out['net_volume'] = out['flood_volume'] - out['ebb_volume']
+    out['gross_volume'] = out['flood_volume'] + out['ebb_volume']
+    out['flood_fraction'] = out['flood_volume'] / out['gross_volume']
+    if freq is None:
+        return out[SUMMARY]
+    return pd.concat(dict((k, out[k]) for k in SUMMARY), axis=1, keys=SUMMARY)
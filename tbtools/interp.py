@@ -0,0 +1,318 @@
+''' Barycentric interpolation of mesh node fields onto points and regular grids '''
+
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+from . import read
+
+try:
+    from scipy import sparse
+    from scipy.spatial import cKDTree
+except ImportError:
+    sparse = None
+
+#number of nearest element centroids searched first for the element holding
+#a point
+CANDIDATES = 8
+
+#points searched at once among all the elements that could hold them
+SEARCH_CHUNK = 10000
+
+
+def _check_scipy():
+    if sparse is None:
+        raise ImportError('scipy is required for mesh interpolation')
+
+
+def mesh(fil):
+    '''
+    Read the node coordinates (UTM) and element connectivity of the mesh in
+    TxBLEND input file
+
+    Returns
+    -------
+    xy : array
+        (nodes x 2) easting/northing of the nodes
+    tri : array
+        (elements x 3) zero based node positions of the element corners
+    '''
+    coords = read.coords(fil, out_type='utm')
+    elems = read.elements(fil)
+    nodes = coords.index.values
+    xy = coords[['easting', 'northing']].values
+    tri = np.searchsorted(nodes, elems[['n1', 'n2', 'n3']].values)
+    return xy, tri
+
+
+def _lambdas(corners, elems, px, py):
+    '''Barycentric coordinates (... x 3) of the points in the elements'''
+    c = corners[elems]
+    x1, y1 = c[..., 0, 0], c[..., 0, 1]
+    x2, y2 = c[..., 1, 0], c[..., 1, 1]
+    x3, y3 = c[..., 2, 0], c[..., 2, 1]
+    dx = px - x3
+    dy = py - y3
+    det = (y2 - y3) * (x1 - x3) + (x3 - x2) * (y1 - y3)
+    l1 = ((y2 - y3) * dx + (x3 - x2) * dy) / det
+    l2 = ((y3 - y1) * dx + (x1 - x3) * dy) / det
+    return np.stack([l1, l2, 1 - l1 - l2], axis=-1)
+
+
+def barycentric(xy, tri, x, y, candidates=CANDIDATES):
+    '''
+    Locate the elements holding the points (x, y) and compute the barycentric
+    weights of their corner nodes
+
+    The candidates nearest element centroids are tested first. Points not
+    found among them (e.g. in a large element next to fine ones) are tested
+    against every element whose centroid is close enough to hold them
+
+    Parameters
+    ----------
+    xy : array
+        (nodes x 2) node coordinates
+    tri : array
+        (elements x 3) zero based node positions of the element corners
+    x, y : arrays
+        point coordinates (same projection as xy)
+    candidates : int
+        number of nearest element centroids tested first for each point
+
+    Returns
+    -------
+    weights : scipy.sparse.csr_matrix
+        (points x nodes) interpolation weights
+    inside : array
+        True for the points inside the mesh
+    '''
+    _check_scipy()
+    px = np.ravel(np.asarray(x, dtype=np.float64))
+    py = np.ravel(np.asarray(y, dtype=np.float64))
+    corners = xy[tri]
+    centroids = corners.mean(axis=1)
+    tree = cKDTree(centroids)
+    k = min(candidates, len(tri))
+    cand = tree.query(np.column_stack([px, py]), k=k)[1].reshape(len(px), k)
+    lam = _lambdas(corners, cand, px[:, None], py[:, None])
+    ok = (lam >= -1e-9).all(axis=-1)
+    inside = ok.any(axis=1)
+    first = ok.argmax(axis=1)
+    elem = np.where(inside, cand[np.arange(len(px)), first], -1)
+    lam = lam[np.arange(len(px)), first]
+
+    #an element holding a point has its centroid within its own circumradius
+    #(at most reach) of the point
+    rest = np.flatnonzero(~inside)
+    reach = np.sqrt(((corners - centroids[:, None]) ** 2).sum(axis=2)).max()
+    for i in range(0, len(rest), SEARCH_CHUNK):
+        pts = rest[i:i + SEARCH_CHUNK]
+        near = tree.query_ball_point(np.column_stack([px[pts], py[pts]]), reach)
+        pi = np.repeat(pts, [len(n) for n in near])
+        ei = np.concatenate([np.asarray(n, dtype=np.int64) for n in near] + [np.zeros(0, np.int64)])
+        l = _lambdas(corners, ei, px[pi], py[pi])
+        hit = np.flatnonzero((l >= -1e-9).all(axis=-1))
+        found, j = np.unique(pi[hit], return_index=True)
+        elem[found] = ei[hit[j]]
+        lam[found] = l[hit[j]]
+        inside[found] = True
+
+    rows = np.nonzero(inside)[0]
+    cols = tri[elem[rows]]
+    weights = sparse.csr_matrix((lam[rows].ravel(), (np.repeat(rows, 3), cols.ravel())),
+                                shape=(len(px), len(xy)))
+    return weights, inside
+
+
+class Interpolator(object):
+    '''
+    Precomputed (points x nodes) sparse interpolation operator
+
+    Applying it to a daily node field is a single sparse mat-vec, and to a
+    (days x nodes) frame a single sparse mat-mat. Points outside the mesh
+    are NaN.
+
+    Parameters
+    ----------
+    weights : scipy.sparse matrix
+        (points x nodes) interpolation weights
+    inside : array
+        True for the points inside the mesh
+    shape : tuple
+        shape of the output points (e.g. (ny, nx) for a grid)
+    '''
+    def __init__(self, weights, inside, shape=None):
+        self.weights = weights.tocsr()
+        self.inside = np.asarray(inside, dtype=bool)
+        self.shape = (len(self.inside),) if shape is None else tuple(shape)
+
+    def __call__(self, data):
+        '''
+        Interpolate node values
+
+        Parameters
+        ----------
+        data : array, Series or DataFrame
+            node values, a single day (nodes) or many days (days x nodes),
+            e.g. the DataFrame returned by read.avesalD
+
+        Returns
+        -------
+        values : array or DataFrame
+            (points) or (days x points), reshaped to the interpolator shape;
+            a DataFrame indexed like data for many days of point values
+        '''
+        index = data.index if isinstance(data, pd.DataFrame) else None
+        values = np.asarray(data)
+        if values.ndim == 1:
+            out = self.weights.dot(values)
+        else:
+            out = self.weights.dot(values.T).T
+        out = np.asarray(out, dtype=np.float64)
+        out[..., ~self.inside] = np.nan
+        if index is not None and len(self.shape) == 1:
+            return pd.DataFrame(out, index=index)
+        return out.reshape(values.shape[:-1] + self.shape)
+
+    def blocks(self, fil, days=1):
+        '''
+        Interpolate the daily blocks of a velx, vely or avesalD.w file as they
+        are read
+
+        Parameters
+        ----------
+        fil : string
+            File path
+        days : int
+            number of days interpolated at once (one sparse mat-mat)
+
+        Returns
+        -------
+        blocks : generator
+            yields (dates, values) with values of shape (days,) + shape
+        '''
+        dates = []
+        batch = []
+        for date, values in read.blocks(fil):
+            dates.append(date)
+            batch.append(values)
+            if len(batch) == days:
+                yield dates, self(np.vstack(batch))
+                dates = []
+                batch = []
+        if batch:
+            yield dates, self(np.vstack(batch))
+
+    def save(self, fil, key=''):
+        '''Save the operator to fil (npz)'''
+        w = self.weights
+        #written through a handle so np.savez does not append .npz to fil
+        with open(fil, 'wb') as f:
+            np.savez(f, data=w.data, indices=w.indices, indptr=w.indptr,
+                     nodes=w.shape[1], inside=self.inside, shape=np.array(self.shape),
+                     key=np.array(key))
+
+
+def load(fil, key=None):
+    '''
+    Load an Interpolator saved with Interpolator.save, returns None if it was
+    saved with a different key
+    '''
+    _check_scipy()
+    saved = np.load(fil)
+    if key is not None and str(saved['key']) != key:
+        return None
+    inside = saved['inside']
+    weights = sparse.csr_matrix((saved['data'], saved['indices'], saved['indptr']),
+                                shape=(len(inside), int(saved['nodes'])))
+    return Interpolator(weights, inside, tuple(saved['shape']))
+
+
+def _key(fil, x, y, shape):
+    h = hashlib.sha1()
+    h.update(repr(read._file_key(fil)[1:] + (shape,)).encode())
+    h.update(np.ascontiguousarray(x, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(y, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def _build(fil, x, y, shape, cache):
+    key = _key(fil, x, y, shape)
+    if cache is not None and os.path.exists(cache):
+        interp = load(cache, key)
+        if interp is not None:
+            return interp
+    xy, tri = mesh(fil)
+    weights, inside = barycentric(xy, tri, x, y)
+    interp = Interpolator(weights, inside, shape)
+    if cache is not None:
+        interp.save(cache, key)
+    return interp
+
+
+def points(fil, x, y, cache=None):
+    '''
+    Build the interpolator of mesh node fields onto arbitrary points
+
+    Parameters
+    ----------
+    fil : string
+        File path to TxBLEND input file
+    x, y : arrays
+        UTM easting/northing of the points (same units as read.coords 'utm')
+    cache : string
+        npz file the operator is saved to and reused from (rebuilt when the
+        input file or the points change)
+
+    Example
+    -------
+    import tbtools as tbt
+
+    interp = tbt.interp.points(fil, x, y, cache='stations.npz')
+    sal = interp(tbt.read.avesalD(path_to_avesalD))
+
+    Returns
+    -------
+    interp : tbtools.interp.Interpolator
+    '''
+    x = np.ravel(np.asarray(x, dtype=np.float64))
+    y = np.ravel(np.asarray(y, dtype=np.float64))
+    return _build(fil, x, y, (len(x),), cache)
+
+
+def grid(fil, xmin, xmax, ymin, ymax, dx, dy=None, cache=None):
+    '''
+    Build the interpolator of mesh node fields onto a regular grid
+
+    Parameters
+    ----------
+    fil : string
+        File path to TxBLEND input file
+    xmin, xmax, ymin, ymax : float
+        UTM extent of the grid (cell centers, inclusive)
+    dx, dy : float
+        grid spacing (dy defaults to dx)
+    cache : string
+        npz file the operator is saved to and reused from
+
+    Example
+    -------
+    import tbtools as tbt
+
+    interp, gx, gy = tbt.interp.grid(fil, 600000, 700000, 3000000, 3100000, 100)
+    for dates, sal in interp.blocks(path_to_avesalD, days=30):
+        ...
+
+    Returns
+    -------
+    interp : tbtools.interp.Interpolator
+        outputs have shape (ny, nx) (row 0 is ymin)
+    gx, gy : arrays
+        x and y coordinates of the grid columns and rows
+    '''
+    if dy is None:
+        dy = dx
+    gx = np.arange(xmin, xmax + dx / 2., dx)
+    gy = np.arange(ymin, ymax + dy / 2., dy)
+    x, y = np.meshgrid(gx, gy)
+    return _build(fil, x.ravel(), y.ravel(), (len(gy), len(gx)), cache), gx, gy
@@ -0,0 +1,332 @@
+''' One-pass preflight checks of TxBLEND input directories '''
+
+import os
+import glob
+import calendar
+import datetime as dt
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from . import read
+
+#input files checked in every run directory (glob patterns, compressed
+#variants are found too)
+FILES = {'tide': ['tide*'], 'gensal': ['gensal*'],
+         'inflow': ['inflow*'], 'precip': ['precip*']}
+
+#issues listed per file (the rest are only counted)
+MAX_ISSUES = 20
+
+#tide/gensal rows: %3i%3i, 12 x %6.2f, %6i, label
+ROW_WIDTH = 84
+DOTS = np.arange(6 + 3, 6 + 12 * 6, 6)
+
+
+def _lines(fil):
+    '''Lines of fil (or its compressed variant) as bytes, read in one go'''
+    f = read._open_binary(fil)
+    data = f.read()
+    f.close()
+    return data.splitlines()
+
+
+def _ints(b):
+    '''
+    Parse right-aligned integer fields of a (rows x width) uint8 array,
+    returning the values and whether each field is a valid integer
+    '''
+    digit = (b >= 48) & (b <= 57)
+    space = b == 32
+    lead = np.cumsum(digit, axis=1) == 0
+    ok = np.all(digit | (space & lead), axis=1) & digit.any(axis=1)
+    weights = 10 ** np.arange(b.shape[1] - 1, -1, -1, dtype=np.int64)
+    return (np.where(digit, b - 48, 0).astype(np.int64) * weights).sum(axis=1), ok
+
+
+class _Issues(object):
+    '''Issues of one file, keeping the first MAX_ISSUES of them'''
+
+    def __init__(self):
+        self.count = 0
+        self.items = []
+
+    def add(self, check, line, message):
+        self.count += 1
+        if len(self.items) < MAX_ISSUES:
+            self.items.append({'check': check, 'line': int(line), 'message': message})
+
+
+def _bihourly(fil, issues):
+    '''Check a tide or gensal file: fixed-width rows of 12 values, one per day'''
+    lines = _lines(fil)
+    keep = [i for i, ln in enumerate(lines) if ln.strip() and ln[:1] != b'#']
+    if not keep:
+        issues.add('empty', 0, 'no data rows')
+        return None, None
+    rows = np.array([lines[i][:ROW_WIDTH + 1].ljust(ROW_WIDTH + 1) for i in keep],
+                    dtype='S{}'.format(ROW_WIDTH + 1))
+    b = np.frombuffer(rows.tobytes(), dtype=np.uint8).reshape(len(rows), ROW_WIDTH + 1)
+    line = np.array(keep) + 1
+    #an overflowed %6.2f field is wider than 6 characters (or filled with
+    #asterisks) and shifts the decimal points of the fields after it
+    bad = np.any(b[:, DOTS] != ord('.'), axis=1) | np.any(b[:, :ROW_WIDTH] == ord('*'), axis=1) \
+        | (b[:, ROW_WIDTH] != ord(' '))
+    month, ok_m = _ints(b[:, 0:3])
+    day, ok_d = _ints(b[:, 3:6])
+    year, ok_y = _ints(b[:, 78:84])
+    bad |= ~(ok_m & ok_d & ok_y)
+    for i in np.flatnonzero(bad):
+        issues.add('overflow', line[i], 'row is not 12 values of 6 characters between the date fields')
+    good = ~bad & (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+    for i in np.flatnonzero(~bad & ~good):
+        issues.add('date', line[i], 'invalid date')
+    line = line[good]
+    months = ((year[good] - 1970) * 12 + month[good] - 1).astype('datetime64[M]')
+    dates = months.astype('datetime64[D]') + (day[good] - 1).astype('timedelta64[D]')
+    #days that do not exist in their month roll over into the next one
+    wrong = dates.astype('datetime64[M]') != months
+    for i in np.flatnonzero(wrong):
+        issues.add('date', line[i], 'invalid date')
+    dates = dates[~wrong]
+    line = line[~wrong]
+    if len(dates) == 0:
+        return None, None
+    step = np.diff(dates).astype(np.int64)
+    for i in np.flatnonzero(step != 1):
+        if step[i] > 1:
+            issues.add('gap', line[i + 1], '{} days missing before {}'.format(step[i] - 1, dates[i + 1]))
+        else:
+            issues.add('order', line[i + 1], '{} follows {}'.format(dates[i + 1], dates[i]))
+    return dates[0], dates[-1]
+
+
+def _monthly(fil, issues, kind):
+    '''
+    Check an inflow or precip file: a "year, month, ..." header per month
+    followed by numbered lines of daily values (line 3 ends the month)
+    '''
+    months = []
+    values = 0
+    header = None
+    for n, ln in enumerate(_lines(fil), 1):
+        if not ln.strip() or ln[:1] in [b'#', b'*']:
+            continue
+        fields = ln.split(b',')
+        if len(fields) == 3:
+            try:
+                header = (int(fields[0]), int(fields[1]), n)
+            except ValueError:
+                issues.add('header', n, 'month header is not "year, month, ..."')
+                header = None
+            values = 0
+            continue
+        if header is None:
+            issues.add('header', n, 'values before a month header')
+            continue
+        if b'*' in ln:
+            issues.add('overflow', n, 'field filled with asterisks')
+        if kind == 'inflow':
+            body = ln[13:].rstrip()
+            if len(body) % 6:
+                issues.add('overflow', n, 'values are not 6 characters wide')
+            tokens = [body[i:i + 6] for i in range(0, len(body), 6)]
+        else:
+            tokens = ln.split()[3:]
+        for tok in tokens:
+            try:
+                float(tok)
+                values += 1
+            except ValueError:
+                if tok.strip():
+                    issues.add('overflow', n, 'unreadable value {!r}'.format(tok.decode(errors='replace')))
+        if ln[12:13] == b'3':
+            year, month, line = header
+            if not 1 <= month <= 12:
+                issues.add('date', line, 'invalid month {}'.format(month))
+            else:
+                days = calendar.monthrange(year, month)[1]
+                if values != days:
+                    issues.add('days', line, '{}-{:02d} has {} values for {} days'.format(year, month, values, days))
+                months.append((year, month, line))
+            header = None
+    if not months:
+        issues.add('empty', 0, 'no complete months')
+        return None, None
+    ordinal = np.array([y * 12 + m - 1 for y, m, l in months])
+    step = np.diff(ordinal)
+    for i in np.flatnonzero(step != 1):
+        y, m, l = months[i + 1]
+        if step[i] > 1:
+            issues.add('gap', l, '{} months missing before {}-{:02d}'.format(step[i] - 1, y, m))
+        else:
+            issues.add('order', l, '{}-{:02d} follows {}-{:02d}'.format(y, m, *months[i][:2]))
+    first = np.datetime64('{}-{:02d}-01'.format(*months[0][:2]), 'D')
+    y, m = months[-1][:2]
+    last = np.datetime64('{}-{:02d}-{:02d}'.format(y, m, calendar.monthrange(y, m)[1]), 'D')
+    return first, last
+
+
+def window(path):
+    '''
+    Simulation window of a run directory: the starting (and ending) date of
+    simulation lines of input, or the output file if input has no end date
+
+    Returns
+    -------
+    start, end : datetime64[D] (None if unknown)
+    '''
+    dates = {}
+    fil = os.path.join(path, 'input')
+    if read._exists(fil):
+        f = read._open(fil)
+        for ln in f:
+            for which in ['starting', 'ending']:
+                if '{} date of simulation'.format(which) in ln and which not in dates:
+                    s = ln.replace(' ', '').split(',')
+                    try:
+                        dates[which] = np.datetime64(dt.date(int(s[2][:4]), int(s[0]), int(s[1])), 'D')
+                    except (ValueError, IndexError):
+                        pass
+        f.close()
+    if 'ending' not in dates and read._exists(os.path.join(path, 'output')):
+        start, end = read.start_end(path)
+        dates.setdefault('starting', np.datetime64(start.date(), 'D'))
+        dates['ending'] = np.datetime64(end.date(), 'D')
+    return dates.get('starting'), dates.get('ending')
+
+
+def _files(path, files):
+    found = []
+    for kind, patterns in files.items():
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        names = []
+        for pattern in patterns:
+            for fil in sorted(glob.glob(os.path.join(path, pattern))):
+                if os.path.isfile(fil) and read._base(fil) not in names:
+                    names.append(read._base(fil))
+        found += [(kind, fil) for fil in names]
+    return found
+
+
+def check(path, files=None):
+    '''
+    Check the input files of one run directory, scanning each one once
+
+    tide and gensal files must be rows of 12 bihourly values for every day
+    without gaps, inflow and precip files must have every day of every
+    month and cover the simulation window, and no fixed-width field may have
+    overflowed
+
+    Parameters
+    ----------
+    path : string
+        run directory
+    files : dictionary
+        kind (tide, gensal, inflow, precip) -> glob pattern(s) of the files
+        of that kind (default is FILES)
+
+    Returns
+    -------
+    report : dictionary
+        'path', 'ok', 'start'/'end' (simulation window, ISO dates) and
+        'files' - one entry per file with its kind, first/last date, issue
+        count and issues ({'check', 'line', 'message'})
+    '''
+    files = FILES if files is None else files
+    report = {'path': path, 'ok': True, 'start': None, 'end': None, 'files': []}
+    try:
+        start, end = window(path)
+    except Exception as e:
+        start = end = None
+        report['error'] = 'simulation window: {}'.format(e)
+    report['start'] = None if start is None else str(start)
+    report['end'] = None if end is None else str(end)
+    for kind, fil in _files(path, files):
+        issues = _Issues()
+        try:
+            if kind in ['tide', 'gensal']:
+                first, last = _bihourly(fil, issues)
+            else:
+                first, last = _monthly(fil, issues, kind)
+        except Exception as e:
+            first = last = None
+            issues.add('error', 0, str(e))
+        if first is not None and start is not None and end is not None:
+            if first > start or last < end:
+                issues.add('coverage', 0, '{} to {} does not cover the simulation window {} to {}'.format(
+                    first, last, start, end))
+        elif first is not None and kind in ['inflow', 'precip']:
+            issues.add('coverage', 0, 'simulation window not found in input')
+        report['files'].append({'file': os.path.basename(fil), 'kind': kind,
+                                'start': None if first is None else str(first),
+                                'end': None if last is None else str(last),
+                                'count': issues.count, 'issues': issues.items})
+        if issues.count:
+            report['ok'] = False
+    if 'error' in report:
+        report['ok'] = False
+    return report
+
+
+def batch(paths, files=None, workers=None):
+    '''
+    Check many run directories in parallel
+
+    Parameters
+    ----------
+    paths : list or string
+        run directories, or one run directory (it has an input file), or a
+        directory whose subdirectories are runs
+    files : dictionary
+        kind -> glob pattern(s) of the files to check (see check)
+    workers : int
+        number of processes (default is the number of CPUs, 1 checks serially)
+
+    Example
+    -------
+    import json
+    import tbtools as tbt
+
+    reports = tbt.preflight.batch('/data/scenarios')
+    json.dump(reports, open('preflight.json', 'w'), indent=1)
+    tbt.preflight.issues(reports)
+
+    Returns
+    -------
+    reports : list of dictionaries
+        one report per run directory (see check), JSON serializable
+    '''
+    if isinstance(paths, str) and read._exists(os.path.join(paths, 'input')):
+        paths = [paths]
+    elif isinstance(paths, str):
+        root = paths
+        paths = [os.path.join(root, d) for d in sorted(os.listdir(root))
+                 if os.path.isdir(os.path.join(root, d))]
+        if not paths:
+            raise ValueError('No run directories in {}'.format(root))
+    if not paths:
+        raise ValueError('No run directories given')
+    if workers == 1 or len(paths) < 2:
+        return [check(p, files) for p in paths]
+    with ProcessPoolExecutor(workers) as ex:
+        return list(ex.map(check, paths, [files] * len(paths), chunksize=4))
+
+
+def issues(reports):
+    '''
+    Flatten reports into one table of issues
+
+    Returns
+    -------
+    issues : DataFrame
+        columns are path, file, kind, check, line and message
+    '''
+    rows = []
+    for r in reports:
+        if 'error' in r:
+            rows.append((r['path'], None, None, 'error', 0, r['error']))
+        for f in r['files']:
+            for i in f['issues']:
+                rows.append((r['path'], f['file'], f['kind'], i['check'], i['line'], i['message']))
+    return pd.DataFrame(rows, columns=['path', 'file', 'kind', 'check', 'line', 'message'])
@@ -0,0 +1,205 @@
+''' Vectorized UTM <-> latitude/longitude conversion of node and particle coordinates '''
+
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+#WGS84 ellipsoid and UTM constants (same series expansions as the utm package)
+K0 = 0.9996
+E = 0.00669438
+E2 = E * E
+E3 = E2 * E
+E_P2 = E / (1 - E)
+SQRT_E = np.sqrt(1 - E)
+_E = (1 - SQRT_E) / (1 + SQRT_E)
+_E2 = _E * _E
+_E3 = _E2 * _E
+_E4 = _E3 * _E
+_E5 = _E4 * _E
+M1 = (1 - E / 4 - 3 * E2 / 64 - 5 * E3 / 256)
+M2 = (3 * E / 8 + 3 * E2 / 32 + 45 * E3 / 1024)
+M3 = (15 * E2 / 256 + 45 * E3 / 1024)
+M4 = (35 * E3 / 3072)
+P2 = (3. / 2 * _E - 27. / 32 * _E3 + 269. / 512 * _E5)
+P3 = (21. / 16 * _E2 - 55. / 32 * _E4)
+P4 = (151. / 96 * _E3 - 417. / 128 * _E5)
+P5 = (1097. / 512 * _E4)
+R = 6378137
+
+#points converted per chunk, small enough that the float64 temporaries of a
+#chunk stay in cache
+CHUNK_SIZE = 32768
+
+_transformers = {}
+
+
+def _mod_angle(value):
+    return (value + np.pi) % (2 * np.pi) - np.pi
+
+
+class Transformer(object):
+    '''
+    UTM <-> latitude/longitude converter for one UTM zone
+
+    The zone constants are computed once, arrays are converted in chunks of
+    chunk_size points on a thread pool (NumPy releases the GIL) and written
+    into preallocated output arrays of the requested dtype.
+
+    Parameters
+    ----------
+    zone_number : int
+        UTM zone number (14 for most of the Texas coast, 15 for Galveston/Sabine)
+    zone_letter : string
+        UTM zone letter (letters N and above are the northern hemisphere)
+    workers : int
+        number of threads
+        *default is the concurrent.futures default
+    chunk_size : int
+        number of points converted at a time
+
+    Example
+    -------
+    import tbtools as tbt
+
+    tf = tbt.proj.transformer(14)
+    lat, lon = tf.to_latlon(easting, northing, dtype='float32')
+    easting, northing = tf.to_utm(lat, lon)
+    '''
+    def __init__(self, zone_number=14, zone_letter='R', workers=None, chunk_size=CHUNK_SIZE):
+        self.zone_number = zone_number
+        self.zone_letter = zone_letter.upper()
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.northern = self.zone_letter >= 'N'
+        self.central_lon = np.radians((zone_number - 1) * 6 - 180 + 3)
+        self.false_northing = 0 if self.northern else 10000000
+
+    def _map(self, func, a, b, dtype):
+        a, b = np.broadcast_arrays(np.asarray(a), np.asarray(b))
+        shape = a.shape
+        a = a.ravel()
+        b = b.ravel()
+        out1 = np.empty(a.shape, dtype=dtype)
+        out2 = np.empty(a.shape, dtype=dtype)
+
+        def run(start):
+            stop = start + self.chunk_size
+            func(a[start:stop].astype(np.float64), b[start:stop].astype(np.float64),
+                 out1[start:stop], out2[start:stop])
+
+        starts = range(0, len(a), self.chunk_size)
+        if len(starts) <= 1:
+            for start in starts:
+                run(start)
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                list(pool.map(run, starts))
+        return out1.reshape(shape), out2.reshape(shape)
+
+    def _to_latlon(self, easting, northing, lat_out, lon_out):
+        x = easting - 500000
+        y = northing - self.false_northing
+
+        mu = y / K0 / (R * M1)
+        p_rad = (mu + P2 * np.sin(2 * mu) + P3 * np.sin(4 * mu)
+                 + P4 * np.sin(6 * mu) + P5 * np.sin(8 * mu))
+        p_sin = np.sin(p_rad)
+        p_sin2 = p_sin * p_sin
+        p_cos = np.cos(p_rad)
+        p_tan = p_sin / p_cos
+        p_tan2 = p_tan * p_tan
+        p_tan4 = p_tan2 * p_tan2
+
+        ep_sin = 1 - E * p_sin2
+        n = R / np.sqrt(ep_sin)
+        r = (1 - E) / ep_sin
+        c = E_P2 * p_cos ** 2
+        c2 = c * c
+
+        d = x / (n * K0)
+        d2 = d * d
+        d3 = d2 * d
+        d4 = d3 * d
+        d5 = d4 * d
+        d6 = d5 * d
+
+        lat_out[:] = np.degrees(
+            p_rad - (p_tan / r) * (d2 / 2 - d4 / 24 * (5 + 3 * p_tan2 + 10 * c - 4 * c2 - 9 * E_P2))
+            + d6 / 720 * (61 + 90 * p_tan2 + 298 * c + 45 * p_tan4 - 252 * E_P2 - 3 * c2))
+        lon = (d - d3 / 6 * (1 + 2 * p_tan2 + c)
+               + d5 / 120 * (5 - 2 * c + 28 * p_tan2 - 3 * c2 + 8 * E_P2 + 24 * p_tan4)) / p_cos
+        lon_out[:] = np.degrees(_mod_angle(lon + self.central_lon))
+
+    def _to_utm(self, lat, lon, easting_out, northing_out):
+        lat_rad = np.radians(lat)
+        lat_sin = np.sin(lat_rad)
+        lat_cos = np.cos(lat_rad)
+        lat_tan = lat_sin / lat_cos
+        lat_tan2 = lat_tan * lat_tan
+        lat_tan4 = lat_tan2 * lat_tan2
+
+        n = R / np.sqrt(1 - E * lat_sin ** 2)
+        c = E_P2 * lat_cos ** 2
+
+        a = lat_cos * _mod_angle(np.radians(lon) - self.central_lon)
+        a2 = a * a
+        a3 = a2 * a
+        a4 = a3 * a
+        a5 = a4 * a
+        a6 = a5 * a
+
+        m = R * (M1 * lat_rad - M2 * np.sin(2 * lat_rad)
+                 + M3 * np.sin(4 * lat_rad) - M4 * np.sin(6 * lat_rad))
+
+        easting_out[:] = K0 * n * (a + a3 / 6 * (1 - lat_tan2 + c)
+                                   + a5 / 120 * (5 - 18 * lat_tan2 + lat_tan4 + 72 * c - 58 * E_P2)) + 500000
+        northing_out[:] = K0 * (m + n * lat_tan * (a2 / 2 + a4 / 24 * (5 - lat_tan2 + 9 * c + 4 * c ** 2)
+                                                   + a6 / 720 * (61 - 58 * lat_tan2 + lat_tan4
+                                                                 + 600 * c - 330 * E_P2))) \
+            + self.false_northing
+
+    def to_latlon(self, easting, northing, dtype=np.float64):
+        '''
+        Convert UTM easting/northing arrays to latitude/longitude
+
+        Returns
+        -------
+        lat, lon : arrays (of dtype) in decimal degrees
+        '''
+        return self._map(self._to_latlon, easting, northing, dtype)
+
+    def to_utm(self, lat, lon, dtype=np.float64):
+        '''
+        Convert latitude/longitude arrays to UTM easting/northing in this zone
+
+        Returns
+        -------
+        easting, northing : arrays (of dtype)
+        '''
+        return self._map(self._to_utm, lat, lon, dtype)
+
+
+def transformer(zone_number=14, zone_letter='R'):
+    '''
+    Get the (shared) Transformer of a UTM zone
+
+    Parameters
+    ----------
+    zone_number : int
+        UTM zone number
+    zone_letter : string
+        UTM zone letter
+
+    Example
+    -------
+    import tbtools as tbt
+
+    lat, lon = tbt.proj.transformer(15).to_latlon(easting, northing)
+
+    Returns
+    -------
+    transformer : tbtools.proj.Transformer
+    '''
+    key = (zone_number, zone_letter.upper())
+    if key not in _transformers:
+        _transformers[key] = Transformer(zone_number, zone_letter)
+    return _transformers[key]
@@ -1 +1,9 @@
-from . import read
\ No newline at end of file
+import importlib
+from . import read
+
+
+def __getattr__(name):
+    #the trajectory archive is imported on first use (tbt.ptrac.archive)
+    if name == 'archive':
+        return importlib.import_module('.archive', __name__)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
@@ -0,0 +1,252 @@
+''' Compact archive of particle trajectories '''
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from . import read as pread
+from .. import read, proj
+
+#quantization step of the positions (UTM units, offsets from the mesh origin)
+RESOLUTION = 0.1
+
+#time steps per chunk (delta encoding restarts at every chunk)
+CHUNK = 48
+
+
+def _delta_dtype(d):
+    '''Smallest integer dtype holding the deltas'''
+    lo, hi = (d.min(), d.max()) if d.size else (0, 0)
+    for dtype in [np.int8, np.int16, np.int32]:
+        if np.iinfo(dtype).min <= lo and hi <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def write(path, out, zone_number, resolution=RESOLUTION, chunk=CHUNK):
+    '''
+    Convert the particle files of a ptrac run directory into a compact
+    archive: positions are quantized offsets from the mesh origin,
+    delta-encoded along time and stored in chunks of (particle file x
+    time steps) that are decoded only when they are read
+
+    Parameters
+    ----------
+    path : string
+        ptrac run directory (input, input.Ptrac, particles*.w)
+    out : string
+        archive file (.npz)
+    zone_number : int
+        UTM zone of the mesh
+    resolution : float
+        quantization step of the positions (UTM units)
+    chunk : int
+        time steps per chunk
+
+    Example
+    -------
+    import tbtools as tbt
+
+    tbt.ptrac.archive.write(path, 'release_2010_06.npz', 14)
+
+    Returns
+    -------
+    out : string
+        archive file
+    '''
+    drange = pread.dates(path)
+    xMin, yMin = pread.origin(path, zone_number)
+    with_pnum = pread._with_pnum(path)
+    arrays = {'time': drange.values.astype('datetime64[ns]'),
+              'origin': np.array([xMin, yMin]),
+              'resolution': np.array(resolution),
+              'zone': np.array(zone_number),
+              'chunk': np.array(chunk)}
+    particles = []
+    for block in range(len(pread.FILES)):
+        if not read._exists(os.path.join(path, pread.FILES[block])):
+            break
+        tmp = pread.positions(path, block, with_pnum)
+        x = tmp.pivot(index='date', columns='particle', values='x').reindex(drange)
+        y = tmp.pivot(index='date', columns='particle', values='y').reindex(drange)
+        particles.append(x.columns.values.astype(np.int32))
+        xy = np.stack([x.values, y.values])
+        nan = np.isnan(xy)
+        q = np.round(np.where(nan, 0., xy) / resolution).astype(np.int64)
+        for c, t0 in enumerate(range(0, len(drange), chunk)):
+            part = q[:, t0:t0 + chunk]
+            d = np.diff(part, axis=1)
+            arrays['f{}_{}'.format(block, c)] = part[:, 0].astype(np.int32)
+            arrays['d{}_{}'.format(block, c)] = d.astype(_delta_dtype(d))
+            if nan[:, t0:t0 + chunk].any():
+                arrays['m{}_{}'.format(block, c)] = np.packbits(nan[:, t0:t0 + chunk])
+    #particle numbers of all particle files, file b holds
+    #particles[offsets[b]:offsets[b + 1]] (files may differ in length)
+    arrays['particles'] = np.concatenate(particles) if particles else np.zeros(0, np.int32)
+    arrays['offsets'] = np.cumsum([0] + [len(p) for p in particles]).astype(np.int64)
+    #written through a handle so np.savez_compressed does not append .npz
+    with open(out, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    return out
+
+
+class Trajectories(object):
+    '''
+    Particle trajectory archive written by write, decoded on demand
+
+    Attributes
+    ----------
+    time : DatetimeIndex
+        time steps
+    particles : array
+        particle numbers
+    origin : tuple
+        UTM (xMin, yMin) of the mesh
+    zone_number : int
+        UTM zone of the mesh
+
+    The archive file stays open until close (or the end of a with block)
+    '''
+
+    def __init__(self, fil):
+        self._npz = np.load(fil)
+        self.time = pd.DatetimeIndex(self._npz['time'], name='Date')
+        self.particles = self._npz['particles']
+        self._offsets = self._npz['offsets']
+        self.origin = tuple(self._npz['origin'])
+        self.zone_number = int(self._npz['zone'])
+        self.resolution = float(self._npz['resolution'])
+        self.chunk = int(self._npz['chunk'])
+
+    def close(self):
+        '''Close the archive file'''
+        self._npz.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _decode(self, block, c):
+        '''Offsets (2 x steps x particles) of one chunk'''
+        first = self._npz['f{}_{}'.format(block, c)].astype(np.int64)
+        d = self._npz['d{}_{}'.format(block, c)].astype(np.int64)
+        q = np.concatenate([first[:, None], d], axis=1).cumsum(axis=1)
+        xy = q * self.resolution
+        key = 'm{}_{}'.format(block, c)
+        if key in self._npz.files:
+            mask = np.unpackbits(self._npz[key], count=xy.size).reshape(xy.shape).astype(bool)
+            xy[mask] = np.nan
+        return xy
+
+    def read(self, start=None, end=None, particles=None, out='ll', compact=False):
+        '''
+        Decode the positions of some particles over a time window, touching
+        only the chunks that hold them
+
+        Parameters
+        ----------
+        start, end : string or datetime
+            first and last time step (default is the whole track)
+        particles : list
+            particle numbers (default is all of them)
+        out : string
+            'll' for longitude/latitude, 'utm' for easting/northing,
+            'offset' for offsets from the mesh origin
+        compact : bool
+            if True, values are returned as float32 instead of float64
+            (lon/lat and offsets only, UTM coordinates need float64)
+
+        Example
+        -------
+        import tbtools as tbt
+
+        with tbt.ptrac.archive.load('release_2010_06.npz') as trk:
+            lon, lat = trk.read('2010-06-03', '2010-06-05', particles=range(1, 101))
+
+        Returns
+        -------
+        x, y : DataFrame
+            lon/lat, easting/northing or offsets (as ptrac.read.particles)
+            index is datetime
+            columns are particle numbers
+        '''
+        t0 = 0 if start is None else self.time.searchsorted(pd.Timestamp(start))
+        t1 = len(self.time) if end is None else self.time.searchsorted(pd.Timestamp(end), 'right')
+        if particles is None:
+            particles = self.particles
+        particles = np.asarray(list(particles))
+        where = dict((p, i) for i, p in enumerate(self.particles))
+        try:
+            pos = np.array([where[p] for p in particles], dtype=np.int64)
+        except KeyError as e:
+            raise KeyError('No particle {} in the archive'.format(e))
+        blocks = np.searchsorted(self._offsets, pos, 'right') - 1
+        xy = np.full((2, max(t1 - t0, 0), len(particles)), np.nan)
+        for block in np.unique(blocks):
+            sel = np.flatnonzero(blocks == block)
+            cols = pos[sel] - self._offsets[block]
+            for c in range(t0 // self.chunk, (t1 - 1) // self.chunk + 1 if t1 > t0 else 0):
+                lo = c * self.chunk
+                part = self._decode(block, c)
+                a = max(t0, lo)
+                b = min(t1, lo + part.shape[1])
+                xy[:, a - t0:b - t0, sel] = part[:, a - lo:b - lo][:, :, cols]
+        x, y = xy
+        if out != 'offset':
+            x = x + self.origin[0]
+            y = y + self.origin[1]
+        if out == 'll':
+            lat, lon = proj.transformer(self.zone_number, 'R').to_latlon(
+                x.ravel(), y.ravel(), dtype=read._float(compact))
+            x, y = lon.reshape(x.shape), lat.reshape(y.shape)
+        index = self.time[t0:t1]
+        dtype = np.float64 if out == 'utm' else read._float(compact)
+        return (pd.DataFrame(x.astype(dtype), index=index, columns=particles),
+                pd.DataFrame(y.astype(dtype), index=index, columns=particles))
+
+
+def load(fil):
+    '''Open a particle trajectory archive (see Trajectories)'''
+    return Trajectories(fil)
+
+
+def _write(args):
+    path, out, zone_number, resolution, chunk = args
+    return write(path, out, zone_number, resolution, chunk)
+
+
+def convert(paths, out_dir, zone_number, resolution=RESOLUTION, chunk=CHUNK, workers=None):
+    '''
+    Convert many ptrac run directories into archives in parallel
+
+    Parameters
+    ----------
+    paths : list or string
+        run directories, or a directory whose subdirectories with an
+        input.Ptrac file are runs
+    out_dir : string
+        directory the archives are written to (<run directory name>.npz)
+    zone_number : int
+        UTM zone of the mesh
+    workers : int
+        number of processes (default is the number of CPUs, 1 converts here)
+
+    Returns
+    -------
+    archives : list
+        archive files
+    '''
+    if isinstance(paths, str):
+        root = paths
+        paths = [os.path.join(root, d) for d in sorted(os.listdir(root))
+                 if read._exists(os.path.join(root, d, 'input.Ptrac'))]
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    jobs = [(p, os.path.join(out_dir, os.path.basename(os.path.normpath(p)) + '.npz'),
+             zone_number, resolution, chunk) for p in paths]
+    if workers == 1 or len(jobs) < 2:
+        return [_write(j) for j in jobs]
+    with ProcessPoolExecutor(workers) as ex:
+        return list(ex.map(_write, jobs))
@@ -1,13 +1,12 @@
 import pandas as pd
 import numpy as np
 import os
-import utm
-from datetime import timedelta
-from .. import read
+from datetime import datetime, timedelta
+from .. import read, proj
 
 
 def release(path):
-    fin = open(os.path.join(path, 'input.Ptrac'), 'r')
+    fin = read._open(os.path.join(path, 'input.Ptrac'))
     s = fin.readline()
     while 'release year' not in s:
         s = fin.readline()
@@ -20,60 +19,98 @@ def release(path):
     return yr, mth, day
 
 
-def particles(path, zone_number):
-    yr, mth, day = release(path)
+#particle output files, 100 particles each
+FILES = ['particles1.w', 'particles2.w', 'particles3.w', 'particles4.w',
+         'particles5.w', 'particles6.w', 'particles7.w', 'particles8.w',
+         'particles9.w', 'particles10.w']
+
 
+def origin(path, zone_number):
+    '''UTM origin (xMin, yMin) of the mesh the particle positions are offsets from'''
     coords = read.coords(os.path.join(path, 'input'), zone_number, 'utm')
-    xMin = coords.easting.min()
-    yMin = coords.northing.min()
-    print('xmin = {}\nymin = {}'.format(xMin, yMin))
+    return coords.easting.min(), coords.northing.min()
+
+
+def _with_pnum(path):
+    '''Check if the particle files have a particle number column'''
+    f_test = read._open(os.path.join(path, FILES[0]))
+    with_pnum = len(f_test.readline().split()) != 10
+    f_test.close()
+    return with_pnum
+
+
+def positions(path, block, with_pnum=None):
+    '''
+    Read the positions of one particle file (particles<block + 1>.w)
 
-    fils = ['particles1.w', 'particles2.w', 'particles3.w', 'particles4.w',
-            'particles5.w', 'particles6.w', 'particles7.w', 'particles8.w',
-            'particles9.w', 'particles10.w']
+    Returns
+    -------
+    positions : DataFrame
+        columns are date, particle, x and y (offsets from the mesh origin)
+    '''
+    if with_pnum is None:
+        with_pnum = _with_pnum(path)
+    fil = read._find(os.path.join(path, FILES[block]))
+    #the four date columns are joined and parsed together
+    if with_pnum:
+        tmp = pd.read_csv(fil, sep='\s+', header=None, usecols=[0, 1, 2, 3, 4, 5, 6],
+                          dtype=dict((i, str) for i in range(1, 5)))
+        date, rest = tmp[[1, 2, 3, 4]], tmp[[0, 5, 6]]
+    else:
+        tmp = pd.read_csv(fil, sep='\s+', header=None, usecols=[0, 1, 2, 3, 4, 5],
+                          dtype=dict((i, str) for i in range(0, 4)))
+        date, rest = tmp[[0, 1, 2, 3]], tmp[[4, 5]]
+    cols = list(date.columns)
+    date = pd.to_datetime(date[cols[0]].str.cat([date[c] for c in cols[1:]], sep=' '))
+    tmp = pd.DataFrame({'date': date.values})
+    if with_pnum:
+        tmp['particle'] = rest[0].values
+        tmp['x'] = rest[5].values
+        tmp['y'] = rest[6].values
+    else:
+        tmp['x'] = rest[4].values
+        tmp['y'] = rest[5].values
+        nd = len(tmp['date'].unique())
+        tmp['particle'] = list(np.arange(1, 101) + 100 * block) * nd
+        tmp = tmp[['date', 'particle', 'x', 'y']]
+    return tmp
 
-    start = pd.datetime(yr, mth, day)
+
+def dates(path):
+    '''Half-hourly time steps of the 28 days tracked from the release date'''
+    yr, mth, day = release(path)
+    start = datetime(yr, mth, day)
     end = start + timedelta(days=28)
-    drange = pd.date_range(start, end, freq='30T')
+    return pd.date_range(start, end, freq=pd.Timedelta(minutes=30))
+
+
+def particles(path, zone_number, compact=False):
+    drange = dates(path)
+
+    xMin, yMin = origin(path, zone_number)
+    print('xmin = {}\nymin = {}'.format(xMin, yMin))
 
     cols = np.arange(1, 1001, 1)
 
-    partsLon = pd.DataFrame(0., index=drange, columns=cols)
-    partsLat = pd.DataFrame(0., index=drange, columns=cols)
-    
-    with_pnum = True
-    f_test = open(os.path.join(path, fils[0]), 'r')
-    if len(f_test.readline().split()) == 10:
-        with_pnum = False
-    f_test.close()
+    partsLon = pd.DataFrame(0., index=drange, columns=cols, dtype=read._float(compact))
+    partsLat = pd.DataFrame(0., index=drange, columns=cols, dtype=read._float(compact))
     
-    iter = 0
+    with_pnum = _with_pnum(path)
     
-    for f in fils:
+    for iter, f in enumerate(FILES):
         print('\nReading {}'.format(os.path.join(path, f)))
-        if with_pnum:
-            tmp = pd.read_csv(os.path.join(path, f), delim_whitespace=True,
-                              header=None, parse_dates=[[1, 2, 3, 4]],
-                              usecols=[0, 1, 2, 3, 4, 5, 6])
-            tmp.columns = ['date', 'particle', 'x', 'y']
-        else:
-            tmp = pd.read_csv(os.path.join(path, f), delim_whitespace=True,
-                              header=None, parse_dates=[[0, 1, 2, 3]],
-                              usecols=[0, 1, 2, 3, 4, 5])
-            tmp.columns = ['date', 'x', 'y']
-            nd = len(tmp['date'].unique())
-            tmp['particle'] = list(np.arange(1, 101) + 100 * iter) * nd
+        tmp = positions(path, iter, with_pnum)
         
         print('Converting from UTM to lat/lon')
         x = tmp.x + xMin
         y = tmp.y + yMin
-        lat, lon = utm.to_latlon(x, y, zone_number, 'R')
+        lat, lon = proj.transformer(zone_number, 'R').to_latlon(
+            x.values, y.values, dtype=read._float(compact))
         tmp['lon'] = lon
         tmp['lat'] = lat
         tmpLat = tmp.pivot(index='date', columns='particle', values='lat')
         tmpLon = tmp.pivot(index='date', columns='particle', values='lon')
-        partsLon.ix[tmpLon.index, tmpLon.columns] = tmpLon
-        partsLat.ix[tmpLat.index, tmpLat.columns] = tmpLat
-        iter += 1
+        partsLon.loc[tmpLon.index, tmpLon.columns] = tmpLon
+        partsLat.loc[tmpLat.index, tmpLat.columns] = tmpLat
 
     return partsLon, partsLat
@@ -5,11 +5,242 @@ from io import StringIO
 import re
 import os
 import numpy as np
-import utm
 import sys
 import datetime as dt
+import gzip
+import bz2
+import lzma
+import glob
+from itertools import zip_longest
+from functools import partial, lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from . import proj
 
-def inflow(fil):
+#compressed variants of TxBLEND files that are read transparently
+COMPRESSED = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+#input files (versions and zones) whose converted node coordinates are kept
+COORDS_CACHE_SIZE = 8
+
+#file versions (velx, vely, avesalD.w) whose daily block offsets are kept
+BLOCK_INDEX_CACHE_SIZE = 64
+
+
+def _base(fil):
+    '''Strip a compression extension (.gz, .bz2, .xz) from a file name'''
+    root, ext = os.path.splitext(fil)
+    if ext in COMPRESSED:
+        return root
+    return fil
+
+
+def _find(fil):
+    '''
+    Return fil if it exists, otherwise the first compressed variant of it
+    (fil.gz, fil.bz2, fil.xz) that does
+    '''
+    if os.path.exists(fil):
+        return fil
+    for ext in COMPRESSED:
+        if os.path.exists(fil + ext):
+            return fil + ext
+    raise IOError('No such file (or compressed variant): {}'.format(fil))
+
+
+def _exists(fil):
+    '''Check if fil or a compressed variant of it exists'''
+    try:
+        _find(fil)
+    except IOError:
+        return False
+    return True
+
+
+def _file_key(fil):
+    '''Identify the current version of fil (or its compressed variant)'''
+    fil = _find(fil)
+    st = os.stat(fil)
+    return (os.path.abspath(fil), st.st_mtime, st.st_size)
+
+
+def _open(fil):
+    '''
+    Open fil (or its compressed variant) for reading text. Compressed files
+    are decompressed as a stream while they are read
+    '''
+    fil = _find(fil)
+    ext = os.path.splitext(fil)[1]
+    if ext in COMPRESSED:
+        return COMPRESSED[ext](fil, 'rt')
+    return open(fil)
+
+
+def _open_binary(fil):
+    '''Open fil (or its compressed variant) for reading bytes (seekable)'''
+    fil = _find(fil)
+    ext = os.path.splitext(fil)[1]
+    if ext in COMPRESSED:
+        return COMPRESSED[ext](fil, 'rb')
+    return open(fil, 'rb')
+
+
+def _float(compact):
+    '''float dtype of the values returned by the readers'''
+    if compact:
+        return np.float32
+    return np.float64
+
+
+def _compact(df, compact):
+    '''
+    Downcast the float columns of a DataFrame built from parsed records to
+    float32 and store the station column as a categorical
+    '''
+    if not compact:
+        return df
+    for col in df.columns:
+        if df[col].dtype == np.float64:
+            df[col] = df[col].astype(np.float32)
+    if 'Station' in df.columns:
+        df['Station'] = df['Station'].astype('category')
+    return df
+
+
+def _daily(fil, compact=False):
+    '''
+    Read a file of daily blocks written while running TxBLEND (velx, vely,
+    avesalD.w). Each block is an "Average ..." line followed by the node values
+    '''
+    f = _open(fil)
+    s = StringIO()
+    mergedLine = None
+    init = 0
+    for ln in f:
+        if not ln.strip():
+            continue
+        if ln.split()[0] == 'Average':
+            if init != 0:
+                mergedLine = mergedLine[:-1]
+                mergedLine += '\n'
+                s.write(mergedLine)
+            date = str(dt.datetime(int(ln.split()[4]), int(ln.split()[6]), int(ln.split()[8])))
+            mergedLine = date + ','
+            init = 1
+            continue
+        elif re.search('[a-zA-Z]', ln):
+            continue
+        else:
+            mergedLine += ','.join(ln.split()).replace('\n', '', 1)
+            mergedLine += ','
+            continue
+    f.close()
+    mergedLine = mergedLine[:-1]
+    mergedLine += '\n'
+    s.write(mergedLine)
+    s.seek(0)
+    #parse the node values straight into the requested dtype
+    dtype = dict((i, _float(compact)) for i in range(1, mergedLine.count(',') + 1))
+    daily = pd.read_csv(s, parse_dates=True, index_col=0, header=None, dtype=dtype)
+    if compact:
+        daily.columns = daily.columns.astype(np.int32)
+    daily.index.name = 'Date'
+    return daily
+
+
+def _row_dates(year, month, day):
+    '''datetime64[D] array with the date of each row of a daily-row file'''
+    months = ((np.asarray(year, dtype=np.int64) - 1970) * 12
+              + np.asarray(month, dtype=np.int64) - 1).astype('datetime64[M]')
+    return (months.astype('datetime64[D]')
+            + (np.asarray(day, dtype=np.int64) - 1).astype('timedelta64[D]'))
+
+
+def _wide_index(dates, n):
+    '''
+    DatetimeIndex of the flattened values of daily rows holding n equally
+    spaced values (12 - bihourly, 24 - hourly) starting at hour 0
+    '''
+    hours = (np.arange(n) * (24 // n)).astype('timedelta64[h]')
+    index = (dates.astype('datetime64[h]')[:, None] + hours[None, :]).ravel()
+    return pd.DatetimeIndex(index.astype('datetime64[ns]'), name='date')
+
+
+#statistics available to the agg option of outflw1 and outflw2
+AGG = ['mean', 'max', 'min', 'sum', 'count', 'std']
+
+#hourly rows parsed at a time when aggregating while reading
+AGG_CHUNK = 24 * 366
+
+
+class _Aggregator(object):
+    '''
+    Per-period accumulators (count, sum, sum of squares, min, max) of
+    time-ordered rows of values, so hourly outputs can be reduced to daily or
+    monthly statistics while they are parsed
+
+    Parameters
+    ----------
+    agg : dictionary
+        'freq' - pandas period frequency (e.g. 'D', 'M')
+        'how' - statistic or list of statistics (mean, max, min, sum, count, std)
+    '''
+
+    def __init__(self, agg):
+        self.freq = agg.get('freq', 'D')
+        how = agg.get('how', 'mean')
+        self.how = [how] if isinstance(how, str) else list(how)
+        for h in self.how:
+            if h not in AGG:
+                raise ValueError('Unknown statistic {}, use one of {}'.format(h, AGG))
+        self.periods = []
+        self.acc = []
+
+    def add(self, times, values):
+        if len(times) == 0:
+            return
+        values = np.asarray(values, dtype=np.float64)
+        ordinals = pd.PeriodIndex(pd.DatetimeIndex(times), freq=self.freq).asi8
+        starts = np.r_[0, np.flatnonzero(np.diff(ordinals)) + 1]
+        ok = ~np.isnan(values)
+        v = np.where(ok, values, 0.)
+        count = np.add.reduceat(ok.astype(np.int64), starts)
+        total = np.add.reduceat(v, starts)
+        squares = np.add.reduceat(v * v, starts)
+        vmax = np.fmax.reduceat(values, starts)
+        vmin = np.fmin.reduceat(values, starts)
+        for i, ordinal in enumerate(ordinals[starts]):
+            a = (count[i], total[i], squares[i], vmax[i], vmin[i])
+            if self.periods and self.periods[-1] == ordinal:
+                #the period carried over from the previous chunk
+                b = self.acc[-1]
+                a = (a[0] + b[0], a[1] + b[1], a[2] + b[2], np.fmax(a[3], b[3]), np.fmin(a[4], b[4]))
+                self.acc[-1] = a
+            else:
+                self.periods.append(ordinal)
+                self.acc.append(a)
+
+    def result(self, columns, dtype):
+        '''
+        DataFrame of the statistics, index is the period start, columns are
+        (statistic, column) for many statistics or columns for one
+        '''
+        acc = [np.array(a) for a in zip(*self.acc)] if self.acc else [np.empty((0, len(columns)))] * 5
+        count, total, squares, vmax, vmin = acc
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            stats = {'mean': mean, 'max': vmax, 'min': vmin,
+                     'sum': total, 'count': count,
+                     'std': np.sqrt(np.maximum(squares / count - mean ** 2, 0) * count / (count - 1))}
+        index = pd.DatetimeIndex([pd.Period(ordinal=o, freq=self.freq).start_time
+                                  for o in self.periods], name='Date')
+        frames = dict((h, pd.DataFrame(stats[h] if h == 'count' else stats[h].astype(dtype),
+                                       index=index, columns=columns)) for h in self.how)
+        if len(self.how) == 1:
+            return frames[self.how[0]]
+        return pd.concat([frames[h] for h in self.how], axis=1, keys=self.how)
+
+
+def inflow(fil, compact=False):
     '''
     Read contents of TxBLEND freshwater inflow file
 
@@ -17,6 +248,8 @@ def inflow(fil):
     ----------
     fil : string
         File path
+    compact : bool
+        if True, values are returned as float32 instead of float64
 
     Example
     -------
@@ -29,7 +262,7 @@ def inflow(fil):
     inflow : DataFrame
         Single column DataFrame with datetime index
     '''
-    f = open(fil)
+    f = _open(fil)
     s = StringIO()
     mergedLine = None
     for ln in f:
@@ -51,7 +284,7 @@ def inflow(fil):
 
     s.seek(0)
     cols = ['year', 'month'] + ['{:02d}'.format(i) for i in range(1, 32, 1)]
-    df = pd.read_csv(s, names=cols)
+    df = pd.read_csv(s, names=cols, dtype=dict((c, _float(compact)) for c in cols[2:]))
     inflow = pd.melt(df,
                      id_vars=['year', 'month'],
                      value_vars=df.columns[2:].tolist(),
@@ -66,7 +299,7 @@ def inflow(fil):
     return(inflow)
 
 
-def precip(fil):
+def precip(fil, compact=False):
     '''
     Read contents of TxBLEND precipitation input file
 
@@ -74,6 +307,8 @@ def precip(fil):
     ----------
     fil : string
         File path
+    compact : bool
+        if True, values are returned as float32 instead of float64
 
     Example
     -------
@@ -86,7 +321,7 @@ def precip(fil):
     precip : DataFrame
         Single column DataFrame with datetime index
     '''
-    f = open(fil)
+    f = _open(fil)
     s = StringIO()
     mergedLine = None
     for ln in f:
@@ -105,7 +340,7 @@ def precip(fil):
         s.write(mergedLine)
     s.seek(0)
     cols = ['year', 'month'] + ['{:02d}'.format(i) for i in range(1, 32, 1)]
-    df = pd.read_csv(s, names=cols)
+    df = pd.read_csv(s, names=cols, dtype=dict((c, _float(compact)) for c in cols[2:]))
     precip = pd.melt(df,
                      id_vars=['year', 'month'],
                      value_vars=df.columns[2:].tolist(),
@@ -120,7 +355,7 @@ def precip(fil):
     return(precip)
 
 
-def wind(fil):
+def wind(fil, compact=False):
     '''
     Read contents of TxBLEND wind input file
 
@@ -128,6 +363,8 @@ def wind(fil):
     ----------
     fil : string
         File path
+    compact : bool
+        if True, values are returned as float32 instead of float64
 
     Example
     -------
@@ -142,24 +379,43 @@ def wind(fil):
             Columns:
                 dir - Wind Direction (degrees from north)
                 spd - Wind speed (miles per hour)
+        *if the file has more than one site the columns are (site, dir/spd)
     '''
     cols = ['year', 'month', 'day', 'site', 'var'] + ['{:02d}'.format(i) for i in range(24)]
-    df = pd.read_csv(fil, sep='\s+', names=cols, na_values='-9')
-    wind = pd.melt(df,
-                   id_vars=['year', 'month', 'day', 'site', 'var'],
-                   value_vars=df.columns[5:].tolist(),
-                   var_name='hour')
-    wind['date'] = pd.to_datetime(wind[['year', 'month', 'day', 'hour']], errors='coerce')
-    wind.index = wind['date']
-    wind = (wind.drop(['year', 'month', 'day', 'hour', 'site'], 1)
-            .pivot_table(index=['date'], columns='var', values='value'))
-    wind.columns=['dir', 'spd']
-    wind.dir *= 10
+    df = pd.read_csv(_find(fil), sep='\s+', names=cols, na_values='-9',
+                     dtype=dict((c, _float(compact)) for c in cols[5:]))
+    sites = df['site'].unique()
+    wind = []
+    for site in sites:
+        sdf = df[df['site'] == site]
+        #each day is a direction row followed by a speed row, split them by
+        #row parity (the lower var code is direction)
+        if len(sdf) % 2 != 0:
+            raise ValueError('Site {} in {} has an odd number of rows'.format(site, fil))
+        var = sdf['var'].values
+        if (var[0::2] != var[0]).any() or (var[1::2] != var[1]).any() or var[0] == var[1]:
+            raise ValueError('Site {} in {} does not alternate direction '
+                             'and speed rows'.format(site, fil))
+        values = sdf[cols[5:]].values
+        d, sp = (0, 1) if var[0] < var[1] else (1, 0)
+        index = _wide_index(_row_dates(sdf['year'].values[d::2],
+                                       sdf['month'].values[d::2],
+                                       sdf['day'].values[d::2]), 24)
+        wind.append(pd.DataFrame({'dir': values[d::2].ravel() * 10,
+                                  'spd': values[sp::2].ravel()},
+                                 index=index, columns=['dir', 'spd']))
+    if len(sites) == 1:
+        wind = wind[0]
+    else:
+        wind = pd.concat(wind, axis=1, keys=sites)
+    wind = wind.dropna(how='all')
+    if not wind.index.is_monotonic_increasing:
+        wind.sort_index(inplace=True)
 
     return(wind)
 
 
-def gensal(fil):
+def gensal(fil, compact=False):
     '''
     Read contents of TxBLEND generated salinity input file
 
@@ -167,6 +423,8 @@ def gensal(fil):
     ----------
     fil : string
         File path
+    compact : bool
+        if True, values are returned as float32 instead of float64
 
     Example
     -------
@@ -180,21 +438,18 @@ def gensal(fil):
         Single column DataFrame with datetime index
     '''
     cols = ['month', 'day'] + ['{:02d}'.format(i) for i in range(0, 24, 2)] + ['year', 'label']
-    df = pd.read_csv(fil, sep='\s+', names=cols, comment='#')
-    gensal = pd.melt(df,
-                     id_vars=['year', 'month', 'day'],
-                     value_vars=df.columns[2:14].tolist(),
-                     var_name='hour')
-    gensal['date'] = pd.to_datetime(gensal[['year', 'month', 'day', 'hour']])
-    gensal.index = gensal['date']
-    gensal.drop(['year', 'month', 'day', 'hour', 'date'], 1, inplace=True)
-    gensal.sort_index(inplace=True)
-    gensal.columns=['salinity']
+    df = pd.read_csv(_find(fil), sep='\s+', names=cols, comment='#',
+                     dtype=dict((c, _float(compact)) for c in cols[2:14]))
+    index = _wide_index(_row_dates(df['year'].values, df['month'].values,
+                                   df['day'].values), 12)
+    gensal = pd.DataFrame({'salinity': df[cols[2:14]].values.ravel()}, index=index)
+    if not gensal.index.is_monotonic_increasing:
+        gensal.sort_index(inplace=True)
 
     return(gensal)
 
 
-def tide(fil):
+def tide(fil, compact=False):
     '''
     Read contents of TxBLEND tide input file
 
@@ -202,6 +457,8 @@ def tide(fil):
     ----------
     fil : string
         File Path
+    compact : bool
+        if True, values are returned as float32 instead of float64
 
     Example
     -------
@@ -216,21 +473,18 @@ def tide(fil):
     '''
     cols = ['month', 'day'] + ['{:02d}'.format(i) for i in range(0, 24, 2)] \
         + ['year', 'label']
-    df = pd.read_csv(fil, sep='\s+', names=cols)
-    tide = pd.melt(df,
-                   id_vars=['year', 'month', 'day'],
-                   value_vars=df.columns[2:14].tolist(),
-                   var_name='hour')
-    tide['date'] = pd.to_datetime(tide[['year', 'month', 'day', 'hour']])
-    tide.index = tide['date']
-    tide.drop(['year', 'month', 'day', 'hour', 'date'], 1, inplace=True)
-    tide.sort_index(inplace=True)
-    tide.columns = ['salinity']
+    df = pd.read_csv(_find(fil), sep='\s+', names=cols,
+                     dtype=dict((c, _float(compact)) for c in cols[2:14]))
+    index = _wide_index(_row_dates(df['year'].values, df['month'].values,
+                                   df['day'].values), 12)
+    tide = pd.DataFrame({'salinity': df[cols[2:14]].values.ravel()}, index=index)
+    if not tide.index.is_monotonic_increasing:
+        tide.sort_index(inplace=True)
 
     return tide
 
 
-def pcp(fil):
+def pcp(fil, compact=False):
     '''
     Read the *.pcp files created as an input for TxRR
         These are used to create the TxBLEND precip input files
@@ -240,6 +494,8 @@ def pcp(fil):
     ----------
     fil : string
         File path
+    compact : bool
+        if True, values are returned as float32 instead of float64
 
     Example
     -------
@@ -252,9 +508,20 @@ def pcp(fil):
     pcp : DataFrame
         Single column Dataframe with datetime index
     '''
+    ws, dates, values = _pcp_values(fil, compact)
+    pcp = pd.DataFrame({(ws + '_pcp').strip(): values},
+                       index=pd.DatetimeIndex(dates.astype('datetime64[ns]'), name='Date'))
+    return(pcp)
+
+
+def _pcp_values(fil, compact=False):
+    '''
+    Parse a TxRR *.pcp file into its watershed id and sorted arrays of the
+    (datetime64[D]) dates and values of every day with data
+    '''
     def chunkstring(string, length):
         return (string[0+i:length+i] for i in range(0, len(string), length))
-    f = open(fil)
+    f = _open(fil)
     s = StringIO()
     mergedLine = None
     for ln in f:
@@ -275,24 +542,81 @@ def pcp(fil):
         if ln[0] == '4':
             mergedLine += ','.join(list(chunkstring(ln[1:], 8))[:-2]) + '\n'
         s.write(mergedLine)
+    f.close()
     s.seek(0)
     cols = ['ws', 'year', 'month'] + ['{:02d}'.format(i) for i in range(1,32,1)]
-    df = pd.read_csv(s, names=cols, index_col=None, na_values='-9999.00')
-    pcp = pd.melt(df,
-                  id_vars=['ws', 'year', 'month'],
-                  value_vars=df.columns[3:].tolist(),
-                  var_name='day')
-    pcp.dropna(inplace=True)
-    pcp['date'] = pd.to_datetime(pcp[['year', 'month', 'day']])
-    pcp.index = pcp['date']
-    pcp.drop(['ws', 'year', 'month', 'day', 'date'], 1, inplace=True)
-    pcp.columns = [(ws + '_pcp').strip()]
-    pcp.sort_index(inplace=True)
-    pcp.index.name = 'Date'
+    df = pd.read_csv(s, names=cols, index_col=None, na_values='-9999.00',
+                     dtype=dict((c, _float(compact)) for c in cols[3:]))
+    #every row holds 31 days, drop the days past the end of the month and
+    #the missing values
+    first = _row_dates(df['year'].values, df['month'].values, np.ones(len(df)))
+    dates = first[:, None] + np.arange(31).astype('timedelta64[D]')
+    last = (first.astype('datetime64[M]') + 1).astype('datetime64[D]')
+    values = df[cols[3:]].values
+    keep = (dates < last[:, None]) & ~np.isnan(values)
+    dates = dates[keep]
+    values = values[keep]
+    order = np.argsort(dates, kind='mergesort')
+    return ws, dates[order], values[order]
+
+
+def pcp_many(paths, workers=1, compact=False):
+    '''
+    Read many TxRR *.pcp files (one per watershed) in parallel processes
+    into one DataFrame covering the union of their date ranges
+
+    Parameters
+    ----------
+    paths : string or list
+        list of file paths or a glob pattern (e.g. 'T:/path/to/*.pcp')
+    workers : int
+        number of processes parsing files at the same time
+        *default is 1, the files are parsed here; None is the number of CPUs
+        *with more than one process, scripts must start under
+        if __name__ == '__main__': on Windows (see the example)
+    compact : bool
+        if True, values are returned as float32 instead of float64
+
+    Example
+    -------
+    import tbtools as tbt
+
+    if __name__ == '__main__':
+        pcp = tbt.read.pcp_many('T:/path/to/*.pcp', workers=8)
+
+    Returns
+    -------
+    pcp : DataFrame
+        index is datetime (daily)
+        columns are the watersheds ('<ws>_pcp'), missing days are NaN
+    '''
+    if isinstance(paths, str):
+        paths = sorted(glob.glob(paths))
+    if len(paths) == 0:
+        raise IOError('No pcp files to read')
+    #the line parsing holds the GIL, so files are parsed in processes
+    parse = partial(_pcp_values, compact=compact)
+    if workers == 1 or len(paths) == 1:
+        parsed = [parse(fil) for fil in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(parse, paths))
+    if not any(len(p[1]) for p in parsed):
+        raise IOError('No values in the pcp files')
+    start = min(p[1][0] for p in parsed if len(p[1]))
+    end = max(p[1][-1] for p in parsed if len(p[1]))
+    n = int((end - start) / np.timedelta64(1, 'D')) + 1
+    #fill one preallocated (date x watershed) array by day offsets
+    data = np.full((n, len(parsed)), np.nan, dtype=_float(compact))
+    for i, (ws, dates, values) in enumerate(parsed):
+        data[((dates - start) / np.timedelta64(1, 'D')).astype(np.int64), i] = values
+    index = pd.date_range(pd.Timestamp(start), periods=n, freq='D', name='Date')
+    pcp = pd.DataFrame(data, index=index,
+                       columns=[(p[0] + '_pcp').strip() for p in parsed])
     return(pcp)
 
 
-def vel(fil):
+def vel(fil, compact=False):
     '''
     Read the velx and vely files created while running TxBLEND
 
@@ -300,6 +624,9 @@ def vel(fil):
     ----------
     fil : string
         File path
+    compact : bool
+        if True, values are returned as float32 instead of float64
+        and the node number columns as int32
 
     Example
     -------
@@ -312,38 +639,11 @@ def vel(fil):
     vel : DataFrame
         Single column Dataframe with datetime index
     '''
-    f = open(fil)
-    s = StringIO()
-    mergedLine = None
-    init = 0
-    for ln in f:
-        if not ln.strip():
-            continue
-        if ln.split()[0] == 'Average':
-            if init != 0:
-                mergedLine = mergedLine[:-1]
-                mergedLine += '\n'
-                s.write(mergedLine)
-            date = str(pd.datetime(int(ln.split()[4]), int(ln.split()[6]), int(ln.split()[8])))
-            mergedLine = date + ','
-            init = 1
-            continue
-        elif re.search('[a-zA-Z]', ln):
-            continue
-        else:
-            mergedLine += ','.join(ln.split()).replace('\n', '', 1)
-            mergedLine += ','
-            continue
-    mergedLine = mergedLine[:-1]
-    mergedLine += '\n'
-    s.write(mergedLine)
-    s.seek(0)
-    vel = pd.read_csv(s, parse_dates=True, index_col=0, header=None)
-    vel.index.name = 'Date'
+    vel = _daily(fil, compact)
     return(vel)
 
 
-def avesalD(fil):
+def avesalD(fil, compact=False):
     '''
     Read the average daily salinity file created while running TxBLEND
         ***NOTE: this is for the avesalD.w file (avesal.w is month average salinity)
@@ -352,6 +652,9 @@ def avesalD(fil):
     ----------
     fil : string
         File path
+    compact : bool
+        if True, values are returned as float32 instead of float64
+        and the node number columns as int32
 
     Example
     -------
@@ -364,38 +667,147 @@ def avesalD(fil):
     avesalD : DataFrame
         Single column Dataframe with datetime index
     '''
-    f = open(fil)
-    s = StringIO()
-    mergedLine = None
-    init = 0
+    avesalD = _daily(fil, compact)
+    return(avesalD)
+
+
+def blocks(fil, compact=False):
+    '''
+    Stream the daily blocks of a velx, vely or avesalD.w file one day at a
+    time instead of reading the whole file into a DataFrame
+
+    Parameters
+    ----------
+    fil : string
+        File path
+    compact : bool
+        if True, values are returned as float32 instead of float64
+
+    Example
+    -------
+    import tbtools as tbt
+
+    for date, sal in tbt.read.blocks(fil):
+        print(date, sal.mean())
+
+    Returns
+    -------
+    blocks : generator
+        yields (date, values) for every day
+            date - datetime of the block
+            values - array of the node values (node 1 first)
+    '''
+    f = _open(fil)
+    date = None
+    lines = []
     for ln in f:
         if not ln.strip():
             continue
         if ln.split()[0] == 'Average':
-            if init != 0:
-                mergedLine = mergedLine[:-1]
-                mergedLine += '\n'
-                s.write(mergedLine)
-            date = str(pd.datetime(int(ln.split()[4]), int(ln.split()[6]), int(ln.split()[8])))
-            mergedLine = date + ','
-            init = 1
-            continue
+            if date is not None:
+                yield date, np.array(' '.join(lines).split(), dtype=_float(compact))
+            s = ln.split()
+            date = dt.datetime(int(s[4]), int(s[6]), int(s[8]))
+            lines = []
         elif re.search('[a-zA-Z]', ln):
             continue
         else:
-            mergedLine += ','.join(ln.split()).replace('\n', '', 1)
-            mergedLine += ','
-            continue
-    mergedLine = mergedLine[:-1]
-    mergedLine += '\n'
-    s.write(mergedLine)
-    s.seek(0)
-    avesalD = pd.read_csv(s, parse_dates=True, index_col=0, header=None)
-    avesalD.index.name = 'Date'
-    return(avesalD)
+            lines.append(ln)
+    f.close()
+    if date is not None:
+        yield date, np.array(' '.join(lines).split(), dtype=_float(compact))
 
 
-def outflw1(path=''):
+@lru_cache(maxsize=BLOCK_INDEX_CACHE_SIZE)
+def _block_index(fil, mtime, size):
+    '''
+    Daily block dates and offsets of a file version (path, mtime, size),
+    the BLOCK_INDEX_CACHE_SIZE most recently used are kept
+    '''
+    dates = []
+    offsets = []
+    pos = 0
+    f = _open_binary(fil)
+    for ln in f:
+        s = ln.split()
+        if s and s[0] == b'Average':
+            dates.append('{:04d}-{:02d}-{:02d}'.format(int(s[4]), int(s[6]), int(s[8])))
+            offsets.append(pos)
+        pos += len(ln)
+    f.close()
+    offsets.append(pos)
+    return np.array(dates, dtype='datetime64[D]'), np.array(offsets, dtype=np.int64)
+
+
+def block_index(fil):
+    '''
+    Index the byte offsets of the daily blocks of a velx, vely or avesalD.w
+    file so date ranges can be read without parsing the days before them.
+    Indexes of the BLOCK_INDEX_CACHE_SIZE most recently used file versions
+    are kept in memory, a rewritten file is indexed again
+
+    Parameters
+    ----------
+    fil : string
+        File path
+
+    Returns
+    -------
+    dates : datetime64[D] array
+        date of every block
+    offsets : int64 array
+        byte offset of every block header, followed by the file size
+    '''
+    return _block_index(*_file_key(fil))
+
+
+def read_days(fil, start=None, end=None, compact=False):
+    '''
+    Read the daily blocks of a velx, vely or avesalD.w file between two
+    dates, seeking straight to them with the block index
+
+    Parameters
+    ----------
+    fil : string
+        File path
+    start, end : string or datetime
+        first and last day to read (default is the start/end of the file)
+    compact : bool
+        if True, values are returned as float32 instead of float64
+
+    Example
+    -------
+    import tbtools as tbt
+
+    dates, sal = tbt.read.read_days(fil, '2010-06-01', '2010-08-31')
+
+    Returns
+    -------
+    dates : datetime64[D] array
+        date of every block read
+    values : array
+        (days x nodes) values, node 1 first
+    '''
+    dates, offsets = block_index(fil)
+    i0 = 0 if start is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(start).date(), 'D'))
+    i1 = len(dates) if end is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(end).date(), 'D'), 'right')
+    if i1 <= i0:
+        return dates[i0:i0], np.empty((0, 0), dtype=_float(compact))
+    f = _open_binary(fil)
+    f.seek(offsets[i0])
+    text = f.read(offsets[i1] - offsets[i0])
+    f.close()
+    values = []
+    for block in text.split(b'Average')[1:]:
+        #drop the rest of the header line (and any other text lines)
+        body = block.split(b'\n', 1)[1]
+        if re.search(b'[a-zA-Z]', body):
+            body = b' '.join(ln for ln in body.splitlines() if not re.search(b'[a-zA-Z]', ln))
+        values.append(np.array(body.split(), dtype=_float(compact)))
+    return dates[i0:i1], np.vstack(values)
+
+
+def outflw1(path='', compact=False, agg=None):
     '''
     Read the contents of TxBLEND output file outflw1 (old format - no year)
         outflw1 contains hourly output at check nodes specified in input file
@@ -405,6 +817,13 @@ def outflw1(path=''):
     path : string (or empty string)
         Path to directory containing outflw1 and input files
         *if path is an empty string, will look for files in current working directory
+    compact : bool
+        if True, values are returned as float32 instead of float64
+    agg : dictionary
+        if given, reduce the hourly values to statistics of every period while
+        parsing instead of returning them, e.g. {'freq': 'D', 'how': ['mean', 'max']}
+            freq - pandas period frequency ('D', 'W', 'M', ...)
+            how - statistic or list of statistics (mean, max, min, sum, count, std)
 
     Example
     -------
@@ -426,18 +845,22 @@ def outflw1(path=''):
     2001-01-01 02:00:00 -0.80       0.15   8.15      0.05      46.86      4.75
     ...
 
+    >>> daily = tbt.read.outflw1(path, agg={'freq': 'D', 'how': ['mean', 'max']})
+    >>> daily['10505']['max']['salinity']
 
     Returns
     -------
     outflw1 : Dictionary
         keys are the check nodes
         values are the dataframes for each check node
+        *with agg, the index is the start of every period and the columns are
+         (statistic, variable) for many statistics
     '''
     #get the starting year (old outflw1 format)
     if path == '':
-        fin1 = open('input')
+        fin1 = _open('input')
     else:
-        fin1 = open(os.path.join(path, 'input'))
+        fin1 = _open(os.path.join(path, 'input'))
     s = fin1.readline()
     while 'starting date of simulation' not in s:
         s = fin1.readline()
@@ -445,18 +868,40 @@ def outflw1(path=''):
     year = int(s[2][:4])
     fin1.close()
     #read off 5 lines - don't need them
-    f = open(os.path.join(path,'outflw1'))
+    f = _open(os.path.join(path,'outflw1'))
     for i in range(5):
         next(f)
     #create dictionary for StringIO
     sio = {}
     init = 0
+    names = ['tide', 'elevation', 'depth', 'velocity', 'direction', 'salinity']
+    aggs = {}
+    hours = 0
+
+    def parse(k):
+        sio[k].seek(0)
+        df = pd.read_csv(sio[k], parse_dates=True, index_col=0, names=names,
+                         dtype=dict((n, _float(compact)) for n in names))
+        df.index.name = 'Date'
+        return df
+
+    def flush():
+        #reduce the buffered hours into the accumulators of every node
+        for k in list(sio.keys()):
+            df = parse(k)
+            if k not in aggs:
+                aggs[k] = _Aggregator(agg)
+            aggs[k].add(df.index.values, df.values)
+            sio[k] = StringIO()
 
     for ln in f:
         if not ln.strip():
             init = 1
             if s[0] == '12' and s[1] == '31' and s[2] == '23.0':
                 year += 1
+            hours += 1
+            if agg is not None and hours % AGG_CHUNK == 0:
+                flush()
             continue
         else:
             s = ln.split()
@@ -472,19 +917,49 @@ def outflw1(path=''):
             else:
                 sio[s[3]].write(','.join([s[8][2:],s[9]]) + '\n')
             continue
+    f.close()
 
     outflw1 = {}
 
+    if agg is not None:
+        flush()
+        for k in list(sio.keys()):
+            outflw1[k] = aggs[k].result(names, _float(compact))
+        return(outflw1)
+
     for k in list(sio.keys()):
-        sio[k].seek(0)
-        outflw1[k] = pd.read_csv(sio[k], parse_dates=True, index_col=0,
-               names = ['tide', 'elevation', 'depth', 'velocity', 'direction', 'salinity'])
-        outflw1[k].index.name = 'Date'
+        outflw1[k] = parse(k)
 
     return(outflw1)
 
 
-def coords(fil, zone_number=14, out_type='ll'):
+@lru_cache(maxsize=COORDS_CACHE_SIZE)
+def _coords_values(fil, mtime, size, zone_number):
+    '''
+    Node coordinates of an input file version (path, mtime, size) converted
+    to lat/lon, the COORDS_CACHE_SIZE most recently used are kept
+    '''
+    f = _open(fil)
+    s = f.readline()
+    while s.split()[0] != 'NN':
+        s = f.readline()
+    s = f.readline()
+    nn = int(s[:5])
+    while s.split()[0] != 'NODAL':
+        s = f.readline()
+    easting = np.zeros(nn)
+    northing = np.zeros(nn)
+
+    for i in range(nn):
+        s = f.readline().split()
+        easting[i] = float(s[1])
+        northing[i] = float(s[2])
+    f.close()
+    lat, lon = proj.transformer(zone_number, 'R').to_latlon(easting, northing)
+    return easting, northing, lat, lon
+
+
+def coords(fil, zone_number=14, out_type='ll', compact=False):
     '''
     Read node coordinates from TxBLEND input file and return the coordinates
     in either UTM projection northing/easting or latitude/longitude in decimal degrees
@@ -500,6 +975,9 @@ def coords(fil, zone_number=14, out_type='ll'):
         'll' will return latitude/longitude coordinates in decimal degrees
         'utm' will return utm northing/easting coordinates in feet
         'both' will return both (utm, latlon)
+    compact : bool
+        if True, values are returned as float32 instead of float64 (lat/lon only,
+        UTM coordinates need float64) and the node number index as int32
 
     Example
     -------
@@ -515,28 +993,19 @@ def coords(fil, zone_number=14, out_type='ll'):
         index is node number
         columns are latitude/longitude or northing/easting
     '''
-    f = open(fil, 'r')
-    s = f.readline()
-    while s.split()[0] != 'NN':
-        s = f.readline()
-    s = f.readline()
-    nn = int(s[:5])
-    while s.split()[0] != 'NODAL':
-        s = f.readline()
-    easting = np.zeros(nn)
-    northing = np.zeros(nn)
-
-    for i in range(nn):
-        s = f.readline().split()
-        easting[i] = float(s[1])
-        northing[i] = float(s[2])
-    lat, lon = utm.to_latlon(easting, northing, zone_number, 'R')
+    key = _file_key(fil) + (zone_number,)
+    easting, northing, lat, lon = _coords_values(*key)
+    nn = len(easting)
 
-    coords_ll = pd.DataFrame(np.nan, index=range(1, nn+1, 1), columns=['lat', 'lon'])
-    coords_utm = pd.DataFrame(np.nan, index=range(1, nn+1, 1), columns=['easting', 'northing'])
+    if compact:
+        nodes = pd.Index(np.arange(1, nn+1, 1, dtype=np.int32))
+    else:
+        nodes = range(1, nn+1, 1)
+    coords_ll = pd.DataFrame(np.nan, index=nodes, columns=['lat', 'lon'], dtype=_float(compact))
+    coords_utm = pd.DataFrame(np.nan, index=nodes, columns=['easting', 'northing'])
 
-    coords_ll['lat'] = lat
-    coords_ll['lon'] = lon
+    coords_ll['lat'] = lat.astype(_float(compact))
+    coords_ll['lon'] = lon.astype(_float(compact))
     coords_utm['easting'] = easting
     coords_utm['northing'] = northing
 
@@ -551,7 +1020,89 @@ def coords(fil, zone_number=14, out_type='ll'):
         return(coords_ll)
 
 
-def extfd(fs='', var=''):
+def _pairs(fil_x, fil_y, compact=False):
+    '''
+    Stream the daily blocks of a velx and vely file pair together as
+    (date, vx, vy), raising if their days or nodes do not line up
+    '''
+    for a, b in zip_longest(blocks(fil_x, compact), blocks(fil_y, compact)):
+        if a is None or b is None:
+            raise ValueError('velx and vely have a different number of days: {} {}'.format(
+                fil_x, fil_y))
+        if a[0] != b[0]:
+            raise ValueError('velx and vely dates do not match: {} {}'.format(a[0], b[0]))
+        if len(a[1]) != len(b[1]):
+            raise ValueError('velx and vely have a different number of nodes on {}'.format(a[0]))
+        yield a[0], a[1], b[1]
+
+
+def _speed(fil_x, fil_y, compact=False):
+    '''Stream the current speed of the daily blocks of a velx and vely file pair'''
+    for date, vx, vy in _pairs(fil_x, fil_y, compact):
+        yield date, np.hypot(vx, vy)
+
+
+def elements(fil):
+    '''
+    Read the element connectivity (triangles) of the mesh from TxBLEND input file
+
+    The element table is taken to follow a header line starting with
+    ELEMENT, with one "element node1 node2 node3" line per element. The
+    number of elements is the NE entry of the NN header line if present,
+    otherwise lines are read until the first non element line.
+
+    Parameters
+    ----------
+    fil : string
+        File path to TxBLEND input file
+
+    Example
+    -------
+    import tbtools as tbt
+
+    elems = tbt.read.elements(fil)
+
+    Returns
+    -------
+    elements : DataFrame
+        index is element number
+        columns are the node numbers (n1, n2, n3) of each element
+    '''
+    f = _open(fil)
+    ne = None
+    s = f.readline()
+    while s and (not s.split() or s.split()[0] != 'NN'):
+        s = f.readline()
+    if s:
+        head = s.split()
+        if 'NE' in head:
+            ne = int(f.readline().split()[head.index('NE')])
+    else:
+        f.close()
+        f = _open(fil)
+    s = f.readline()
+    while s and (not s.split() or not s.split()[0].upper().startswith('ELEMENT')):
+        s = f.readline()
+    if not s:
+        f.close()
+        raise ValueError('No element table found in {}'.format(fil))
+    elems = []
+    for s in f:
+        s = s.split()
+        if (ne is not None and len(elems) == ne) or len(s) < 4:
+            break
+        try:
+            elems.append([int(v) for v in s[:4]])
+        except ValueError:
+            break
+    f.close()
+    elems = np.array(elems, dtype=np.int64).reshape(-1, 4)
+    elements = pd.DataFrame(elems[:, 1:], index=elems[:, 0], columns=['n1', 'n2', 'n3'])
+    elements.index.name = 'element'
+    return(elements)
+
+
+def extfd(fs='', var='', compact=False):
     '''
     Extract data from intensive field surveys for use in TxBLEND validation.
     For now (v0.5) will only work on Windows machines with archive mounted as F:
@@ -584,6 +1135,9 @@ def extfd(fs='', var=''):
             T - Tides
             S - Salinity
             D - Discharge
+    compact : bool
+        if True, values are returned as float32 instead of float64
+        and the station column as a categorical
 
     Example
     -------
@@ -615,7 +1169,7 @@ def extfd(fs='', var=''):
                 break
         if path[-4:] == 'Summ':
             sys.exit('Incorrect structure - import data manually')
-        fin = open(path)
+        fin = _open(path)
         s = fin.readline()
         disch = []
         s = fin.readline()
@@ -632,7 +1186,7 @@ def extfd(fs='', var=''):
         dischdf = pd.DataFrame(disch,columns=['Date','Station','Discharge'])
         dischdf.index = dischdf.Date
         dischdf.pop('Date')
-        return dischdf
+        return _compact(dischdf, compact)
 
     if var.lower()=='v':
         if 'Velocity' not in os.listdir(path):
@@ -649,7 +1203,7 @@ def extfd(fs='', var=''):
                 break
         if x==0:
             sys.exit('ERR2 - Incorrect structure - import data manually')
-        fin=open(path)
+        fin=_open(path)
         s=fin.readline()
         if s.split()[4].lower()!='v8':
             sys.exit('ERR3 - sIncorrect structure - import data manually')
@@ -665,7 +1219,7 @@ def extfd(fs='', var=''):
         veldf=pd.DataFrame(vel,columns=['Date','Station','v8','v5','v2'])
         veldf.index = veldf.Date
         veldf.pop('Date')
-        return veldf
+        return _compact(veldf, compact)
 
     if var.lower()=='t':
         if 'Tides' not in os.listdir(path):
@@ -681,7 +1235,7 @@ def extfd(fs='', var=''):
                 break
         if x==0:
             sys.exit('Incorrect stucture - import data manually')
-        fin=open(path)
+        fin=_open(path)
         title=fin.readline()
         s=fin.readline()
         tide=[]
@@ -697,7 +1251,7 @@ def extfd(fs='', var=''):
                     tide.append([dt.datetime(int(s[1]),int(s[2]),int(s[3]),hr),
                         s[0],float(s[hr-8])])
             s=fin.readline()
-        tidedf=pd.DataFrame(tide,columns=['Date','Station','Elevation'])
+        tidedf=_compact(pd.DataFrame(tide,columns=['Date','Station','Elevation']), compact)
     #    return tidedf
         fin.close()
 
@@ -710,7 +1264,7 @@ def extfd(fs='', var=''):
         anc=0
         for i in range(len(os.listdir(path))):
             if os.listdir(path)[i][:5]=='qual.':
-                if os.listdir(path)[i][-9:]=='ancillary':
+                if _base(os.listdir(path)[i])[-9:]=='ancillary':
                     anc=1
                     #pathanc=path+os.listdir(path)[i]
                     pathanc = os.path.join(path,os.listdir(path)[i])
@@ -732,7 +1286,7 @@ def extfd(fs='', var=''):
         elif x==3:
             print('sondes. file OK\nqual. file missing or incorrect structure - import data manually')
         if x==1 or x==4:
-            fin1=open(path1)#qual.
+            fin1=_open(path1)#qual.
             title=fin1.readline()
             s=fin1.readline()
             sal=[]
@@ -745,7 +1299,7 @@ def extfd(fs='', var=''):
                             int(s2[-4:-2]),int(s2[-2:])),s[0],float(s[9])])
                 s=fin1.readline()
         if anc==1:#if ancillary file exists
-            financ=open(pathanc)
+            financ=_open(pathanc)
             title=financ.readline()
             s=financ.readline()
             while s.split()!=[]:
@@ -757,7 +1311,7 @@ def extfd(fs='', var=''):
                             int(s2[-4:-2]),int(s2[-2:])),s[0],float(s[9])])
                 s=financ.readline()
         if x==3 or x==4:
-            fin2=open(path2)#sondes.
+            fin2=_open(path2)#sondes.
             head=[]
             if x==3:
                 sal=[]
@@ -783,12 +1337,12 @@ def extfd(fs='', var=''):
                         sal.append([dt.datetime(int(s[1][:2]),int(s[1][2:4]),int(s[1][4:]),
                             int(s2[-4:-2]),int(s2[-2:])),s[0],float(s[6])])
                 s=fin2.readline()
-        saldf=pd.DataFrame(sal,columns=['Date','Station','Salinity'])
+        saldf=_compact(pd.DataFrame(sal,columns=['Date','Station','Salinity']), compact)
         return saldf,head
         fin1.close()
         fin2.close()
 
-def extwq(site=''):
+def extwq(site='', compact=False):
     '''
     Extract water quality data from TWDB Datasonde sites
 
@@ -796,6 +1350,8 @@ def extwq(site=''):
     ----------
     site : string
         name (abbrev) of the site
+    compact : bool
+        if True, values are returned as float32 instead of float64
 
     Example
     -------
@@ -813,10 +1369,10 @@ def extwq(site=''):
         site = raw_input('Enter site name >> ')
     path = 'T:\\baysestuaries\\Data\\WQData\\sites'
     try:
-        fin = open(os.path.join(path, site, 'twdb_wq_{}.csv'.format(site)))
+        fin = _open(os.path.join(path, site, 'twdb_wq_{}.csv'.format(site)))
     except IOError:
         try:
-            fin = open(os.path.join(path, site, 'twdb_wq_{}_provisional.csv'.format(site)))
+            fin = _open(os.path.join(path, site, 'twdb_wq_{}_provisional.csv'.format(site)))
         except:
             raise OSError('No data found')
     s = fin.readline()
@@ -837,9 +1393,9 @@ def extwq(site=''):
     wqdf = pd.DataFrame(wqsal, columns=['Date', 'Salinity'])
     wqdf.index = wqdf.Date
     wqdf.pop('Date')
-    return wqdf
+    return _compact(wqdf, compact)
 
-def tidesCBI(site, startY=1990, endY=2020, datum=0):
+def tidesCBI(site, startY=1990, endY=2020, datum=0, compact=False):
     '''
     Read the CBI tides for the specified site and the specified dates, datum
 
@@ -853,6 +1409,8 @@ def tidesCBI(site, startY=1990, endY=2020, datum=0):
         End Year (inclusive)
     datum : float
         datum to correct the tide data with (in feet)
+    compact : bool
+        if True, values are returned as float32 instead of float64
 
     Example
     -------
@@ -877,8 +1435,8 @@ def tidesCBI(site, startY=1990, endY=2020, datum=0):
 
     for d in dates:
         if init == 1:
-            if os.path.exists(os.path.join(tideDir, site, site + '.' + d[0]+ '.' + d[1])):
-                tide = pd.read_csv(os.path.join(tideDir,site,site+'.'+d[0]+'.'+d[1]), sep='\s*',
+            if _exists(os.path.join(tideDir, site, site + '.' + d[0]+ '.' + d[1])):
+                tide = pd.read_csv(_find(os.path.join(tideDir,site,site+'.'+d[0]+'.'+d[1])), sep='\s*',
                               skiprows=8, usecols=[1,2,3,4], header=None, engine='python',
                               converters={1:str, 2:str, 3:str, 4:float})
                 tide.columns = ['yr', 'doy', 'time', 'tide_mm']
@@ -893,8 +1451,8 @@ def tidesCBI(site, startY=1990, endY=2020, datum=0):
             else:
                 print('No tide file called: ' + site + '.' + d[0] + '.' + d[1])
         else:
-            if os.path.exists(os.path.join(tideDir, site, site + '.' + d[0]+ '.' + d[1])):
-                tmp = pd.read_csv(os.path.join(tideDir,site,site+'.'+d[0]+'.'+d[1]), sep='\s*',
+            if _exists(os.path.join(tideDir, site, site + '.' + d[0]+ '.' + d[1])):
+                tmp = pd.read_csv(_find(os.path.join(tideDir,site,site+'.'+d[0]+'.'+d[1])), sep='\s*',
                                   skiprows=8, usecols=[1,2,3,4], header=None, engine='python',
                                   converters={1:str, 2:str, 3:str, 4:float})
                 tmp.columns = ['yr', 'doy', 'time', 'tide_mm']
@@ -922,7 +1480,7 @@ def tidesCBI(site, startY=1990, endY=2020, datum=0):
     tide = tide.replace(-9999, pd.np.nan)
     tide['Elev'] = tide.tide_mm * 0.00328084 - datum
     tide = tide.drop('tide_mm', axis=1)
-    return tide
+    return _compact(tide, compact)
 
 def start_end(path):
     '''
@@ -946,7 +1504,7 @@ def start_end(path):
     end_date : datetime object
         ending date of simulation
     '''
-    fin = open(os.path.join(path, 'output'), 'r')
+    fin = _open(os.path.join(path, 'output'))
     s = fin.readline().replace('=', ' ').split()
     while s[0] != 'MNTH1':
         s = fin.readline().replace('=', ' ').split()
@@ -956,7 +1514,7 @@ def start_end(path):
     fin.close()
     return start_date, end_date
 
-def outflw2(path):
+def outflw2(path, compact=False, agg=None):
     '''
     Read the outflw2 files (flow through passes)
 
@@ -964,47 +1522,92 @@ def outflw2(path):
     ----------
     path : string
         path to the directory where TxBLEND was run
+    compact : bool
+        if True, values are returned as float32 instead of float64
+    agg : dictionary
+        if given, reduce the hourly flows to statistics of every period while
+        parsing instead of returning them, e.g. {'freq': 'M', 'how': ['mean', 'min', 'max']}
+            freq - pandas period frequency ('D', 'W', 'M', ...)
+            how - statistic or list of statistics (mean, max, min, sum, count, std)
 
     Example
     -------
     import tbtools as tbt
 
     outflw2 = tbt.read.outflw2(path)
+    monthly = tbt.read.outflw2(path, agg={'freq': 'M', 'how': 'mean'})
 
     Returns
     -------
     outflw2 : dataframe
         index is datetime
         columns are passes
+        *with agg, the index is the start of every period and the columns are
+         (statistic, pass) for many statistics
     '''
     #read the start and end date of the model
     start_date, end_date = start_end(path)
-    #make sure we read all the outflw2 files
-    outflw2_fils = []
-    for fil in os.listdir(path):
-        if fil[:7] == 'outflw2':
-            outflw2_fils.append(fil)
-    #now loop through the outflw2 files
-    for i in range(len(outflw2_fils)):
-        #if first iteration, save outflw2 data to dataframe "data"
-        if i == 0:
-            outflw2 = pd.read_csv(os.path.join(path, outflw2_fils[i]), sep='\s+', skiprows=6)
-        #for any other outflw2 file, add the columns to the "data" dataframe
-        else:
-            tmp = pd.read_csv(os.path.join(path, outflw2_fils[i]), sep='\s+', skiprows=6)
-            for col in tmp.columns[3:]:
-                outflw2[col] = tmp[col]
-    #sometimes, the model runs to the next hour past the end date, to fix
-    #this need to try to reindex first. If that doesn't work, delete the last row
-    #and try again
-    try:
-        outflw2.index = pd.date_range(start_date, end_date, freq='H')
-    except:
-        outflw2 = outflw2.drop(outflw2.index[-1])
-        outflw2.index = pd.date_range(start_date, end_date, freq='H')
-    else:
-        print('Model dates do not match contents of outflw2 files')
-        raise
-    #now drop the month, day, and time columns
-    outflw2 = outflw2.drop(['Mnth', 'Day', 'Time'], axis=1)
+    index = pd.date_range(start_date, end_date, freq=pd.Timedelta(hours=1), name='Date')
+    n = len(index)
+    if agg is not None:
+        return _outflw2_agg(path, index, compact, agg)
+    #parse every outflw2 file, then check its length before placing its pass
+    #columns in one preallocated array
+    tables = []
+    for fil in _outflw2_files(path):
+        tmp = pd.read_csv(_find(fil), sep='\s+', skiprows=6, dtype=_float(compact))
+        #sometimes, the model runs to the next hour past the end date
+        if len(tmp) not in [n, n + 1]:
+            raise ValueError('{} has {} rows, model dates {} to {} need {}'.format(
+                fil, len(tmp), start_date, end_date, n))
+        tables.append(tmp)
+    if len(tables) == 0:
+        raise IOError('No outflw2 files in {}'.format(path))
+    #the first three columns are the month, day and time
+    names = [col for tmp in tables for col in tmp.columns[3:]]
+    data = np.empty((n, len(names)), dtype=_float(compact))
+    j = 0
+    for tmp in tables:
+        m = len(tmp.columns) - 3
+        data[:, j:j + m] = tmp.values[:n, 3:]
+        j += m
+    outflw2 = pd.DataFrame(data, index=index, columns=names)
+    return outflw2
+
+
+
+def _outflw2_agg(path, index, compact, agg):
+    '''Statistics of every period of the outflw2 files, read in chunks'''
+    n = len(index)
+    frames = []
+    for fil in _outflw2_files(path):
+        acc = _Aggregator(agg)
+        rows = 0
+        names = None
+        for tmp in pd.read_csv(_find(fil), sep='\s+', skiprows=6, dtype=_float(compact),
+                               chunksize=AGG_CHUNK):
+            names = list(tmp.columns[3:])
+            m = min(len(tmp), max(n - rows, 0))
+            acc.add(index.values[rows:rows + m], tmp.values[:m, 3:])
+            rows += len(tmp)
+        #sometimes, the model runs to the next hour past the end date
+        if rows not in [n, n + 1]:
+            raise ValueError('{} has {} rows, model dates {} to {} need {}'.format(
+                fil, rows, index[0], index[-1], n))
+        frames.append(acc.result(names, _float(compact)))
+    if len(frames) == 0:
+        raise IOError('No outflw2 files in {}'.format(path))
+    outflw2 = pd.concat(frames, axis=1)
+    if isinstance(outflw2.columns, pd.MultiIndex):
+        #group the pass columns of every file under each statistic
+        outflw2 = outflw2[acc.how]
     return outflw2
+
+
+def _outflw2_files(path):
+    '''Paths of all the outflw2 files of a run (compressed variants counted once)'''
+    fils = []
+    for fil in sorted(os.listdir(path)):
+        if fil[:7] == 'outflw2' and _base(fil) not in fils:
+            fils.append(_base(fil))
+    return [os.path.join(path, fil) for fil in fils]
@@ -0,0 +1,246 @@
+''' Parallel quick-look PNG frames of daily mesh fields and particle tracks '''
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from . import read
+
+try:
+    import matplotlib
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.colors import Normalize
+    from matplotlib.cm import ScalarMappable
+    from matplotlib.tri import Triangulation
+except ImportError:
+    matplotlib = None
+
+#days sampled (with the block index) for the color range when it is not given
+SAMPLE_DAYS = 30
+
+#per worker process: triangulation, figure and artists, built once
+_state = {}
+
+
+def _check_matplotlib():
+    if matplotlib is None:
+        raise ImportError('matplotlib is required for tbtools.render')
+
+
+def scene(fil, zone_number=14):
+    '''
+    Mesh of a TxBLEND input file in longitude/latitude, built once and shared
+    with every frame
+
+    Returns
+    -------
+    scene : dictionary
+        'x', 'y' - node longitude/latitude (node 1 first)
+        'tri' - (elements x 3) zero based node positions of the element corners
+    '''
+    ll = read.coords(fil, zone_number, 'll')
+    elems = read.elements(fil)
+    tri = np.searchsorted(ll.index.values, elems[['n1', 'n2', 'n3']].values)
+    return {'x': ll['lon'].values, 'y': ll['lat'].values, 'tri': tri}
+
+
+def _limits(fil, vmin, vmax, speed_of=None):
+    '''Color range of a daily file from SAMPLE_DAYS days spread over the run'''
+    if vmin is not None and vmax is not None:
+        return vmin, vmax
+    dates = read.block_index(fil)[0]
+    lo, hi = np.inf, -np.inf
+    for d in dates[np.unique(np.linspace(0, len(dates) - 1, SAMPLE_DAYS).astype(int))]:
+        values = read.read_days(fil, d, d)[1]
+        if speed_of is not None:
+            values = np.hypot(values, read.read_days(speed_of, d, d)[1])
+        lo = min(lo, np.nanmin(values))
+        hi = max(hi, np.nanmax(values))
+    return (lo if vmin is None else vmin), (hi if vmax is None else vmax)
+
+
+def _init(sc, kind, style):
+    '''Build the figure, triangulation and color bar of a worker once'''
+    fig = Figure(figsize=style['figsize'], dpi=style['dpi'])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    ax.set_aspect(1. / np.cos(np.radians(np.mean(sc['y']))))
+    ax.set_xlim(sc['x'].min(), sc['x'].max())
+    ax.set_ylim(sc['y'].min(), sc['y'].max())
+    tri = Triangulation(sc['x'], sc['y'], sc['tri'])
+    _state.update({'fig': fig, 'ax': ax, 'tri': tri, 'kind': kind, 'style': style,
+                   'artists': [], 'title': ax.set_title('')})
+    if kind == 'particles':
+        ax.triplot(tri, color='0.8', lw=0.3)
+        _state['dots'] = ax.scatter([], [], s=style['size'], c=style['color'])
+    else:
+        norm = Normalize(style['vmin'], style['vmax'])
+        _state['norm'] = norm
+        fig.colorbar(ScalarMappable(norm, style['cmap']), ax=ax, label=style['label'])
+
+
+def _frame(args):
+    '''Render one frame to PNG in a worker'''
+    path, title, values = args
+    ax = _state['ax']
+    style = _state['style']
+    if _state['kind'] == 'particles':
+        _state['dots'].set_offsets(np.column_stack(values))
+    else:
+        for artist in _state['artists']:
+            artist.remove()
+        if _state['kind'] == 'currents':
+            vx, vy = values
+            artists = [ax.tripcolor(_state['tri'], np.hypot(vx, vy), norm=_state['norm'],
+                                    cmap=style['cmap'], shading='gouraud')]
+            if style['arrows']:
+                k = slice(None, None, style['arrows'])
+                artists.append(ax.quiver(_state['tri'].x[k], _state['tri'].y[k], vx[k], vy[k],
+                                         scale=style['scale'], width=0.002))
+        else:
+            artists = [ax.tripcolor(_state['tri'], values, norm=_state['norm'],
+                                    cmap=style['cmap'], shading='gouraud')]
+        _state['artists'] = artists
+    _state['title'].set_text(title)
+    _state['fig'].savefig(path)
+    return path
+
+
+def _run(frames, sc, kind, style, out_dir, workers):
+    '''Render (title, values) frames in a process pool, a few frames ahead'''
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    paths = []
+    if workers == 1:
+        _init(sc, kind, style)
+        for i, (title, values) in enumerate(frames):
+            paths.append(_frame((os.path.join(out_dir, style['pattern'].format(i)), title, values)))
+        return paths
+    with ProcessPoolExecutor(workers, initializer=_init, initargs=(sc, kind, style)) as ex:
+        pending = deque()
+        limit = 2 * (workers or os.cpu_count() or 1)
+        for i, (title, values) in enumerate(frames):
+            pending.append(ex.submit(_frame, (os.path.join(out_dir, style['pattern'].format(i)),
+                                              title, values)))
+            if len(pending) >= limit:
+                paths.append(pending.popleft().result())
+        paths += [f.result() for f in pending]
+    return paths
+
+
+def _style(**kwargs):
+    style = {'figsize': (8, 8), 'dpi': 100, 'cmap': 'viridis', 'label': '',
+             'pattern': 'frame_{:05d}.png', 'date_format': '%Y-%m-%d'}
+    style.update(kwargs)
+    return style
+
+
+def field(fil, input_fil, out_dir, zone_number=14, vmin=None, vmax=None,
+          workers=None, **kwargs):
+    '''
+    Render every day of a daily file (avesalD.w, velx, vely) to PNG frames
+
+    Parameters
+    ----------
+    fil : string
+        avesalD.w, velx or vely file
+    input_fil : string
+        TxBLEND input file with the mesh
+    out_dir : string
+        directory the frames are written to
+    zone_number : int
+        UTM zone of the mesh
+    vmin, vmax : float
+        color range (default is the range of SAMPLE_DAYS days of the run)
+    workers : int
+        number of processes (default is the number of CPUs, 1 renders here)
+    **kwargs
+        figsize, dpi, cmap, label (color bar), pattern (file name with a
+        frame number field), date_format
+
+    Example
+    -------
+    import tbtools as tbt
+
+    tbt.render.field('run/avesalD.w', 'run/input', 'frames', label='Salinity')
+    # ffmpeg -i frames/frame_%05d.png salinity.mp4
+
+    Returns
+    -------
+    paths : list
+        PNG files, one per day
+    '''
+    _check_matplotlib()
+    vmin, vmax = _limits(fil, vmin, vmax)
+    style = _style(vmin=vmin, vmax=vmax, **kwargs)
+    frames = ((d.strftime(style['date_format']), v) for d, v in read.blocks(fil))
+    return _run(frames, scene(input_fil, zone_number), 'field', style, out_dir, workers)
+
+
+def currents(fil_x, fil_y, input_fil, out_dir, zone_number=14, vmin=0, vmax=None,
+             arrows=None, scale=None, workers=None, **kwargs):
+    '''
+    Render the current speed (and optionally arrows) of every day of a velx
+    and vely file pair to PNG frames
+
+    Parameters
+    ----------
+    fil_x, fil_y : string
+        velx and vely files
+    arrows : int
+        if given, draw a current arrow at every arrows-th node
+    scale : float
+        matplotlib quiver scale of the arrows
+    (see field for the other parameters)
+
+    Returns
+    -------
+    paths : list
+        PNG files, one per day
+    '''
+    _check_matplotlib()
+    vmin, vmax = _limits(fil_x, vmin, vmax, fil_y)
+    style = _style(vmin=vmin, vmax=vmax, arrows=arrows, scale=scale, **kwargs)
+
+    def frames():
+        for date, vx, vy in read._pairs(fil_x, fil_y):
+            yield date.strftime(style['date_format']), (vx, vy)
+    return _run(frames(), scene(input_fil, zone_number), 'currents', style, out_dir, workers)
+
+
+def particles(lon, lat, input_fil, out_dir, zone_number=14, every=1, size=2,
+              color='tab:red', workers=None, **kwargs):
+    '''
+    Render particle positions over the mesh to PNG frames
+
+    Parameters
+    ----------
+    lon, lat : DataFrame
+        particle longitudes and latitudes (as returned by ptrac.read.particles)
+    every : int
+        render every every-th time step
+    size, color : float, color
+        marker size and color of the particles
+    (see field for the other parameters)
+
+    Example
+    -------
+    import tbtools as tbt
+
+    lon, lat = tbt.ptrac.read.particles(path, 14)
+    tbt.render.particles(lon, lat, path + '/input', 'frames', every=2)
+
+    Returns
+    -------
+    paths : list
+        PNG files, one per rendered time step
+    '''
+    _check_matplotlib()
+    kwargs.setdefault('date_format', '%Y-%m-%d %H:%M')
+    style = _style(size=size, color=color, **kwargs)
+    x = lon.values
+    y = lat.values
+    frames = ((lon.index[i].strftime(style['date_format']), (x[i], y[i]))
+              for i in range(0, len(lon), every))
+    return _run(frames, scene(input_fil, zone_number), 'particles', style, out_dir, workers)
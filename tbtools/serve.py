@@ -0,0 +1,297 @@
+''' Local HTTP server answering node/date-range queries against TxBLEND runs '''
+
+import io
+import os
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import pandas as pd
+from . import read
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as paipc
+except ImportError:
+    pa = None
+
+#mesh outputs (read block by block) and the run directory file of each one
+MESH = {'avesalD': 'avesalD.w', 'velx': 'velx', 'vely': 'vely'}
+OUTPUTS = list(MESH.keys()) + ['outflw1', 'outflw2']
+
+
+class LRU(object):
+    '''
+    Thread-safe least recently used cache with a memory limit
+
+    Parameters
+    ----------
+    max_bytes : int
+        largest total size of the cached values (entries larger than this are
+        not cached)
+    '''
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, load=None):
+        '''
+        Return the cached value of key. On a miss, call load() -> (value,
+        nbytes) and cache the result (or return None without load)
+        '''
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key][0]
+            self.misses += 1
+        if load is None:
+            return None
+        value, nbytes = load()
+        self.put(key, value, nbytes)
+        return value
+
+    def put(self, key, value, nbytes):
+        with self._lock:
+            if key in self._data or nbytes > self.max_bytes:
+                return
+            self._data[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                old = self._data.popitem(last=False)[1]
+                self.nbytes -= old[1]
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._data), 'nbytes': self.nbytes,
+                    'max_bytes': self.max_bytes, 'hits': self.hits,
+                    'misses': self.misses}
+
+
+class Server(object):
+    '''
+    Query engine behind the HTTP server: resolves runs under root and
+    serves node series from an LRU cache of decoded data
+
+    Parameters
+    ----------
+    root : string
+        directory holding one TxBLEND run directory per run
+    cache_mb : float
+        memory limit of the cache of decoded series (MB)
+    compact : bool
+        if True, values are decoded and served as float32
+    '''
+
+    def __init__(self, root, cache_mb=1024, compact=True):
+        self.root = os.path.realpath(root)
+        self.compact = compact
+        self.cache = LRU(int(cache_mb * 2 ** 20))
+
+    def runs(self):
+        return sorted(d for d in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, d)))
+
+    def _run_path(self, run):
+        #containment is checked on the normalized, unresolved path: runs may
+        #be symlinks to directories elsewhere (as listed by runs), but names
+        #with separators or .. are refused
+        path = os.path.normpath(os.path.join(self.root, run))
+        if os.path.dirname(path) != self.root or not os.path.isdir(path):
+            raise KeyError('No such run: {}'.format(run))
+        return path
+
+    def _days(self, fil, i0, i1):
+        '''
+        Decoded values of daily blocks i0 to i1 of a mesh output file, reading
+        each stretch of days missing from the cache in one seek
+        '''
+        key = read._file_key(fil)
+        dates = read.block_index(fil)[0]
+        days = [self.cache.get(key + (i,)) for i in range(i0, i1)]
+        j = 0
+        while j < len(days):
+            if days[j] is not None:
+                j += 1
+                continue
+            k = j
+            while k < len(days) and days[k] is None:
+                k += 1
+            values = read.read_days(fil, dates[i0 + j], dates[i0 + k - 1], self.compact)[1]
+            for m in range(j, k):
+                days[m] = values[m - j]
+                self.cache.put(key + (i0 + m,), days[m], days[m].nbytes)
+            j = k
+        return days
+
+    def _table(self, run, output):
+        '''outflw1 (as a wide (node, variable) frame) or outflw2 of a run'''
+        path = self._run_path(run)
+
+        def load():
+            if output == 'outflw1':
+                out = read.outflw1(path, self.compact)
+                df = pd.concat(out, axis=1)
+            else:
+                df = read.outflw2(path, self.compact)
+            return df, int(df.memory_usage(deep=True).sum())
+        if output == 'outflw1':
+            fils = [os.path.join(path, 'outflw1')]
+        else:
+            fils = read._outflw2_files(path)
+        return self.cache.get(tuple(read._file_key(f) for f in fils) + (output,), load)
+
+    def query(self, run, output, nodes=None, start=None, end=None, var=None):
+        '''
+        Series of nodes between two dates
+
+        Parameters
+        ----------
+        run : string
+            run directory name under root
+        output : string
+            avesalD, velx, vely, outflw1 or outflw2
+        nodes : list
+            mesh node numbers (avesalD, velx, vely), check nodes (outflw1) or
+            passes (outflw2); default is all of them
+        start, end : string or datetime
+            first and last time to return (default is the whole run)
+        var : string
+            outflw1 variable (tide, elevation, depth, velocity, direction,
+            salinity)
+
+        Returns
+        -------
+        series : DataFrame
+            index is datetime, columns are nodes
+        '''
+        if output not in OUTPUTS:
+            raise KeyError('Unknown output: {}'.format(output))
+        if output in MESH:
+            fil = os.path.join(self._run_path(run), MESH[output])
+            dates = read.block_index(fil)[0]
+            i0 = 0 if start is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(start).date(), 'D'))
+            i1 = len(dates) if end is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(end).date(), 'D'), 'right')
+            i1 = max(i0, i1)
+            days = self._days(fil, i0, i1)
+            n = len(days[0]) if days else 0
+            cols = np.arange(1, n + 1) if nodes is None else np.asarray([int(v) for v in nodes])
+            if len(cols) and (cols.min() < 1 or cols.max() > n):
+                raise KeyError('Node numbers must be between 1 and {}'.format(n))
+            values = np.empty((len(days), len(cols)), dtype=read._float(self.compact))
+            for j, day in enumerate(days):
+                values[j] = day[cols - 1]
+            return pd.DataFrame(values, index=pd.DatetimeIndex(dates[i0:i1], name='Date'),
+                                columns=cols)
+        df = self._table(run, output)
+        if output == 'outflw1':
+            if var is None:
+                raise KeyError('var is required for outflw1')
+            df = df.xs(var, axis=1, level=1)
+        if nodes is not None:
+            df = df[[str(v) for v in nodes]]
+        return df.loc[start:end]
+
+
+def payload(df, fmt='npy'):
+    '''
+    Encode a query result as compact binary
+
+    'npy' - npz archive with time (datetime64[ns]), columns and values arrays
+    'arrow' - Arrow IPC stream with a time column and one column per node
+    '''
+    buf = io.BytesIO()
+    if fmt == 'arrow':
+        if pa is None:
+            raise ImportError('pyarrow is required for arrow payloads')
+        table = pa.Table.from_pandas(df.rename(columns=str).reset_index(), preserve_index=False)
+        with paipc.new_stream(buf, table.schema) as w:
+            w.write_table(table)
+        return buf.getvalue(), 'application/vnd.apache.arrow.stream'
+    np.savez(buf, time=df.index.values.astype('datetime64[ns]'),
+             columns=np.array([str(c) for c in df.columns]), values=df.values)
+    return buf.getvalue(), 'application/octet-stream'
+
+
+def _handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        '''
+        GET /runs                  - JSON list of runs
+        GET /stats                 - JSON cache statistics
+        GET /series?run=&output=&nodes=1,2&start=&end=&var=&format=npy|arrow
+        '''
+
+        def _send(self, code, body, ctype):
+            self.send_response(code)
+            self.send_header('Content-Type', ctype)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, code, obj):
+            self._send(code, json.dumps(obj).encode(), 'application/json')
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            q = dict((k, v[-1]) for k, v in parse_qs(url.query).items())
+            try:
+                if url.path == '/runs':
+                    return self._json(200, server.runs())
+                if url.path == '/stats':
+                    return self._json(200, server.cache.stats())
+                if url.path != '/series':
+                    return self._json(404, {'error': 'Unknown path: {}'.format(url.path)})
+                nodes = q['nodes'].split(',') if q.get('nodes') else None
+                df = server.query(q['run'], q['output'], nodes, q.get('start'),
+                                  q.get('end'), q.get('var'))
+                body, ctype = payload(df, q.get('format', 'npy'))
+                self._send(200, body, ctype)
+            except (KeyError, ValueError, IOError) as e:
+                self._json(400, {'error': str(e)})
+            except ImportError as e:
+                self._json(501, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            pass
+    return Handler
+
+
+def serve(root, host='127.0.0.1', port=8750, cache_mb=1024, compact=True):
+    '''
+    Serve node/date-range queries against the run directories under root
+    (blocks until interrupted)
+
+    Parameters
+    ----------
+    root : string
+        directory holding one TxBLEND run directory per run
+    host, port : string, int
+        address to listen on (default is local only)
+    cache_mb : float
+        memory limit of the cache of decoded series (MB)
+    compact : bool
+        if True, values are decoded and served as float32
+
+    Example
+    -------
+    $ tbtools serve /data/runs --port 8750
+
+    import io, urllib.request, numpy as np
+    url = 'http://127.0.0.1:8750/series?run=base&output=avesalD&nodes=10,20&start=2010-01-01'
+    d = np.load(io.BytesIO(urllib.request.urlopen(url).read()))
+    d['time'], d['values']
+    '''
+    httpd = ThreadingHTTPServer((host, port), _handler(Server(root, cache_mb, compact)))
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
@@ -0,0 +1,228 @@
+''' Zero-copy sharing of loaded run outputs with worker processes '''
+
+import os
+import atexit
+import uuid
+import numpy as np
+import pandas as pd
+from . import read
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+#run directory file of every output that can be published with load_run
+OUTPUTS = {'avesalD': 'avesalD.w', 'velx': 'velx', 'vely': 'vely'}
+
+#segments created by this process (unlinked at exit) and segments attached
+#to (kept open while their views are in use)
+_owned = {}
+_attached = {}
+
+
+def publish(data, name=None, path=None):
+    '''
+    Copy a DataFrame (or array) once into shared memory so worker processes
+    can attach to it without copying
+
+    Parameters
+    ----------
+    data : DataFrame or array
+        e.g. the DataFrame returned by read.avesalD or read.vel
+    name : string
+        name of the shared memory segment (default is a unique name)
+    path : string
+        if given, use a memory-mapped .npy file at path instead of
+        multiprocessing.shared_memory (for very large runs or old Pythons)
+
+    Example
+    -------
+    import tbtools as tbt
+
+    handle = tbt.shared.publish(tbt.read.avesalD(fil))
+    pool.map(work, [(handle, node) for node in nodes])
+
+    Returns
+    -------
+    handle : dictionary
+        small picklable description of the segment to pass to workers
+    '''
+    index = data.index.values if isinstance(data, pd.DataFrame) else None
+    columns = list(data.columns) if isinstance(data, pd.DataFrame) else None
+    values = np.asarray(data)
+    out, handle = _create(values.shape, values.dtype, index, columns, name, path)
+    out[...] = values
+    _close(out)
+    return handle
+
+
+def _create(shape, dtype, index=None, columns=None, name=None, path=None):
+    '''
+    Create a segment (or memory-mapped .npy file at path) and return a
+    writable view of it with its handle
+    '''
+    dtype = np.dtype(dtype)
+    handle = {'shape': tuple(shape), 'dtype': dtype.str,
+              'index': index, 'columns': columns}
+    if path is None and shared_memory is None:
+        raise ImportError('multiprocessing.shared_memory needs Python 3.8+, pass path to use a memory map')
+    if path is None:
+        if name is None:
+            name = 'tbt_' + uuid.uuid4().hex[:16]
+        size = int(np.prod(shape)) * dtype.itemsize
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+        _owned[name] = shm
+        handle.update({'kind': 'shm', 'name': name})
+        return np.ndarray(shape, dtype=dtype, buffer=shm.buf), handle
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=tuple(shape))
+    _owned[path] = None
+    handle.update({'kind': 'mmap', 'name': path})
+    return out, handle
+
+
+def _close(out):
+    '''Flush a view returned by _create to its memory-mapped file'''
+    if isinstance(out, np.memmap):
+        out.flush()
+
+
+def attach(handle):
+    '''
+    Attach to a published segment and get a read-only view of it
+
+    Parameters
+    ----------
+    handle : dictionary
+        as returned by publish (or load_run)
+
+    Returns
+    -------
+    data : DataFrame or array
+        read-only view over the shared buffer (a DataFrame if a DataFrame was
+        published)
+    '''
+    name = handle['name']
+    if handle['kind'] == 'shm':
+        if name in _owned:
+            shm = _owned[name]
+        elif name in _attached:
+            shm = _attached[name]
+        else:
+            try:
+                shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                #before Python 3.13 attaching registers the segment again with
+                #the resource tracker the pool workers share with the owner,
+                #which is harmless as long as the owner outlives its workers
+                shm = shared_memory.SharedMemory(name=name)
+            _attached[name] = shm
+        values = np.ndarray(handle['shape'], dtype=np.dtype(handle['dtype']), buffer=shm.buf)
+    else:
+        values = np.load(name, mmap_mode='r')
+    values.flags.writeable = False
+    if handle['columns'] is None:
+        return values
+    return pd.DataFrame(values, index=pd.Index(handle['index'], name='Date'),
+                        columns=handle['columns'], copy=False)
+
+
+def release(handle):
+    '''Free a segment published by this process (workers just stop using it)'''
+    name = handle['name']
+    if name in _attached:
+        _attached.pop(name).close()
+    if name in _owned:
+        shm = _owned.pop(name)
+        if shm is None:
+            if os.path.exists(name):
+                os.remove(name)
+        else:
+            shm.close()
+            shm.unlink()
+
+
+def release_all():
+    '''Free every segment published by this process (also run at exit)'''
+    for name in list(_owned):
+        release({'name': name})
+    for name in list(_attached):
+        _attached.pop(name).close()
+
+
+atexit.register(release_all)
+
+
+def load_run(path, outputs=None, compact=False, mmap_dir=None):
+    '''
+    Read a run's daily outputs once and publish them for worker processes,
+    streaming the daily blocks straight into the shared buffers
+
+    Parameters
+    ----------
+    path : string
+        path to the directory where TxBLEND was run
+    outputs : list
+        any of 'avesalD', 'velx', 'vely' (default is every one found)
+    compact : bool
+        if True, values are stored as float32 instead of float64
+    mmap_dir : string
+        if given, publish as memory-mapped .npy files in this directory
+
+    Example
+    -------
+    import tbtools as tbt
+
+    handles = tbt.shared.load_run(path)
+
+    def work(args):
+        handles, node = args
+        sal = tbt.shared.attach(handles['avesalD'])
+        return sal[node].mean()
+
+    pool.map(work, [(handles, node) for node in nodes])
+
+    Returns
+    -------
+    handles : dictionary
+        output -> handle (see publish)
+    '''
+    if outputs is None:
+        outputs = [o for o in OUTPUTS if read._exists(os.path.join(path, OUTPUTS[o]))]
+    handles = {}
+    for output in outputs:
+        fil = os.path.join(path, OUTPUTS[output])
+        mm = None
+        if mmap_dir is not None:
+            mm = os.path.join(mmap_dir, '{}_{}.npy'.format(
+                os.path.basename(os.path.normpath(path)), output))
+        handles[output] = _load(fil, compact, mm)
+    return handles
+
+
+def _load(fil, compact, path):
+    '''
+    Publish a daily file, sized from its block index and filled one daily
+    block at a time, so the run is never held in memory twice
+    '''
+    dates = read.block_index(fil)[0]
+    if len(dates) == 0:
+        raise IOError('No daily blocks in {}'.format(fil))
+    n = read.read_days(fil, dates[0], dates[0], compact)[1].shape[1]
+    columns = np.arange(1, n + 1, dtype=np.int32 if compact else np.int64)
+    out, handle = _create((len(dates), n), read._float(compact),
+                          dates.astype('datetime64[ns]'), columns, path=path)
+    try:
+        k = -1
+        for k, (date, values) in enumerate(read.blocks(fil, compact)):
+            if k >= len(dates) or len(values) != n:
+                raise ValueError('{} changed while it was loaded'.format(fil))
+            out[k] = values
+        if k + 1 != len(dates):
+            raise ValueError('{} changed while it was loaded'.format(fil))
+        _close(out)
+    except Exception:
+        del out
+        release(handle)
+        raise
+    return handle
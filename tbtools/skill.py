@@ -0,0 +1,238 @@
+''' Batch model-vs-observation skill metrics for TxBLEND validation '''
+
+import numpy as np
+import pandas as pd
+
+METRICS = ['n', 'bias', 'rmse', 'willmott', 'corr', 'lag', 'lag_corr']
+
+
+def _series(run, node, var):
+    '''Model series of node from a run (outflw1 dictionary or node DataFrame)'''
+    if isinstance(run, dict):
+        return run[str(node)][var]
+    if node in run.columns:
+        return run[node]
+    return run[str(node)]
+
+
+def _obs(obs, var):
+    '''
+    Observation Series of var on a datetime index: a Series, or the var
+    column (any case) of a DataFrame indexed by datetime or with a Date
+    column (read.extfd, also its (observations, header) tuple for 'S')
+    '''
+    if isinstance(obs, tuple):
+        obs = obs[0]
+    if isinstance(obs, pd.DataFrame):
+        if not isinstance(obs.index, pd.DatetimeIndex):
+            dates = [c for c in obs.columns if str(c).lower() == 'date']
+            if not dates:
+                raise ValueError('Observations need a datetime index or a Date column')
+            obs = obs.set_index(dates[0])
+        cols = [c for c in obs.columns if str(c).lower() == var.lower()]
+        if not cols:
+            raise KeyError('No {} column in the observations ({}), pass the series to '
+                           'compare instead'.format(var, ', '.join(str(c) for c in obs.columns)))
+        obs = obs[cols[0]]
+    if not isinstance(obs.index, pd.DatetimeIndex):
+        raise ValueError('Observations need a datetime index')
+    return obs
+
+
+def asof(times, obs_times, obs_values, tolerance):
+    '''
+    Vectorized as-of join of observations onto times: the nearest
+    observation within tolerance, NaN where there is none
+
+    Parameters
+    ----------
+    times : datetime64 array
+        target times
+    obs_times : datetime64 array
+        observation times (any order)
+    obs_values : array
+        observation values
+    tolerance : string or Timedelta
+        largest time difference accepted
+
+    Returns
+    -------
+    values : array
+        observations aligned on times
+    '''
+    times = np.asarray(times, dtype='datetime64[ns]')
+    order = np.argsort(obs_times, kind='mergesort')
+    t = np.asarray(obs_times, dtype='datetime64[ns]')[order]
+    v = np.asarray(obs_values, dtype=np.float64)[order]
+    ok = ~np.isnan(v)
+    t, v = t[ok], v[ok]
+    out = np.full(len(times), np.nan)
+    if len(t) == 0:
+        return out
+    i = np.searchsorted(t, times)
+    lo = np.clip(i - 1, 0, len(t) - 1)
+    hi = np.clip(i, 0, len(t) - 1)
+    dlo = np.abs(times - t[lo])
+    dhi = np.abs(t[hi] - times)
+    j = np.where(dhi < dlo, hi, lo)
+    d = np.minimum(dlo, dhi)
+    near = d <= pd.Timedelta(tolerance).to_timedelta64()
+    out[near] = v[j[near]]
+    return out
+
+
+def align(model, obs, pairs, var='salinity', tolerance='30min'):
+    '''
+    Line up model series of many runs and (node, station) pairs with the
+    observations on the model time grid
+
+    Parameters
+    ----------
+    model : dictionary
+        run name -> outflw1 dictionary (read.outflw1) or DataFrame with node
+        columns (read.avesalD, read.vel)
+    obs : dictionary
+        station -> Series of observations, or DataFrame with a var column
+        (any case) such as read.extwq or read.extfd return
+    pairs : list
+        (node, station) pairs to compare
+    var : string
+        outflw1 variable and observation column (pass a Series for
+        observations with another column name, e.g. read.tidesCBI tide_mm)
+    tolerance : string or Timedelta
+        largest time difference of an observation from a model time
+
+    Returns
+    -------
+    times : DatetimeIndex
+        common time grid (union of the model times)
+    model : array
+        (runs x pairs x times) model values
+    obs : array
+        (pairs x times) observations
+    '''
+    runs = list(model)
+    series = [[_series(model[r], node, var) for node, station in pairs] for r in runs]
+    times = series[0][0].index
+    for rs in series:
+        for s in rs:
+            if not s.index.equals(times):
+                times = times.union(s.index)
+    M = np.full((len(runs), len(pairs), len(times)), np.nan)
+    for i, rs in enumerate(series):
+        for j, s in enumerate(rs):
+            M[i, j] = s.reindex(times).values
+    O = np.full((len(pairs), len(times)), np.nan)
+    aligned = {}
+    for j, (node, station) in enumerate(pairs):
+        if station not in aligned:
+            o = _obs(obs[station], var)
+            aligned[station] = asof(times.values, o.index.values, o.values, tolerance)
+        O[j] = aligned[station]
+    return times, M, O
+
+
+def _corr(m, o, axis=-1):
+    ok = ~(np.isnan(m) | np.isnan(o))
+    n = ok.sum(axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        m = np.where(ok, m, 0.)
+        o = np.where(ok, o, 0.)
+        mm = m.sum(axis) / n
+        om = o.sum(axis) / n
+        cov = (m * o).sum(axis) / n - mm * om
+        vm = (m * m).sum(axis) / n - mm ** 2
+        vo = (o * o).sum(axis) / n - om ** 2
+        return cov / np.sqrt(vm * vo)
+
+
+def metrics(M, O, lags=range(-6, 7)):
+    '''
+    Skill metrics of aligned model (... x times) and observation (times
+    broadcastable) arrays, computed as array reductions over the last axis
+
+    Parameters
+    ----------
+    M : array
+        model values
+    O : array
+        observations (broadcastable against M)
+    lags : iterable of int
+        lags (in time steps, positive when the model lags the observations)
+        searched for the best correlation
+
+    Returns
+    -------
+    metrics : dictionary of arrays
+        n, bias, rmse, willmott (index of agreement), corr (zero lag),
+        lag (time steps of best correlation), lag_corr (best correlation)
+    '''
+    M, O = np.broadcast_arrays(np.asarray(M, dtype=np.float64), np.asarray(O, dtype=np.float64))
+    ok = ~(np.isnan(M) | np.isnan(O))
+    n = ok.sum(-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        err = np.where(ok, M - O, 0.)
+        bias = err.sum(-1) / n
+        rmse = np.sqrt((err ** 2).sum(-1) / n)
+        obar = np.where(ok, O, 0.).sum(-1) / n
+        pot = np.where(ok, np.abs(M - obar[..., None]) + np.abs(O - obar[..., None]), 0.)
+        willmott = 1 - (err ** 2).sum(-1) / (pot ** 2).sum(-1)
+    corr = _corr(M, O)
+
+    lags = list(lags)
+    best = np.full(n.shape, np.nan)
+    best_lag = np.zeros(n.shape, dtype=np.int64)
+    T = M.shape[-1]
+    for lag in lags:
+        if abs(lag) >= T:
+            continue
+        if lag >= 0:
+            c = _corr(M[..., lag:], O[..., :T - lag])
+        else:
+            c = _corr(M[..., :T + lag], O[..., -lag:])
+        better = c > np.where(np.isnan(best), -np.inf, best)
+        best = np.where(better, c, best)
+        best_lag = np.where(better, lag, best_lag)
+    return {'n': n, 'bias': bias, 'rmse': rmse, 'willmott': willmott,
+            'corr': corr, 'lag': best_lag, 'lag_corr': best}
+
+
+def score(model, obs, pairs, var='salinity', tolerance='30min', lags=range(-6, 7)):
+    '''
+    Score many runs against observations at many (node, station) pairs at once
+
+    Parameters
+    ----------
+    model : dictionary
+        run name -> outflw1 dictionary (read.outflw1) or DataFrame with node
+        columns (read.avesalD, read.vel)
+    obs : dictionary
+        station -> Series or DataFrame of observations (see align)
+    pairs : list
+        (node, station) pairs to compare
+    var : string
+        outflw1 variable (tide, elevation, depth, velocity, direction, salinity)
+    tolerance : string or Timedelta
+        largest time difference of an observation from a model time
+    lags : iterable of int
+        lags in model time steps searched for the best correlation
+
+    Example
+    -------
+    import tbtools as tbt
+
+    model = {'base': tbt.read.outflw1(base), 'cal1': tbt.read.outflw1(cal1)}
+    obs = {'MIDG': tbt.read.extwq('MIDG')}
+    skill = tbt.skill.score(model, obs, [('10505', 'MIDG')], 'salinity')
+
+    Returns
+    -------
+    skill : DataFrame
+        index is (run, node, station)
+        columns are n, bias, rmse, willmott, corr, lag, lag_corr
+    '''
+    times, M, O = align(model, obs, pairs, var, tolerance)
+    m = metrics(M, O[None, :, :], lags)
+    index = pd.MultiIndex.from_tuples([(r, node, station) for r in model for node, station in pairs],
+                                      names=['run', 'node', 'station'])
+    return pd.DataFrame(dict((k, np.ravel(m[k])) for k in METRICS), index=index, columns=METRICS)
@@ -0,0 +1,161 @@
+''' Spatial index of TxBLEND mesh nodes for station-to-node matching '''
+
+import os
+import numpy as np
+from . import read, proj
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+#file the node coordinates of the index are persisted to in the run
+#directory (the tree is rebuilt from them when loaded)
+INDEX_FILE = 'nodes.index.npz'
+
+
+class NodeIndex(object):
+    '''
+    KD-tree over the mesh node coordinates (UTM) answering batched
+    nearest-node and radius queries
+
+    Parameters
+    ----------
+    easting, northing : arrays
+        UTM coordinates of the nodes (as returned by read.coords(fil, out_type='utm'))
+    nodes : array
+        node numbers (default is 1..N, matching the vel/avesalD columns)
+    zone_number : int
+        UTM zone of the coordinates, used by the lat/lon queries
+
+    Example
+    -------
+    import tbtools as tbt
+
+    idx = tbt.spatial.node_index(path)
+    nodes, dist = idx.nearest_latlon(stations.lat, stations.lon)
+    sal = tbt.read.avesalD(fil)[nodes]
+    '''
+    def __init__(self, easting, northing, nodes=None, zone_number=14):
+        if cKDTree is None:
+            raise ImportError('scipy is required for the node spatial index')
+        easting = np.asarray(easting, dtype=np.float64)
+        northing = np.asarray(northing, dtype=np.float64)
+        if nodes is None:
+            nodes = np.arange(1, len(easting) + 1)
+        self.nodes = np.asarray(nodes)
+        self.zone_number = zone_number
+        self.easting = easting
+        self.northing = northing
+        self.tree = cKDTree(np.column_stack([easting, northing]))
+
+    def nearest(self, x, y, k=1, max_distance=np.inf):
+        '''
+        Find the k nearest nodes of each (x, y) point (UTM)
+
+        Returns
+        -------
+        nodes : array
+            node numbers, shape (n,) for k=1 otherwise (n, k)
+            *-1 where no node is within max_distance
+        distance : array
+            distances to the nodes (same shape as nodes)
+        '''
+        pts = np.column_stack([np.ravel(x), np.ravel(y)])
+        dist, i = self.tree.query(pts, k=k, distance_upper_bound=max_distance)
+        found = np.isfinite(dist)
+        nodes = np.full(i.shape, -1, dtype=self.nodes.dtype)
+        nodes[found] = self.nodes[i[found]]
+        return nodes, dist
+
+    def within(self, x, y, radius):
+        '''
+        Find all nodes within radius of each (x, y) point (UTM)
+
+        Returns
+        -------
+        nodes : list of arrays
+            node numbers (sorted by node) within radius of each point
+        '''
+        pts = np.column_stack([np.ravel(x), np.ravel(y)])
+        return [np.sort(self.nodes[i]) for i in self.tree.query_ball_point(pts, radius)]
+
+    def nearest_latlon(self, lat, lon, k=1, max_distance=np.inf):
+        '''Same as nearest for latitude/longitude points'''
+        x, y = proj.transformer(self.zone_number).to_utm(lat, lon)
+        return self.nearest(x, y, k, max_distance)
+
+    def within_latlon(self, lat, lon, radius):
+        '''Same as within for latitude/longitude points'''
+        x, y = proj.transformer(self.zone_number).to_utm(lat, lon)
+        return self.within(x, y, radius)
+
+    def save(self, fil, key=None):
+        '''
+        Save the node coordinates of the index to fil (npz, no pickles), key
+        identifies the input file it was built from
+        '''
+        with open(fil, 'wb') as f:
+            np.savez(f, easting=self.easting, northing=self.northing, nodes=self.nodes,
+                     zone_number=self.zone_number,
+                     key=np.array([] if key is None else key, dtype=np.float64))
+
+
+def load(fil, key=None):
+    '''
+    Load a NodeIndex saved with save (rebuilding the tree), returns None if
+    it was built from a different version (key) of the input file or fil is
+    not a saved index
+    '''
+    try:
+        saved = np.load(fil, allow_pickle=False)
+    except (ValueError, IOError, OSError):
+        return None
+    with saved:
+        if key is not None and not np.array_equal(saved['key'], np.array(key, dtype=np.float64)):
+            return None
+        return NodeIndex(saved['easting'], saved['northing'], saved['nodes'],
+                         int(saved['zone_number']))
+
+
+def node_index(path, zone_number=14, rebuild=False):
+    '''
+    Get the node spatial index of a TxBLEND run, building it from the input
+    file and persisting it in the run directory the first time
+
+    Parameters
+    ----------
+    path : string
+        path to the directory where TxBLEND was run
+    zone_number : int
+        UTM zone of the mesh (14 for most of Texas Coast, 15 for Galveston/Sabine)
+    rebuild : bool
+        if True, ignore a persisted index and rebuild it
+
+    Example
+    -------
+    import tbtools as tbt
+
+    idx = tbt.spatial.node_index(path)
+    nodes, dist = idx.nearest(easting, northing)
+    nodes = idx.within(easting, northing, 500.)
+
+    Returns
+    -------
+    index : tbtools.spatial.NodeIndex
+    '''
+    fil = os.path.join(path, 'input')
+    key = read._file_key(fil)[1:] + (zone_number,)
+    saved = os.path.join(path, INDEX_FILE)
+    if not rebuild and os.path.exists(saved):
+        index = load(saved, key)
+        if index is not None:
+            return index
+    coords = read.coords(fil, zone_number, 'utm')
+    index = NodeIndex(coords.easting.values, coords.northing.values,
+                      coords.index.values, zone_number)
+    try:
+        index.save(saved, key)
+    except (IOError, OSError):
+        print('WARNING: could not save node index to {}'.format(saved))
+    return index
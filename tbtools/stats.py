@@ -0,0 +1,202 @@
+''' Out-of-core (one pass) statistics of daily mesh node outputs '''
+
+import os
+import warnings
+import numpy as np
+import pandas as pd
+from . import read
+
+#default histogram edges of the quantile sketch (salinity, ppt)
+SALINITY_BINS = np.linspace(0, 50, 201)
+
+
+class Climatology(object):
+    '''
+    Running per-node statistics by calendar bucket (month or whole record)
+
+    Keeps counts, means and sums of squared deviations (Welford/Chan) and a
+    fixed-edge histogram per node and bucket as a quantile sketch. All of
+    them merge exactly, so partial results computed over different date
+    ranges or runs can be combined with merge.
+
+    Parameters
+    ----------
+    nodes : int
+        number of mesh nodes
+    bins : array
+        histogram edges of the quantile sketch (percentiles are resolved to
+        the bin width). Values outside the edges are counted separately, and
+        percentiles that fall among them are NaN with a warning
+        *default is SALINITY_BINS, 0-50 in steps of 0.25
+    by : string
+        'month' - one bucket per calendar month
+        'all' - a single bucket over the whole record
+
+    Example
+    -------
+    import tbtools as tbt
+
+    clim = tbt.stats.climatology(path_to_avesalD)
+    clim.mean()
+    clim.percentile(90)
+    '''
+    def __init__(self, nodes, bins=None, by='month'):
+        if by not in ['month', 'all']:
+            raise ValueError('Unknown calendar bucket {}'.format(by))
+        self.nodes = nodes
+        self.by = by
+        self.bins = np.asarray(SALINITY_BINS if bins is None else bins, dtype=np.float64)
+        nb = 12 if by == 'month' else 1
+        self.count = np.zeros((nb, nodes), dtype=np.int64)
+        self.mean_ = np.zeros((nb, nodes))
+        self.m2 = np.zeros((nb, nodes))
+        self.hist = np.zeros((nb, nodes, len(self.bins) - 1), dtype=np.uint32)
+        self.under = np.zeros((nb, nodes), dtype=np.int64)
+        self.over = np.zeros((nb, nodes), dtype=np.int64)
+
+    def _bucket(self, date):
+        return date.month - 1 if self.by == 'month' else 0
+
+    def update(self, date, values):
+        '''Add one daily block (values of every node) to the statistics'''
+        values = np.asarray(values, dtype=np.float64)
+        b = self._bucket(date)
+        ok = ~np.isnan(values)
+        v = values[ok]
+        count = self.count[b]
+        mean = self.mean_[b]
+        count[ok] += 1
+        delta = v - mean[ok]
+        mean[ok] += delta / count[ok]
+        self.m2[b, ok] += delta * (v - mean[ok])
+        nbin = len(self.bins) - 1
+        nodes = np.nonzero(ok)[0]
+        i = np.searchsorted(self.bins, v, side='right') - 1
+        #the last edge closes the last bin
+        i[v == self.bins[-1]] = nbin - 1
+        under = i < 0
+        over = i >= nbin
+        self.under[b, nodes[under]] += 1
+        self.over[b, nodes[over]] += 1
+        inside = ~(under | over)
+        #one value per node, so the flat indices are unique
+        self.hist.reshape(-1)[(b * self.nodes + nodes[inside]) * nbin + i[inside]] += 1
+        return self
+
+    def merge(self, other):
+        '''Combine the statistics of another Climatology (same nodes/bins/by) into this one'''
+        if (other.nodes != self.nodes or other.by != self.by
+                or not np.array_equal(other.bins, self.bins)):
+            raise ValueError('Cannot merge climatologies with different nodes, bins or buckets')
+        n = self.count + other.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = other.mean_ - self.mean_
+            mean = self.mean_ + delta * np.where(n > 0, other.count / n, 0)
+            m2 = self.m2 + other.m2 + np.where(n > 0, delta ** 2 * self.count * other.count / n, 0)
+        self.count = n
+        self.mean_ = mean
+        self.m2 = m2
+        self.hist += other.hist
+        self.under += other.under
+        self.over += other.over
+        return self
+
+    def _frame(self, values):
+        index = pd.Index(np.arange(1, len(values) + 1), name=self.by)
+        return pd.DataFrame(values, index=index, columns=np.arange(1, self.nodes + 1))
+
+    def mean(self):
+        '''Mean of each node (columns) by bucket (index)'''
+        return self._frame(np.where(self.count > 0, self.mean_, np.nan))
+
+    def std(self, ddof=1):
+        '''Standard deviation of each node (columns) by bucket (index)'''
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = np.where(self.count > ddof, self.m2 / (self.count - ddof), np.nan)
+        return self._frame(np.sqrt(var))
+
+    def percentile(self, q):
+        '''
+        q-th percentile (0-100) of each node (columns) by bucket (index),
+        interpolated linearly within the histogram bins. It is NaN (with a
+        warning) where it falls among values outside the bins
+        '''
+        out = np.full(self.count.shape, np.nan)
+        width = np.diff(self.bins)
+        outside = 0
+        for b in range(len(self.count)):
+            under = self.under[b]
+            cdf = under[:, None] + np.cumsum(self.hist[b], axis=1, dtype=np.int64)
+            target = q / 100. * self.count[b]
+            i = np.minimum((cdf < target[:, None]).sum(axis=1), cdf.shape[1] - 1)
+            rows = np.arange(self.nodes)
+            below = np.where(i > 0, cdf[rows, np.maximum(i - 1, 0)], under)
+            inbin = self.hist[b][rows, i]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                frac = np.where(inbin > 0, (target - below) / inbin, 0)
+            unresolved = ((under > 0) & (target <= under)) | (target > cdf[:, -1])
+            outside += (unresolved & (self.count[b] > 0)).sum()
+            out[b] = np.where((self.count[b] > 0) & ~unresolved,
+                              self.bins[i] + frac * width[i], np.nan)
+        if outside:
+            warnings.warn('{} percentiles fall outside the bins {} to {}, pass wider bins'.format(
+                outside, self.bins[0], self.bins[-1]))
+        return self._frame(out)
+
+    def exceedance(self, p):
+        '''Value exceeded p percent of the time by each node, by bucket'''
+        return self.percentile(100 - p)
+
+
+def climatology(fil, bins=None, by='month', start=None, end=None):
+    '''
+    Compute the Climatology of a velx, vely or avesalD.w file in one pass
+    over its daily blocks
+
+    Parameters
+    ----------
+    fil : string
+        File path
+    bins : array
+        histogram edges of the quantile sketch (see Climatology)
+        *required for velx/vely, the default SALINITY_BINS only suit avesalD.w
+    by : string
+        'month' or 'all'
+    start, end : string or datetime
+        only use the days in this (inclusive) range
+
+    Example
+    -------
+    import tbtools as tbt
+
+    parts = [tbt.stats.climatology(f) for f in avesalD_files]
+    clim = tbt.stats.combine(parts)
+    p90 = clim.percentile(90)
+
+    Returns
+    -------
+    clim : tbtools.stats.Climatology
+    '''
+    if bins is None and not os.path.basename(read._base(fil)).startswith('avesal'):
+        raise ValueError('bins are required for {}, the default bins are for salinity'.format(fil))
+    start = None if start is None else pd.Timestamp(start)
+    end = None if end is None else pd.Timestamp(end)
+    clim = None
+    for date, values in read.blocks(fil):
+        if (start is not None and date < start) or (end is not None and date > end):
+            continue
+        if clim is None:
+            clim = Climatology(len(values), bins, by)
+        clim.update(date, values)
+    if clim is None:
+        raise ValueError('No daily blocks in {} for the dates requested'.format(fil))
+    return clim
+
+
+def combine(parts):
+    '''Merge a list of Climatology objects (e.g. computed in parallel) into one'''
+    parts = list(parts)
+    out = Climatology(parts[0].nodes, parts[0].bins, parts[0].by)
+    for part in parts:
+        out.merge(part)
+    return out
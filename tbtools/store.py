@@ -0,0 +1,231 @@
+''' Columnar (parquet) store of converted TxBLEND outputs '''
+
+import os
+import numpy as np
+import pandas as pd
+from . import read
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pads
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+#output types and the run directory file each one is converted from
+MESH = {'avesalD': 'avesalD.w', 'velx': 'velx', 'vely': 'vely'}
+OUTPUTS = list(MESH.keys()) + ['outflw1', 'outflw2']
+
+
+def _check_pyarrow():
+    if pa is None:
+        raise ImportError('pyarrow is required for the tbtools columnar store')
+
+
+def _write(df, root, output, run, row_group_size):
+    df = df.reset_index()
+    df.columns = [str(c) for c in df.columns]
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    out_dir = os.path.join(root, output, 'run={}'.format(run))
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    pq.write_table(table, os.path.join(out_dir, 'part-0.parquet'),
+                   row_group_size=row_group_size)
+
+
+def convert(path, root, run=None, outputs=None, row_group_size=None):
+    '''
+    Convert the outputs of a TxBLEND run directory into the columnar store
+
+    Parameters
+    ----------
+    path : string
+        path to the directory where TxBLEND was run
+    root : string
+        root directory of the store
+    run : string
+        name of the run in the store
+        *default is the name of the run directory
+    outputs : list
+        output types to convert (any of 'avesalD', 'velx', 'vely', 'outflw1', 'outflw2')
+        *default converts every output found in the run directory
+    row_group_size : int
+        rows per parquet row group
+        *default is a year of rows (366 days for mesh outputs, 8784 hours otherwise)
+
+    Example
+    -------
+    import tbtools as tbt
+
+    tbt.store.convert(r'T:/path/to/run', r'T:/path/to/store', 'baseline')
+
+    Returns
+    -------
+    converted : list
+        output types written to the store
+    '''
+    _check_pyarrow()
+    if run is None:
+        run = os.path.basename(os.path.normpath(path))
+    if outputs is None:
+        outputs = OUTPUTS
+    converted = []
+    for output in outputs:
+        if output in MESH:
+            fil = os.path.join(path, MESH[output])
+            if not read._exists(fil):
+                continue
+            if output == 'avesalD':
+                df = read.avesalD(fil)
+            else:
+                df = read.vel(fil)
+            _write(df, root, output, run, row_group_size or 366)
+        elif output == 'outflw1':
+            if not read._exists(os.path.join(path, 'outflw1')):
+                continue
+            #long format sorted by node so node filters prune row groups
+            df = pd.concat(read.outflw1(path), names=['node', 'Date'])
+            df = df.reset_index()
+            df['node'] = df['node'].astype(np.int32)
+            df = df.sort_values(['node', 'Date']).set_index('Date')
+            _write(df, root, output, run, row_group_size or 8784)
+        elif output == 'outflw2':
+            if not [f for f in os.listdir(path) if f[:7] == 'outflw2']:
+                continue
+            df = read.outflw2(path)
+            df.index.name = 'Date'
+            _write(df, root, output, run, row_group_size or 8784)
+        else:
+            raise ValueError('Unknown output type {}'.format(output))
+        converted.append(output)
+    return converted
+
+
+class Dataset(object):
+    '''
+    Query interface over a store of converted TxBLEND outputs
+
+    The store is laid out as root/<output>/run=<run>/*.parquet. Run filters
+    skip whole partitions, date (and outflw1 node) filters are pushed down to
+    the row group statistics and mesh node filters only read the node columns.
+    '''
+    def __init__(self, root):
+        _check_pyarrow()
+        self.root = root
+
+    def outputs(self):
+        '''Output types available in the store'''
+        return sorted(o for o in os.listdir(self.root) if o in OUTPUTS)
+
+    def runs(self, output=None):
+        '''Runs available in the store (optionally only those with output)'''
+        outputs = self.outputs() if output is None else [output]
+        runs = set()
+        for o in outputs:
+            for d in os.listdir(os.path.join(self.root, o)):
+                if d.startswith('run='):
+                    runs.add(d[4:])
+        return sorted(runs)
+
+    def read(self, output, start=None, end=None, nodes=None, runs=None, columns=None):
+        '''
+        Read a subset of one output type from the store
+
+        Parameters
+        ----------
+        output : string
+            'avesalD', 'velx', 'vely', 'outflw1' or 'outflw2'
+        start, end : string or datetime
+            inclusive date range to read
+        nodes : int or list of ints
+            mesh nodes (avesalD/velx/vely) or check nodes (outflw1) to read
+        runs : string or list of strings
+            runs to read
+        columns : list
+            variables (outflw1) or passes (outflw2) to read
+
+        Example
+        -------
+        import tbtools as tbt
+
+        ds = tbt.dataset(r'T:/path/to/store')
+        sal = ds.read('avesalD', '2011-01-01', '2011-12-31', nodes=10505)
+
+        Returns
+        -------
+        data : DataFrame
+            index is (run, Date) - (run, node, Date) for outflw1
+            columns are the mesh nodes, variables or passes
+        '''
+        if output not in OUTPUTS:
+            raise ValueError('Unknown output type {}'.format(output))
+        part = pads.partitioning(pa.schema([('run', pa.string())]), flavor='hive')
+        dset = pads.dataset(os.path.join(self.root, output), format='parquet',
+                            partitioning=part)
+        if nodes is not None and np.ndim(nodes) == 0:
+            nodes = [nodes]
+        if runs is not None and isinstance(runs, str):
+            runs = [runs]
+
+        filt = None
+        conds = []
+        if start is not None:
+            conds.append(pads.field('Date') >= pd.Timestamp(start).to_datetime64())
+        if end is not None:
+            conds.append(pads.field('Date') <= pd.Timestamp(end).to_datetime64())
+        if runs is not None:
+            conds.append(pads.field('run').isin([str(r) for r in runs]))
+        if output == 'outflw1' and nodes is not None:
+            conds.append(pads.field('node').isin([int(n) for n in nodes]))
+        for c in conds:
+            filt = c if filt is None else filt & c
+
+        names = dset.schema.names
+        if output in MESH:
+            index = ['run', 'Date']
+            if nodes is None:
+                cols = names
+            else:
+                cols = ['Date', 'run'] + [str(n) for n in nodes]
+        elif output == 'outflw1':
+            index = ['run', 'node', 'Date']
+            cols = names if columns is None else index + list(columns)
+        else:
+            index = ['run', 'Date']
+            cols = names if columns is None else index + list(columns)
+        missing = [c for c in cols if c not in names]
+        if missing:
+            raise KeyError('Not in {} store: {}'.format(output, ', '.join(missing)))
+
+        data = dset.to_table(columns=cols, filter=filt).to_pandas()
+        data = data.set_index(index).sort_index()
+        if output in MESH:
+            data.columns = data.columns.astype(int)
+        return data
+
+
+def dataset(root):
+    '''
+    Open a columnar store of converted TxBLEND outputs for querying
+
+    Parameters
+    ----------
+    root : string
+        root directory of the store (see tbtools.store.convert)
+
+    Example
+    -------
+    >>> import tbtools as tbt
+    >>> ds = tbt.dataset(r'T:/path/to/store')
+    >>> ds.read('avesalD', '2011-01-01', '2011-12-31', nodes=10505)
+                           10505
+    run      Date
+    baseline 2011-01-01    21.43
+             2011-01-02    21.51
+    ...
+
+    Returns
+    -------
+    dataset : tbtools.store.Dataset
+    '''
+    return Dataset(root)
@@ -0,0 +1,545 @@
+''' Batched tidal harmonic analysis and low-pass filtering of check-node and pass series '''
+
+import warnings
+import numpy as np
+import pandas as pd
+from . import write
+
+#constituent speeds in degrees per hour
+SPEEDS = {
+    'M2': 28.9841042, 'S2': 30.0000000, 'N2': 28.4397295, 'K2': 30.0821373,
+    'K1': 15.0410686, 'O1': 13.9430356, 'P1': 14.9589314, 'Q1': 13.3986609,
+    'M4': 57.9682084, 'MS4': 58.9841042, 'M6': 86.9523127,
+    'Mf': 1.0980331, 'Mm': 0.5443747, 'Ssa': 0.0821373, 'Sa': 0.0410686,
+}
+#Doodson numbers (tau, s, h, p, N, p1) and phase offset (degrees) of the
+#equilibrium argument of every constituent
+DOODSON = {
+    'M2': ((2, 0, 0, 0, 0, 0), 0), 'S2': ((2, 2, -2, 0, 0, 0), 0),
+    'N2': ((2, -1, 0, 1, 0, 0), 0), 'K2': ((2, 2, 0, 0, 0, 0), 0),
+    'K1': ((1, 1, 0, 0, 0, 0), 90), 'O1': ((1, -1, 0, 0, 0, 0), -90),
+    'P1': ((1, 1, -2, 0, 0, 0), -90), 'Q1': ((1, -2, 0, 1, 0, 0), -90),
+    'M4': ((4, 0, 0, 0, 0, 0), 0), 'MS4': ((4, 2, -2, 0, 0, 0), 0),
+    'M6': ((6, 0, 0, 0, 0, 0), 0),
+    'Mf': ((0, 2, 0, 0, 0, 0), 0), 'Mm': ((0, 1, 0, -1, 0, 0), 0),
+    'Ssa': ((0, 0, 2, 0, 0, 0), 0), 'Sa': ((0, 0, 1, 0, 0, 0), 0),
+}
+#default constituents, in order of priority: a month of hourly data
+#resolves all of them but K2 (from S2) and P1 (from K1), which take about
+#182 days and are dropped from shorter records (see resolvable)
+DEFAULT = ['M2', 'S2', 'N2', 'K2', 'K1', 'O1', 'P1', 'Q1', 'M4', 'MS4', 'M6']
+
+#Rayleigh criterion: two constituents are separated by a record spanning at
+#least RAYLEIGH / (difference of their frequencies)
+RAYLEIGH = 1.
+
+
+def cube(outflw1, var='elevation'):
+    '''
+    Gather one variable of every check node of an outflw1 dictionary into
+    one DataFrame
+
+    Parameters
+    ----------
+    outflw1 : dictionary
+        as returned by read.outflw1
+    var : string
+        tide, elevation, depth, velocity, direction or salinity
+
+    Returns
+    -------
+    cube : DataFrame
+        index is datetime
+        columns are the check nodes
+    '''
+    return pd.DataFrame(dict((node, outflw1[node][var]) for node in outflw1))
+
+
+def _hours(index, epoch):
+    return (np.asarray(index, dtype='datetime64[ns]') - np.datetime64(pd.Timestamp(epoch))) \
+        / np.timedelta64(1, 'h')
+
+
+def design(index, constituents=DEFAULT, epoch=None):
+    '''
+    Least-squares design matrix [1, cos(w t), sin(w t), ...] of the
+    constituents on the times of index (hours since epoch)
+    '''
+    if epoch is None:
+        epoch = index[0]
+    t = _hours(index, epoch)
+    w = np.radians([SPEEDS[c] for c in constituents])
+    wt = t[:, None] * w[None, :]
+    A = np.empty((len(t), 1 + 2 * len(w)))
+    A[:, 0] = 1.
+    A[:, 1::2] = np.cos(wt)
+    A[:, 2::2] = np.sin(wt)
+    return A
+
+
+def resolvable(index, constituents=DEFAULT, rayleigh=RAYLEIGH):
+    '''
+    Constituents the times of index can separate by the Rayleigh criterion,
+    taken in order of priority: a constituent is kept when the record spans
+    rayleigh cycles of its frequency difference with the mean (Z0) and with
+    every constituent kept before it
+    '''
+    span = (pd.Timestamp(index[-1]) - pd.Timestamp(index[0])) / pd.Timedelta(hours=1)
+    kept = []
+    for c in constituents:
+        if all(abs(SPEEDS[c] - w) / 360. * span >= rayleigh
+               for w in [0.] + [SPEEDS[k] for k in kept]):
+            kept.append(c)
+    return kept
+
+
+def harmonic(df, constituents=DEFAULT, epoch=None, rayleigh=RAYLEIGH):
+    '''
+    Harmonic analysis of all columns of a DataFrame with one shared
+    least-squares design matrix
+
+    Columns without gaps are solved together in a single lstsq call, columns
+    with gaps are solved together with the other columns sharing their gaps.
+
+    Parameters
+    ----------
+    df : DataFrame
+        index is datetime, columns are series (e.g. tidal.cube(outflw1) or
+        read.outflw2(path))
+    constituents : list
+        constituent names (keys of tidal.SPEEDS)
+    epoch : datetime
+        time the phases are referenced to (default is the first time)
+    rayleigh : float
+        constituents the record cannot separate by this Rayleigh criterion
+        are dropped with a warning (see resolvable); None keeps them all
+
+    Example
+    -------
+    import tbtools as tbt
+
+    elev = tbt.tidal.cube(tbt.read.outflw1(path), 'elevation')
+    const = tbt.tidal.harmonic(elev)
+    const.loc['M2', ('10505', 'amplitude')]
+
+    Returns
+    -------
+    constants : DataFrame
+        index is Z0 (mean) and the resolved constituents
+        columns are (series, amplitude/phase), phase in degrees
+    '''
+    if epoch is None:
+        epoch = df.index[0]
+    if rayleigh is not None:
+        kept = resolvable(df.index, constituents, rayleigh)
+        if len(kept) < len(constituents):
+            warnings.warn('record too short to resolve {}, dropped'.format(
+                ', '.join(c for c in constituents if c not in kept)))
+        constituents = kept
+    A = design(df.index, constituents, epoch)
+    Y = df.values.astype(np.float64)
+    coef = np.full((A.shape[1], Y.shape[1]), np.nan)
+    nan = np.isnan(Y)
+    #group the columns by gap pattern, every group is one lstsq call
+    patterns = {}
+    for j in range(Y.shape[1]):
+        patterns.setdefault(nan[:, j].tobytes(), []).append(j)
+    for cols in patterns.values():
+        ok = ~nan[:, cols[0]]
+        if ok.sum() < A.shape[1]:
+            continue
+        coef[:, cols] = np.linalg.lstsq(A[ok], Y[ok][:, cols], rcond=None)[0]
+    amp = np.vstack([coef[:1], np.hypot(coef[1::2], coef[2::2])])
+    pha = np.vstack([np.zeros((1, Y.shape[1])),
+                     np.degrees(np.arctan2(coef[2::2], coef[1::2])) % 360])
+    columns = pd.MultiIndex.from_product([list(df.columns), ['amplitude', 'phase']])
+    out = np.empty((amp.shape[0], 2 * Y.shape[1]))
+    out[:, 0::2] = amp
+    out[:, 1::2] = pha
+    constants = pd.DataFrame(out, index=['Z0'] + list(constituents), columns=columns)
+    constants.attrs['epoch'] = pd.Timestamp(epoch)
+    return constants
+
+
+def predict(constants, index, epoch=None):
+    '''
+    Tide predicted from harmonic constants on the times of index
+
+    Parameters
+    ----------
+    constants : DataFrame
+        as returned by tidal.harmonic
+    index : DatetimeIndex
+        prediction times
+    epoch : datetime
+        time the phases are referenced to (default is the epoch of the analysis)
+
+    Returns
+    -------
+    tide : DataFrame
+        index is datetime
+        columns are the series
+    '''
+    if epoch is None:
+        epoch = constants.attrs.get('epoch', index[0])
+    constituents = list(constants.index[1:])
+    A = design(index, constituents, epoch)
+    series = constants.columns.get_level_values(0)[::2]
+    amp = constants.xs('amplitude', axis=1, level=1).values
+    pha = np.radians(constants.xs('phase', axis=1, level=1).values)
+    coef = np.empty((A.shape[1], amp.shape[1]))
+    coef[0] = amp[0]
+    coef[1::2] = amp[1:] * np.cos(pha[1:])
+    coef[2::2] = amp[1:] * np.sin(pha[1:])
+    return pd.DataFrame(A.dot(coef), index=index, columns=series)
+
+
+def _step_hours(index):
+    return np.median(np.diff(np.asarray(index, dtype='datetime64[ns]'))) / np.timedelta64(1, 'h')
+
+
+def _convolve(values, weights):
+    '''
+    Centered convolution of every column of values with weights by FFT,
+    outputs whose window touches a gap or the ends are NaN
+    '''
+    n = values.shape[0]
+    m = len(weights)
+    nan = np.isnan(values)
+    size = 1 << int(np.ceil(np.log2(n + m - 1)))
+    fw = np.fft.rfft(weights, size)
+    full = np.fft.irfft(np.fft.rfft(np.where(nan, 0., values), size, axis=0) * fw[:, None],
+                        size, axis=0)
+    bad = np.fft.irfft(np.fft.rfft(nan.astype(np.float64), size, axis=0)
+                       * np.fft.rfft(np.ones(m), size)[:, None], size, axis=0)
+    h = (m - 1) // 2
+    out = full[h:h + n]
+    out[bad[h:h + n] > 0.5] = np.nan
+    out[:h] = np.nan
+    out[n - (m - 1 - h):] = np.nan
+    return out
+
+
+def _frame(df, values):
+    return pd.DataFrame(values, index=df.index, columns=df.columns)
+
+
+def godin(df):
+    '''
+    Godin low-pass filter (24, 24 and 25 hour running means) of all columns
+
+    Parameters
+    ----------
+    df : DataFrame
+        equally spaced series, index is datetime
+
+    Returns
+    -------
+    subtidal : DataFrame
+        filtered series, NaN within a window of the ends or gaps
+    '''
+    step = _step_hours(df.index)
+    w = np.ones(1)
+    for hours in [24, 24, 25]:
+        n = int(round(hours / step))
+        w = np.convolve(w, np.ones(n) / n)
+    return _frame(df, _convolve(df.values.astype(np.float64), w))
+
+
+def lanczos(df, cutoff=40., window=None):
+    '''
+    Lanczos low-pass filter of all columns
+
+    Parameters
+    ----------
+    df : DataFrame
+        equally spaced series, index is datetime
+    cutoff : float
+        cutoff period in hours
+    window : int
+        half width of the filter in time steps (default is one cutoff period)
+
+    Returns
+    -------
+    subtidal : DataFrame
+        filtered series, NaN within a window of the ends or gaps
+    '''
+    step = _step_hours(df.index)
+    fc = step / cutoff
+    if window is None:
+        window = int(round(cutoff / step))
+    k = np.arange(-window, window + 1)
+    w = 2 * fc * np.sinc(2 * fc * k) * np.sinc(k / float(window + 1))
+    w /= w.sum()
+    return _frame(df, _convolve(df.values.astype(np.float64), w))
+
+
+def separate(df, method='godin', **kwargs):
+    '''
+    Split all columns into subtidal (low-passed) and tidal (remainder) signals
+
+    Parameters
+    ----------
+    df : DataFrame
+        equally spaced series (e.g. tidal.cube(outflw1) or read.outflw2(path))
+    method : string
+        'godin' or 'lanczos' (keyword arguments are passed to the filter)
+
+    Example
+    -------
+    import tbtools as tbt
+
+    flow = tbt.tidal.separate(tbt.read.outflw2(path), 'lanczos', cutoff=40)
+    flow['subtidal']
+
+    Returns
+    -------
+    signals : DataFrame
+        index is datetime
+        columns are (subtidal/tidal, series)
+    '''
+    if method == 'godin':
+        sub = godin(df)
+    elif method == 'lanczos':
+        sub = lanczos(df, **kwargs)
+    else:
+        raise ValueError('Unknown filter {}'.format(method))
+    return pd.concat({'subtidal': sub, 'tidal': df - sub}, axis=1)
+
+
+def astro(times):
+    '''
+    Astronomical arguments (degrees) at times (UT): tau (mean lunar time), s
+    (moon), h (sun), p (lunar perigee), N (lunar node) and p1 (solar perigee)
+
+    Returns
+    -------
+    args : array
+        (times x 6)
+    '''
+    t = np.asarray(times, dtype='datetime64[ns]')
+    days = (t - np.datetime64('2000-01-01T12:00')) / np.timedelta64(1, 'D')
+    T = days / 36525.
+    hours = (t - t.astype('datetime64[D]')) / np.timedelta64(1, 'h')
+    s = 218.3164477 + 481267.88123421 * T
+    h = 280.46646 + 36000.76983 * T
+    p = 83.3532465 + 4069.0137287 * T
+    N = 125.04452 - 1934.136261 * T
+    p1 = 282.93735 + 1.71946 * T
+    tau = 180. + 15. * hours + h - s
+    return np.column_stack([tau, s, h, p, N, p1])
+
+
+def nodal(N, constituents):
+    '''
+    Nodal amplitude factors f and phase corrections u (degrees) of the
+    constituents for lunar node longitudes N (degrees)
+
+    Returns
+    -------
+    f, u : arrays
+        (len(N) x constituents)
+    '''
+    N = np.radians(np.atleast_1d(N))[:, None]
+    c1, c2, c3 = np.cos(N), np.cos(2 * N), np.cos(3 * N)
+    s1, s2, s3 = np.sin(N), np.sin(2 * N), np.sin(3 * N)
+    fm2 = 1.0004 - 0.0373 * c1 + 0.0002 * c2
+    um2 = -2.14 * s1
+    one = np.ones_like(c1)
+    zero = np.zeros_like(c1)
+    fu = {
+        'M2': (fm2, um2), 'N2': (fm2, um2),
+        'K2': (1.0241 + 0.2863 * c1 + 0.0083 * c2 - 0.0015 * c3,
+               -17.74 * s1 + 0.68 * s2 - 0.04 * s3),
+        'K1': (1.0060 + 0.1150 * c1 - 0.0088 * c2 + 0.0006 * c3,
+               -8.86 * s1 + 0.68 * s2 - 0.07 * s3),
+        'O1': (1.0089 + 0.1871 * c1 - 0.0147 * c2 + 0.0014 * c3,
+               10.80 * s1 - 1.34 * s2 + 0.19 * s3),
+        'M4': (fm2 ** 2, 2 * um2), 'MS4': (fm2, um2), 'M6': (fm2 ** 3, 3 * um2),
+        'Mf': (1.043 + 0.414 * c1, -23.7 * s1 + 2.7 * s2 - 0.4 * s3),
+        'Mm': (1.000 - 0.130 * c1, zero),
+    }
+    fu['Q1'] = fu['O1']
+    f = np.hstack([fu.get(c, (one, zero))[0] for c in constituents])
+    u = np.hstack([fu.get(c, (one, zero))[1] for c in constituents])
+    return f, u
+
+
+def greenwich(constants, series=None, corrections=True, utc_offset=0.):
+    '''
+    Convert the constants of tidal.harmonic (phases relative to the analysis
+    epoch, amplitudes including the nodal factor) into amplitudes and
+    Greenwich phase lags, as used by synthesize
+
+    The nodal corrections are evaluated at the analysis epoch and the mean
+    (Z0) is dropped (pass it to synthesize as datum to keep it)
+
+    Parameters
+    ----------
+    constants : DataFrame
+        as returned by tidal.harmonic
+    series : string
+        series (column) to convert (default is the only one)
+    corrections : bool
+        if True, remove the nodal corrections (f, u) at the epoch
+    utc_offset : float
+        hours the analysed times are ahead of UT (e.g. -6 for CST)
+
+    Example
+    -------
+    import tbtools as tbt
+
+    const = tbt.tidal.harmonic(elev)
+    g = tbt.tidal.greenwich(const, '10505')
+    tbt.tidal.write_tide('tide', g, '2020-01-01', '2020-12-31',
+                         datum=const.loc['Z0', ('10505', 'amplitude')])
+
+    Returns
+    -------
+    constants : DataFrame
+        index is the constituents
+        columns are amplitude and phase (Greenwich phase lag in degrees)
+    '''
+    names = list(constants.columns.get_level_values(0).unique())
+    if series is None:
+        if len(names) != 1:
+            raise ValueError('series is required, the constants have {} series'.format(len(names)))
+        series = names[0]
+    if 'epoch' not in constants.attrs:
+        raise ValueError('constants have no analysis epoch (see tidal.harmonic)')
+    df = constants[series].drop('Z0', errors='ignore')
+    unknown = [c for c in df.index if c not in DOODSON]
+    if unknown:
+        raise ValueError('Unknown constituents: {}'.format(', '.join(unknown)))
+    epoch = np.datetime64(pd.Timestamp(constants.attrs['epoch']), 'ns')
+    args = astro([epoch - np.timedelta64(int(round(utc_offset * 3600)), 's')])
+    V0 = args.dot(np.array([DOODSON[c][0] for c in df.index], dtype=np.float64).T) \
+        + np.array([DOODSON[c][1] for c in df.index])
+    if corrections:
+        f, u = nodal(args[:, 4], list(df.index))
+    else:
+        f, u = 1., 0.
+    amp = df['amplitude'].values / np.ravel(f)
+    pha = (df['phase'].values + np.ravel(V0 + u)) % 360
+    return pd.DataFrame({'amplitude': amp, 'phase': pha}, index=df.index)
+
+
+def _constants(constants, corrections=True, utc_offset=0.):
+    '''(names, amplitudes, phases) from a DataFrame/dictionary of constants'''
+    if isinstance(constants, pd.DataFrame):
+        if isinstance(constants.columns, pd.MultiIndex):
+            constants = greenwich(constants, None, corrections, utc_offset)
+        constants = dict((c, (constants.loc[c, 'amplitude'], constants.loc[c, 'phase']))
+                         for c in constants.index if c != 'Z0')
+    names = [c for c in constants if c in DOODSON]
+    unknown = [c for c in constants if c not in DOODSON]
+    if unknown:
+        raise ValueError('Unknown constituents: {}'.format(', '.join(unknown)))
+    amp = np.array([constants[c][0] for c in names], dtype=np.float64)
+    pha = np.array([constants[c][1] for c in names], dtype=np.float64)
+    return names, amp, pha
+
+
+def synthesize(constants, start, end, datum=0., step=2, corrections=True,
+               utc_offset=0., chunk_days=366):
+    '''
+    Evaluate a tide from harmonic constituents on an equally spaced time grid,
+    all constituents at once, one chunk of days at a time
+
+    Parameters
+    ----------
+    constants : dictionary or DataFrame
+        constituent -> (amplitude, Greenwich phase lag in degrees), a
+        DataFrame indexed by constituent with amplitude and phase columns,
+        or the output of tidal.harmonic for one series (converted with
+        tidal.greenwich, its mean Z0 is not added, pass it as datum)
+    start, end : string or datetime
+        first and last day (inclusive) of the record
+    datum : float
+        offset added to the tide (e.g. mean sea level or sea level rise)
+    step : int
+        hours between values (2 for the bihourly TxBLEND tide file)
+    corrections : bool
+        if True, apply the nodal corrections (f, u)
+    utc_offset : float
+        hours the record times are ahead of UT (e.g. -6 for CST)
+    chunk_days : int
+        days evaluated at once
+
+    Example
+    -------
+    import tbtools as tbt
+
+    const = {'M2': (0.45, 230.1), 'K1': (0.38, 312.5), 'O1': (0.36, 302.0)}
+    for times, tide in tbt.tidal.synthesize(const, '2020-01-01', '2069-12-31', datum=1.5):
+        ...
+
+    Returns
+    -------
+    chunks : generator
+        yields (times, values) for every chunk, times is datetime64 array
+    '''
+    names, amp, pha = _constants(constants, corrections, utc_offset)
+    doodson = np.array([DOODSON[c][0] for c in names], dtype=np.float64)
+    offset = np.array([DOODSON[c][1] for c in names], dtype=np.float64)
+    first = np.datetime64(pd.Timestamp(start).normalize(), 'D')
+    last = np.datetime64(pd.Timestamp(end).normalize(), 'D')
+    per_day = int(24 // step)
+    steps = (np.arange(per_day) * step).astype('timedelta64[h]')
+    shift = np.timedelta64(int(round(utc_offset * 3600)), 's')
+    day = first
+    while day <= last:
+        days = np.arange(day, min(day + chunk_days, last + 1), dtype='datetime64[D]')
+        times = (days.astype('datetime64[h]')[:, None] + steps[None, :]).ravel()
+        args = astro(times - shift)
+        V = args.dot(doodson.T) + offset
+        if corrections:
+            f, u = nodal(args[:, 4], names)
+        else:
+            f, u = 1., 0.
+        values = datum + (f * amp * np.cos(np.radians(V + u - pha))).sum(axis=1)
+        yield times, values
+        day = days[-1] + 1
+
+
+def write_tide(out_path, constants, start, end, datum=0., label='tide',
+               corrections=True, utc_offset=0., chunk_days=366):
+    '''
+    Synthesize a bihourly tide from harmonic constituents and stream it
+    straight into a TxBLEND tide input file (see write.tide)
+
+    Parameters
+    ----------
+    out_path : string
+        location where the file will be saved plus file name
+    constants : dictionary or DataFrame
+        constituent -> (amplitude, Greenwich phase lag in degrees)
+    start, end : string or datetime
+        first and last day (inclusive) of the record
+    datum : float
+        offset added to the tide (e.g. mean sea level or sea level rise)
+    label : string
+        station label written on every row
+    corrections : bool
+        if True, apply the nodal corrections (f, u)
+    utc_offset : float
+        hours the record times are ahead of UT (e.g. -6 for CST)
+    chunk_days : int
+        days evaluated and written at once
+
+    Example
+    -------
+    import tbtools as tbt
+
+    tbt.tidal.write_tide('tide_slr', const, '2020-01-01', '2069-12-31', datum=1.5)
+
+    Returns
+    -------
+    None
+    '''
+    fout = open(out_path, 'w')
+    for times, values in synthesize(constants, start, end, datum, 2, corrections,
+                                    utc_offset, chunk_days):
+        dates = pd.DatetimeIndex(times[::12])
+        write.tide_rows(fout, dates, values.reshape(-1, 12), label)
+    fout.close()
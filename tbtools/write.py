@@ -63,19 +63,40 @@ def tide(df, out_path):
     -------
     None
     '''
-    fout = open(out_path,'w')
     col = df.columns[0]
-    for i in range(0,len(df),12):
-        fout.write('%3i%3i%6.2f%6.2f%6.2f%6.2f%6.2f%6.2f'
-                   '%6.2f%6.2f%6.2f%6.2f%6.2f%6.2f%6i %-8s\n' % 
-                  (df.index[i].month,df.index[i].day,
-                   df[col][i],df[col][i+1],
-                   df[col][i+2],df[col][i+3],
-                   df[col][i+4],df[col][i+5],
-                   df[col][i+6],df[col][i+7],
-                   df[col][i+8],df[col][i+9],
-                   df[col][i+10],df[col][i+11],
-                   df.index[i].year,col))
+    fout = open(out_path,'w')
+    tide_rows(fout, df.index[::12], df[col].values.reshape(-1, 12), col)
     fout.close()
-    
-    
\ No newline at end of file
+
+
+def tide_rows(fout, dates, values, label):
+    '''
+    Write daily rows of bihourly values in the TxBLEND tide input format
+    to an open file, so long records can be streamed a chunk at a time
+
+    Parameters
+    ----------
+    fout : file
+        open file to write to
+    dates : sequence of datetimes
+        date of each row
+    values : array
+        (rows x 12) bihourly values starting at hour 0
+    label : string
+        station label written at the end of every row
+
+    Example
+    -------
+    import tbtools as tbt
+
+    with open('desired/output/path', 'w') as fout:
+        for dates, values in chunks:
+            tbt.write.tide_rows(fout, dates, values, 'Galves')
+
+    Returns
+    -------
+    None
+    '''
+    fmt = '%3i%3i' + '%6.2f' * 12 + '%6i %-8s\n'
+    fout.write(''.join(fmt % ((d.month, d.day) + tuple(v) + (d.year, label))
+                       for d, v in zip(dates, values)))
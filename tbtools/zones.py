@@ -0,0 +1,219 @@
+''' Area-weighted aggregation of mesh node outputs over zones (bay segments) '''
+
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+from . import read, interp
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+
+def _inside(x, y, poly):
+    '''Even-odd test of points (x, y) against polygon vertices poly (n x 2)'''
+    poly = np.asarray(poly, dtype=np.float64)
+    inside = np.zeros(len(x), dtype=bool)
+    x1, y1 = poly[-1]
+    for x2, y2 in poly:
+        cross = (y1 > y) != (y2 > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xc = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        inside ^= cross & (x < xc)
+        x1, y1 = x2, y2
+    return inside
+
+
+def weights(xy, tri, zones):
+    '''
+    Build the (zone x node) area weighting matrix
+
+    Every element is assigned to the zone holding its centroid. Its area is
+    split equally between its three corner nodes (exact for the linear
+    element field), and each zone row is normalized to sum to one.
+
+    Parameters
+    ----------
+    xy : array
+        (nodes x 2) node coordinates (UTM)
+    tri : array
+        (elements x 3) zero based node positions of the element corners
+    zones : dict
+        zone name -> polygon vertices (n x 2) or list of polygons, in UTM
+
+    Returns
+    -------
+    weights : scipy.sparse.csr_matrix
+        (zone x node) weights
+    area : array
+        mesh area of each zone
+    '''
+    if sparse is None:
+        raise ImportError('scipy is required for zone aggregation')
+    corners = xy[tri]
+    cx, cy = corners.mean(axis=1).T
+    area = 0.5 * np.abs((corners[:, 1, 0] - corners[:, 0, 0]) * (corners[:, 2, 1] - corners[:, 0, 1])
+                        - (corners[:, 2, 0] - corners[:, 0, 0]) * (corners[:, 1, 1] - corners[:, 0, 1]))
+    rows = []
+    cols = []
+    vals = []
+    zone_area = np.zeros(len(zones))
+    for i, name in enumerate(zones):
+        polys = zones[name]
+        if np.ndim(polys[0]) == 1:
+            polys = [polys]
+        mask = np.zeros(len(tri), dtype=bool)
+        for poly in polys:
+            mask |= _inside(cx, cy, poly)
+        zone_area[i] = area[mask].sum()
+        if zone_area[i] == 0:
+            print('WARNING: no elements in zone {}'.format(name))
+            continue
+        rows.append(np.full(3 * mask.sum(), i))
+        cols.append(tri[mask].ravel())
+        vals.append(np.repeat(area[mask] / 3. / zone_area[i], 3))
+    if rows:
+        rows, cols, vals = np.concatenate(rows), np.concatenate(cols), np.concatenate(vals)
+    w = sparse.csr_matrix((vals, (rows, cols)), shape=(len(zones), len(xy)))
+    w.sum_duplicates()
+    return w, zone_area
+
+
+class ZoneOperator(object):
+    '''
+    Cached (zone x node) area weighting operator
+
+    Parameters
+    ----------
+    weights : scipy.sparse matrix
+        (zone x node) weights
+    names : list
+        zone names
+    area : array
+        mesh area of each zone
+    '''
+    def __init__(self, weights, names, area):
+        self.weights = weights.tocsr()
+        self.names = list(names)
+        self.area = np.asarray(area)
+
+    def __call__(self, data):
+        '''
+        Zone averages of node values, a single day (nodes) or a
+        (days x nodes) DataFrame/array such as read.avesalD returns
+        '''
+        index = data.index if isinstance(data, pd.DataFrame) else None
+        values = np.asarray(data)
+        if values.ndim == 1:
+            out = self.weights.dot(values)
+            out[self.area == 0] = np.nan
+            return pd.Series(out, index=self.names)
+        out = self.weights.dot(values.T).T
+        out[:, self.area == 0] = np.nan
+        return pd.DataFrame(out, index=index, columns=self.names)
+
+    def series(self, fil, fil_y=None):
+        '''
+        Zone average time series of a velx, vely or avesalD.w file, read one
+        daily block at a time so memory does not grow with the number of nodes
+
+        Parameters
+        ----------
+        fil : string
+            File path
+        fil_y : string
+            File path to vely - if given, fil is velx and the zone averages are
+            of the current speed sqrt(velx**2 + vely**2)
+
+        Returns
+        -------
+        series : DataFrame
+            index is datetime
+            columns are the zones
+        '''
+        if fil_y is None:
+            stream = read.blocks(fil)
+        else:
+            stream = read._speed(fil, fil_y)
+        dates = []
+        out = []
+        for date, values in stream:
+            dates.append(date)
+            out.append(self.weights.dot(values))
+        out = np.array(out).reshape(len(dates), len(self.names))
+        out[:, self.area == 0] = np.nan
+        return pd.DataFrame(out, index=pd.DatetimeIndex(dates, name='Date'),
+                            columns=self.names)
+
+    def save(self, fil, key=''):
+        '''Save the operator to fil (npz)'''
+        w = self.weights
+        #written through a handle so np.savez does not append .npz to fil
+        with open(fil, 'wb') as f:
+            np.savez(f, data=w.data, indices=w.indices, indptr=w.indptr, nodes=w.shape[1],
+                     names=np.array(self.names, dtype=str), area=self.area, key=np.array(key))
+
+
+def load(fil, key=None):
+    '''
+    Load a ZoneOperator saved with ZoneOperator.save, returns None if it was
+    saved with a different key
+    '''
+    saved = np.load(fil)
+    if key is not None and str(saved['key']) != key:
+        return None
+    names = saved['names'].tolist()
+    w = sparse.csr_matrix((saved['data'], saved['indices'], saved['indptr']),
+                          shape=(len(names), int(saved['nodes'])))
+    return ZoneOperator(w, names, saved['area'])
+
+
+def operator(fil, zones, cache=None):
+    '''
+    Build the zone aggregation operator of a mesh
+
+    Parameters
+    ----------
+    fil : string
+        File path to TxBLEND input file
+    zones : dict
+        zone name -> polygon vertices (n x 2) or list of polygons, in UTM
+        (same units as read.coords 'utm')
+    cache : string
+        npz file the operator is saved to and reused from (rebuilt when the
+        input file or the zones change)
+
+    Example
+    -------
+    import tbtools as tbt
+
+    op = tbt.zones.operator(fil, {'upper': upper_poly, 'lower': lower_poly}, 'zones.npz')
+    sal = op.series(path_to_avesalD)
+    spd = op.series(path_to_velx, path_to_vely)
+
+    Returns
+    -------
+    operator : tbtools.zones.ZoneOperator
+    '''
+    h = hashlib.sha1()
+    h.update(repr(read._file_key(fil)[1:]).encode())
+    for name in zones:
+        h.update(repr(name).encode())
+        polys = zones[name]
+        if np.ndim(polys[0]) == 1:
+            polys = [polys]
+        for poly in polys:
+            h.update(np.ascontiguousarray(poly, dtype=np.float64).tobytes())
+    key = h.hexdigest()
+    if cache is not None and os.path.exists(cache):
+        op = load(cache, key)
+        if op is not None:
+            return op
+    xy, tri = interp.mesh(fil)
+    w, area = weights(xy, tri, zones)
+    op = ZoneOperator(w, list(zones), area)
+    if cache is not None:
+        op.save(cache, key)
+    return op
@@ -0,0 +1,27 @@
+import os
+import sys
+import datetime as dt
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def write_daily(fil, start, values, name='salinity'):
+    '''Write a (days x nodes) array in the velx/vely/avesalD.w block format'''
+    with open(fil, 'w') as f:
+        for k, row in enumerate(values):
+            d = start + dt.timedelta(days=k)
+            f.write(' Average {} for Year: {} Month: {} Day: {}\n'.format(name, d.year, d.month, d.day))
+            for i in range(0, len(row), 8):
+                f.write(''.join('{:10.4f}'.format(v) for v in row[i:i + 8]) + '\n')
+
+
+@pytest.fixture
+def daily(tmp_path):
+    '''Factory of daily block files in tmp_path'''
+    def make(name, values, start=dt.date(2001, 1, 1)):
+        fil = str(tmp_path / name)
+        write_daily(fil, start, np.asarray(values))
+        return fil
+    return make
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from tbtools import read
+
+#longer than one chunk of the aggregating readers, crossing a year end
+HOURS = read.AGG_CHUNK + 24 * 40
+START = pd.Timestamp(2001, 1, 1)
+
+
+def _hours():
+    return pd.date_range(START, periods=HOURS, freq='h')
+
+
+def write_outflw1(path, nodes=('10505', '2211')):
+    '''Write an input file and an hourly outflw1 (old format - no year)'''
+    (path / 'input').write_text('  1,  1,2001, starting date of simulation\n')
+    rng = np.random.default_rng(0)
+    with open(str(path / 'outflw1'), 'w') as f:
+        for i in range(5):
+            f.write('header\n')
+        for t in _hours():
+            for node in nodes:
+                v = rng.normal(5., 2., 6).round(2)
+                f.write('{:02d} {:02d} {:d}.0 {} {:.2f} {:.2f} {:.2f} {:.2f} DIR {:.2f} {:.2f}\n'.format(
+                    t.month, t.day, t.hour, node, *v))
+            f.write('\n')
+
+
+def write_outflw2(path):
+    '''Write an output file and two hourly outflw2 files (one running an hour past the end)'''
+    end = _hours()[-1]
+    (path / 'output').write_text('stuff\nMNTH1= {} DAY1= {} YEAR1= {}\nMNTH2= {} DAY2= {} YEAR2= {}\n'.format(
+        START.month, START.day, START.year, end.month, end.day, end.year))
+    rng = np.random.default_rng(1)
+    for name, passes, extra in [('outflw2a', ['PASS1', 'PASS2'], 0), ('outflw2b', ['PASS3'], 1)]:
+        with open(str(path / name), 'w') as f:
+            for i in range(6):
+                f.write('header\n')
+            f.write('MO DA HR ' + ' '.join(passes) + '\n')
+            for t in pd.date_range(START, periods=HOURS + extra, freq='h'):
+                v = rng.normal(100., 50., len(passes)).round(1)
+                f.write('{} {} {} '.format(t.month, t.day, t.hour) + ' '.join('{:.1f}'.format(x) for x in v) + '\n')
+
+
+def test_outflw1_daily_means_match_resample(tmp_path):
+    write_outflw1(tmp_path)
+    hourly = read.outflw1(str(tmp_path))
+    daily = read.outflw1(str(tmp_path), agg={'freq': 'D', 'how': 'mean'})
+    assert sorted(daily) == sorted(hourly) == ['10505', '2211']
+    for node in hourly:
+        assert len(hourly[node]) == HOURS
+        pdt.assert_frame_equal(daily[node], hourly[node].resample('D').mean(), check_freq=False)
+
+
+def test_outflw1_many_statistics(tmp_path):
+    write_outflw1(tmp_path, nodes=('10505',))
+    hourly = read.outflw1(str(tmp_path))['10505']
+    daily = read.outflw1(str(tmp_path), agg={'freq': 'D', 'how': ['max', 'min', 'std']})['10505']
+    for h in ['max', 'min', 'std']:
+        pdt.assert_frame_equal(daily[h], hourly.resample('D').agg(h), check_freq=False)
+
+
+def test_outflw2_means_match_resample(tmp_path):
+    write_outflw2(tmp_path)
+    hourly = read.outflw2(str(tmp_path))
+    assert len(hourly) == HOURS
+    daily = read.outflw2(str(tmp_path), agg={'freq': 'D', 'how': 'mean'})
+    pdt.assert_frame_equal(daily, hourly.resample('D').mean(), check_freq=False)
+    monthly = read.outflw2(str(tmp_path), agg={'freq': 'M', 'how': ['mean', 'sum', 'count']})
+    assert list(monthly.columns.get_level_values(1)[:3]) == ['PASS1', 'PASS2', 'PASS3']
+    for h in ['mean', 'sum', 'count']:
+        pdt.assert_frame_equal(monthly[h], hourly.resample('MS').agg(h),
+                               check_freq=False, check_dtype=False)
+
+
+def test_unknown_statistic(tmp_path):
+    write_outflw2(tmp_path)
+    with pytest.raises(ValueError, match='Unknown statistic'):
+        read.outflw2(str(tmp_path), agg={'freq': 'D', 'how': 'median'})
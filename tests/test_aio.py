@@ -0,0 +1,27 @@
+import asyncio
+import threading
+
+from tbtools import aio
+
+
+def test_request_after_last_waiter_cancels_starts_a_new_parse():
+    release = threading.Event()
+
+    def slow(fil):
+        release.wait(5)
+        return fil
+
+    async def main():
+        a = asyncio.ensure_future(aio._parse(slow, 'run'))
+        await asyncio.sleep(0)
+        #a gives up and b arrives in the same tick, before the cancelled
+        #parse's done callbacks run
+        a.cancel()
+        b = asyncio.ensure_future(aio._parse(slow, 'run'))
+        release.set()
+        result = await asyncio.wait_for(b, 5)
+        assert a.cancelled()
+        return result
+
+    assert asyncio.run(main()) == 'run'
+    assert not aio._inflight
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from tbtools import proj
+from tbtools.ptrac import archive, read as pread
+from test_coords import write_input
+
+DATES = pd.date_range('2010-06-01', periods=5, freq=pd.Timedelta(minutes=30))
+COUNTS = [3, 2]
+
+
+def _positions(path, block, with_pnum=None):
+    rows = []
+    for t, date in enumerate(DATES):
+        for k in range(COUNTS[block]):
+            p = 100 * block + k + 1
+            rows.append((date, p, 10. * p + t, 5. * p - t))
+    return pd.DataFrame(rows, columns=['date', 'particle', 'x', 'y'])
+
+
+def test_particle_files_of_different_lengths(tmp_path, monkeypatch):
+    for fil in pread.FILES[:len(COUNTS)]:
+        (tmp_path / fil).write_text('')
+    monkeypatch.setattr(pread, 'dates', lambda path: DATES)
+    monkeypatch.setattr(pread, 'origin', lambda path, zone_number: (1000., 2000.))
+    monkeypatch.setattr(pread, '_with_pnum', lambda path: True)
+    monkeypatch.setattr(pread, 'positions', _positions)
+    out = archive.write(str(tmp_path), str(tmp_path / 'run.npz'), 14, chunk=2)
+    trk = archive.load(out)
+    assert list(trk.particles) == [1, 2, 3, 101, 102]
+    x, y = trk.read(particles=[102, 3, 1], out='offset')
+    assert np.allclose(x[102], 1020. + np.arange(5))
+    assert np.allclose(x[3], 30. + np.arange(5))
+    assert np.allclose(y[1], 5. - np.arange(5))
+
+
+def _run(path, rows, with_pnum=True):
+    '''ptrac run directory with the test_coords mesh and one particle file'''
+    write_input(str(path / 'input'))
+    (path / 'input.Ptrac').write_text('header\n2010, release year\n6, month\n1, day\n')
+    with open(str(path / 'particles1.w'), 'w') as f:
+        for p, when, x, y in rows:
+            date = pd.Timestamp(when).strftime('%Y %m %d %H:%M')
+            if with_pnum:
+                f.write('{:5d} {} {:12.3f} {:12.3f}\n'.format(p, date, x, y))
+            else:
+                f.write('{} {:12.3f} {:12.3f} 0 0 0 0\n'.format(date, x, y))
+
+
+def test_archive_of_a_real_run(tmp_path):
+    #particle 2 has no position at 00:30, and nothing is written after 01:00
+    _run(tmp_path, [(1, '2010-06-01 00:00', 100., 200.), (2, '2010-06-01 00:00', 300., 400.),
+                    (1, '2010-06-01 00:30', 110., 210.),
+                    (1, '2010-06-01 01:00', 120., 220.), (2, '2010-06-01 01:00', 320., 420.)])
+    out = archive.write(str(tmp_path), str(tmp_path / 'release.cache'), 14, chunk=2)
+    assert out == str(tmp_path / 'release.cache')
+    with archive.load(out) as trk:
+        assert len(trk.time) == 28 * 48 + 1
+        assert list(trk.particles) == [1, 2]
+        assert trk.origin == (650000., 3100000.)
+        x, y = trk.read(out='offset')
+        lon, lat = trk.read('2010-06-01 00:00', '2010-06-01 01:00')
+    assert trk._npz.fid is None
+    assert np.allclose(x[1].values[:3], [100., 110., 120.])
+    assert np.allclose(y[2].values[[0, 2]], [400., 420.])
+    assert np.isnan(x[2].values[1]) and np.isnan(y[2].values[1])
+    assert x.iloc[3:].isna().all().all()
+    lat_, lon_ = proj.transformer(14, 'R').to_latlon(650000. + x.values[:3].ravel(),
+                                                     3100000. + y.values[:3].ravel())
+    assert np.allclose(lon.values.ravel(), lon_, equal_nan=True)
+    assert np.allclose(lat.values.ravel(), lat_, equal_nan=True)
+    assert np.isnan(lon.loc['2010-06-01 00:30', 2])
+
+
+def test_particle_files_without_numbers(tmp_path):
+    rows = [(p, when, float(p), -float(p)) for when in ['2010-06-01 00:00', '2010-06-01 00:30']
+            for p in range(1, 101)]
+    _run(tmp_path, rows, with_pnum=False)
+    assert not pread._with_pnum(str(tmp_path))
+    with archive.load(archive.write(str(tmp_path), str(tmp_path / 'run.npz'), 14)) as trk:
+        assert list(trk.particles) == list(range(1, 101))
+        x, y = trk.read(end='2010-06-01 00:30', particles=[7, 42], out='offset')
+    assert np.allclose(x.values, [[7., 42.]] * 2)
+    assert np.allclose(y.values, [[-7., -42.]] * 2)
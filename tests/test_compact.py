@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import tbtools as tbt
+from test_coords import write_input
+from test_rows import write_rows
+from test_read import write_pcp
+
+
+@pytest.mark.parametrize('compact, dtype', [(False, np.float64), (True, np.float32)])
+def test_row_readers(tmp_path, compact, dtype):
+    fil = str(tmp_path / 'tide')
+    write_rows(fil, [[1, d] + [0.25] * 12 + [2001, 'Galves'] for d in range(1, 4)])
+    assert (tbt.read.tide(fil, compact).dtypes == dtype).all()
+    assert (tbt.read.gensal(fil, compact).dtypes == dtype).all()
+    fil = str(tmp_path / 'wind')
+    write_rows(fil, [[2001, 1, 1, 101, 1] + [9] * 24, [2001, 1, 1, 101, 2] + [3.5] * 24])
+    assert (tbt.read.wind(fil, compact).dtypes == dtype).all()
+    fil = str(tmp_path / 'a.pcp')
+    write_pcp(fil, 'W1', [(2001, 1)], 1.)
+    assert (tbt.read.pcp_many([fil], compact=compact).dtypes == dtype).all()
+
+
+@pytest.mark.parametrize('compact, dtype', [(False, np.float64), (True, np.float32)])
+def test_daily_readers(daily, compact, dtype):
+    fil = daily('avesalD.w', np.full((3, 10), 12.5))
+    sal = tbt.read.avesalD(fil, compact)
+    assert (sal.dtypes == dtype).all()
+    assert sal.shape == (3, 10)
+    assert sal.values[0, 0] == 12.5
+    if compact:
+        assert sal.columns.dtype == np.int32
+    assert all(values.dtype == dtype for date, values in tbt.read.blocks(fil, compact))
+    assert tbt.read.read_days(fil, compact=compact)[1].dtype == dtype
+
+
+def test_coords(tmp_path):
+    fil = str(tmp_path / 'input')
+    write_input(fil)
+    utm, ll = tbt.read.coords(fil, 14, 'both', compact=True)
+    assert (ll.dtypes == np.float32).all()
+    assert ll.index.dtype == np.int32
+    #UTM coordinates keep float64 precision
+    assert (utm.dtypes == np.float64).all()
+    full = tbt.read.coords(fil, 14, 'll')
+    assert (full.dtypes == np.float64).all()
+    assert np.allclose(ll.values, full.values, atol=1e-5)
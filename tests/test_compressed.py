@@ -0,0 +1,58 @@
+import bz2
+import gzip
+import lzma
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import tbtools as tbt
+from conftest import write_daily
+from test_rows import write_rows
+
+OPEN = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+def _compress(fil, ext):
+    with open(fil, 'rb') as f, OPEN[ext](fil + ext, 'wb') as out:
+        out.write(f.read())
+    os.remove(fil)
+    return fil + ext
+
+
+@pytest.mark.parametrize('ext', ['.gz', '.bz2', '.xz'])
+def test_open_finds_compressed_variant(tmp_path, ext):
+    fil = str(tmp_path / 'tide')
+    write_rows(fil, [[1, d] + [0.5] * 12 + [2001, 'Galves'] for d in range(1, 4)])
+    with open(fil) as f:
+        text = f.read()
+    plain = tbt.read.tide(fil)
+    assert _compress(fil, ext) == fil + ext
+    assert tbt.read._find(fil) == fil + ext
+    assert tbt.read._exists(fil)
+    assert tbt.read._base(fil + ext) == fil
+    with tbt.read._open(fil) as f:
+        assert f.read() == text
+    with tbt.read._open_binary(fil) as f:
+        assert f.read() == text.encode()
+    pd.testing.assert_frame_equal(tbt.read.tide(fil), plain)
+
+
+@pytest.mark.parametrize('ext', ['.gz', '.bz2', '.xz'])
+def test_daily_blocks_from_compressed_file(tmp_path, ext):
+    fil = str(tmp_path / 'avesalD.w')
+    values = np.arange(5 * 9, dtype=np.float64).reshape(5, 9)
+    write_daily(fil, pd.Timestamp('2001-01-01').date(), values)
+    plain = tbt.read.avesalD(fil)
+    _compress(fil, ext)
+    pd.testing.assert_frame_equal(tbt.read.avesalD(fil), plain)
+    dates, days = tbt.read.read_days(fil, '2001-01-02', '2001-01-04')
+    assert np.array_equal(days, values[1:4])
+
+
+def test_missing_file_and_variants(tmp_path):
+    fil = str(tmp_path / 'tide')
+    assert not tbt.read._exists(fil)
+    with pytest.raises(IOError, match='compressed variant'):
+        tbt.read._open(fil)
@@ -0,0 +1,39 @@
+import os
+import tbtools as tbt
+
+MESH = '''header
+   NN   NE
+    4    2
+stuff
+ NODAL COORDINATES
+1 650000. 3100000.
+2 651000. 3100000.
+3 650000. 3101000.
+4 651000. 3101000.
+ ELEMENT CONNECTIVITY
+    1    1    2    3
+    2    2    4    3
+'''
+
+
+def write_input(fil, shift=0.):
+    with open(fil, 'w') as f:
+        f.write(MESH.replace('650000.', '{:.0f}.'.format(650000 + shift)))
+
+
+def test_coords_cache_is_bounded(tmp_path):
+    tbt.read._coords_values.cache_clear()
+    for i in range(tbt.read.COORDS_CACHE_SIZE + 5):
+        fil = str(tmp_path / 'input{}'.format(i))
+        write_input(fil)
+        tbt.read.coords(fil, 14, 'utm')
+    assert tbt.read._coords_values.cache_info().currsize == tbt.read.COORDS_CACHE_SIZE
+
+
+def test_coords_cache_follows_file_changes(tmp_path):
+    fil = str(tmp_path / 'input')
+    write_input(fil)
+    assert tbt.read.coords(fil, 14, 'utm').easting[1] == 650000
+    write_input(fil, 100)
+    os.utime(fil, (1, 1))
+    assert tbt.read.coords(fil, 14, 'utm').easting[1] == 650100
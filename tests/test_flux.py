@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import tbtools as tbt
+
+
+def flows():
+    index = pd.date_range('2001-01-01', '2002-12-31 23:00', freq=pd.Timedelta(hours=1), name='Date')
+    t = np.arange(len(index))
+    q = 100. * np.sin(2 * np.pi * t / 24.84) + 10.
+    return pd.DataFrame({'P1': q, 'P2': -q}, index=index)
+
+
+def test_partition_documented_frequencies():
+    f = {'base': flows(), 'slr': flows() * 2}
+    whole = tbt.flux.partition(f)
+    monthly = tbt.flux.partition(f, freq='M')['net_volume']
+    yearly = tbt.flux.partition(f, freq='Y')
+    assert len(monthly) == 24
+    assert monthly.index[0] == pd.Timestamp('2001-01-01')
+    assert len(yearly) == 2
+    assert np.allclose(yearly['net_volume'].sum().values, whole['net_volume'].values)
+    assert np.allclose(monthly.sum().values, whole['net_volume'].values)
+
+
+def test_partition_matches_daily_resample():
+    f = flows()
+    daily = tbt.flux.partition(f, freq='D')
+    q = f['P1'].clip(lower=0) * 3600.
+    assert np.allclose(daily['flood_volume']['P1'].values, q.resample('D').sum().values)
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _modules(code):
+    out = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT)
+    return set(out.decode().split())
+
+
+LAZY = ['tbtools.store', 'tbtools.spatial', 'tbtools.interp', 'tbtools.zones',
+        'tbtools.render', 'tbtools.serve', 'tbtools.aio', 'tbtools.ptrac.archive']
+
+
+def test_import_does_not_load_optional_heavy_modules():
+    loaded = _modules('import sys, tbtools; print(" ".join(sys.modules))')
+    #pandas may import pyarrow itself when it is installed
+    pandas = _modules('import sys, pandas; print(" ".join(sys.modules))')
+    for name in ['scipy', 'scipy.spatial', 'scipy.sparse', 'pyarrow', 'matplotlib',
+                 'http.server'] + LAZY:
+        assert name not in loaded - pandas
+
+
+def test_lazy_modules_load_on_first_use():
+    loaded = _modules('import sys, tbtools as tbt; tbt.render, tbt.serve, tbt.aio, '
+                      'tbt.store, tbt.spatial, tbt.interp, tbt.zones, tbt.dataset, '
+                      'tbt.ptrac.archive; print(" ".join(sys.modules))')
+    for name in LAZY:
+        assert name in loaded
@@ -0,0 +1,42 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip('scipy')
+from tbtools import interp
+
+
+def graded_mesh():
+    '''One large element next to a strip of 20 small ones along x = 1000'''
+    xy = [(0., 0.), (1000., 0.), (500., 1000.)]
+    tri = [(0, 1, 2)]
+    for j in range(11):
+        xy += [(1000., 2. * j), (1002., 2. * j)]
+    for j in range(10):
+        a = 3 + 2 * j
+        tri += [(a, a + 1, a + 3), (a, a + 3, a + 2)]
+    return np.array(xy), np.array(tri)
+
+
+def test_point_in_large_element_next_to_small_ones():
+    xy, tri = graded_mesh()
+    x = np.array([990., 1001., 2000.])
+    y = np.array([5., 7., 5.])
+    weights, inside = interp.barycentric(xy, tri, x, y)
+    assert list(inside) == [True, True, False]
+    field = xy[:, 0] + 2 * xy[:, 1]
+    values = interp.Interpolator(weights, inside)(field)
+    assert np.allclose(values[:2], x[:2] + 2 * y[:2])
+    assert np.isnan(values[2])
+
+
+def test_cache_file_without_npz_suffix_is_reused(tmp_path, monkeypatch):
+    from test_coords import write_input
+    fil = str(tmp_path / 'input')
+    write_input(fil)
+    cache = str(tmp_path / 'weights.cache')
+    first = interp.points(fil, [650400.], [3100200.], cache=cache)
+    assert sorted(os.listdir(str(tmp_path))) == ['input', 'weights.cache']
+    monkeypatch.setattr(interp, 'barycentric', None)
+    again = interp.points(fil, [650400.], [3100200.], cache=cache)
+    assert (again.weights != first.weights).nnz == 0
@@ -0,0 +1,100 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from tbtools import preflight, write
+from tbtools.__main__ import main
+
+INPUT = '  1,  1,2001, starting date of simulation\n 12, 31,2001, ending date of simulation\n'
+
+
+def _run(path):
+    path.mkdir()
+    (path / 'input').write_text(INPUT)
+    return path
+
+
+def test_single_run_directory_is_checked(tmp_path, capsys):
+    run = _run(tmp_path / 'runA')
+    assert main(['preflight', str(run)]) == 0
+    reports = json.loads(capsys.readouterr().out)
+    assert [r['path'] for r in reports] == [str(run)]
+    assert reports[0]['start'] == '2001-01-01'
+    assert reports[0]['end'] == '2001-12-31'
+
+
+def test_directory_of_runs_is_expanded(tmp_path):
+    _run(tmp_path / 'runA')
+    _run(tmp_path / 'runB')
+    reports = preflight.batch(str(tmp_path), workers=1)
+    assert [r['path'] for r in reports] == [str(tmp_path / 'runA'), str(tmp_path / 'runB')]
+
+
+def test_no_runs_is_an_error(tmp_path, capsys):
+    assert main(['preflight', str(tmp_path)]) != 0
+    assert 'No run directories' in capsys.readouterr().err
+
+
+def _tide(fil, dates, values=None):
+    dates = pd.DatetimeIndex(dates)
+    if values is None:
+        values = np.zeros((len(dates), 12))
+    with open(str(fil), 'w') as f:
+        write.tide_rows(f, dates, values, 'label')
+
+
+def _issues(report, check):
+    return [i for f in report['files'] for i in f['issues'] if i['check'] == check]
+
+
+def test_clean_tide_file_passes(tmp_path):
+    run = _run(tmp_path / 'run')
+    _tide(run / 'tide', pd.date_range('2001-01-01', '2001-12-31'))
+    report = preflight.check(str(run))
+    assert report['ok'], report
+    assert report['files'][0]['kind'] == 'tide'
+
+
+def test_overflowed_field_is_reported(tmp_path):
+    run = _run(tmp_path / 'run')
+    values = np.zeros((365, 12))
+    values[9, 4] = 1234.5
+    _tide(run / 'tide', pd.date_range('2001-01-01', '2001-12-31'), values)
+    lines = (run / 'tide').read_text().splitlines()
+    lines[19] = lines[19][:12] + '******' + lines[19][18:]
+    (run / 'tide').write_text('\n'.join(lines) + '\n')
+    report = preflight.check(str(run))
+    assert not report['ok']
+    assert [i['line'] for i in _issues(report, 'overflow')] == [10, 20]
+
+
+def test_date_gap_is_reported(tmp_path):
+    run = _run(tmp_path / 'run')
+    dates = pd.date_range('2001-01-01', '2001-12-31')
+    _tide(run / 'gensal', dates.delete(slice(40, 43)))
+    gaps = _issues(preflight.check(str(run)), 'gap')
+    assert len(gaps) == 1
+    assert gaps[0]['line'] == 41
+    assert gaps[0]['message'].startswith('3 days missing before 2001-02-13')
+
+
+def test_window_coverage_is_reported(tmp_path):
+    run = _run(tmp_path / 'run')
+    _tide(run / 'tide', pd.date_range('2001-01-01', '2001-06-30'))
+    coverage = _issues(preflight.check(str(run)), 'coverage')
+    assert len(coverage) == 1
+    assert 'does not cover the simulation window 2001-01-01 to 2001-12-31' in coverage[0]['message']
+
+
+def test_missing_days_of_a_month_are_reported(tmp_path):
+    run = _run(tmp_path / 'run')
+    with open(str(run / 'inflow'), 'w') as f:
+        for month, days in [(1, 31), (2, 27)]:
+            f.write('2001, {}, 1\n'.format(month))
+            values = ['{:6.1f}'.format(1.) for _ in range(days)]
+            for k, line in enumerate([values[:10], values[10:20], values[20:]]):
+                f.write('INFLOW      {}{}\n'.format(k + 1, ''.join(line)))
+    report = preflight.check(str(run))
+    days = _issues(report, 'days')
+    assert [i['message'] for i in days] == ['2001-02 has 27 values for 28 days']
@@ -0,0 +1,54 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import tbtools as tbt
+
+
+def write_pcp(fil, ws, months, value):
+    '''TxRR *.pcp rows: 31 days over 4 lines (last line ends with a flag)'''
+    with open(fil, 'w') as f:
+        for year, month in months:
+            v = ['{:8.2f}'.format(value)] * 31 + ['{:8.2f}'.format(99)]
+            f.write('1   {:>5s}{:4d}{:2d}  '.format(ws, year, month) + ''.join(v[0:8]) + '\n')
+            f.write('2' + ''.join(v[8:16]) + '\n')
+            f.write('3' + ''.join(v[16:24]) + '\n')
+            f.write('4' + ''.join(v[24:32]) + '\n')
+
+
+def test_pcp_many_processes(tmp_path):
+    a = str(tmp_path / 'a.pcp')
+    b = str(tmp_path / 'b.pcp')
+    write_pcp(a, 'W1', [(2001, 1), (2001, 2)], 1.)
+    write_pcp(b, 'W2', [(2001, 2), (2001, 3)], 2.)
+    serial = tbt.read.pcp_many([a, b], workers=1)
+    pooled = tbt.read.pcp_many(str(tmp_path / '*.pcp'), workers=2)
+    pd.testing.assert_frame_equal(serial, pooled)
+    assert list(pooled.columns) == ['W1_pcp', 'W2_pcp']
+    assert pooled.index[0] == pd.Timestamp('2001-01-01')
+    assert pooled.index[-1] == pd.Timestamp('2001-03-31')
+    assert pooled['W1_pcp'].notna().sum() == 31 + 28
+    assert np.isnan(pooled.loc['2001-01-15', 'W2_pcp'])
+
+
+def test_pcp_many_files_without_values(tmp_path):
+    for name in ['a.pcp', 'b.pcp']:
+        write_pcp(str(tmp_path / name), 'W1', [(2001, 1)], -9999.)
+    with pytest.raises(IOError, match='No values'):
+        tbt.read.pcp_many(str(tmp_path / '*.pcp'))
+
+
+def test_block_index_cache_is_bounded(daily):
+    tbt.read._block_index.cache_clear()
+    for i in range(tbt.read.BLOCK_INDEX_CACHE_SIZE + 3):
+        tbt.read.block_index(daily('avesalD{}.w'.format(i), np.ones((2, 3))))
+    assert tbt.read._block_index.cache_info().currsize == tbt.read.BLOCK_INDEX_CACHE_SIZE
+
+
+def test_block_index_follows_file_changes(daily):
+    fil = daily('avesalD.w', np.ones((2, 3)))
+    assert len(tbt.read.block_index(fil)[0]) == 2
+    daily('avesalD.w', np.ones((5, 3)))
+    os.utime(fil, (1, 1))
+    dates, values = tbt.read.read_days(fil)
+    assert len(dates) == 5 and values.shape == (5, 3)
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+import tbtools as tbt
+
+WIND_COLS = ['year', 'month', 'day', 'site', 'var'] + ['{:02d}'.format(i) for i in range(24)]
+TIDE_COLS = ['month', 'day'] + ['{:02d}'.format(i) for i in range(0, 24, 2)] + ['year', 'label']
+
+
+def _melt(df, id_vars, value_vars):
+    '''Decode daily rows the way the readers did before the reshape (pd.melt)'''
+    long = pd.melt(df, id_vars=id_vars, value_vars=value_vars, var_name='hour')
+    long['date'] = pd.to_datetime(dict(year=long['year'], month=long['month'],
+                                       day=long['day'], hour=long['hour'].astype(int)))
+    return long
+
+
+def melt_tide(fil):
+    df = pd.read_csv(fil, sep=r'\s+', names=TIDE_COLS)
+    tide = _melt(df, ['year', 'month', 'day'], TIDE_COLS[2:14]).set_index('date')
+    tide = tide[['value']].sort_index()
+    tide.columns = ['salinity']
+    return tide
+
+
+def melt_wind(df):
+    wind = _melt(df, ['year', 'month', 'day', 'site', 'var'], WIND_COLS[5:])
+    wind = wind.drop(columns=['year', 'month', 'day', 'hour', 'site']).pivot_table(
+        index=['date'], columns='var', values='value')
+    wind.columns = ['dir', 'spd']
+    wind['dir'] *= 10
+    return wind
+
+
+def write_rows(fil, rows):
+    with open(fil, 'w') as f:
+        for row in rows:
+            f.write(' '.join(str(v) for v in row) + '\n')
+
+
+def _assert_same(new, old):
+    pd.testing.assert_frame_equal(new, old, check_index_type=False, check_freq=False,
+                                  check_names=False, check_column_type=False)
+    assert (new.index == old.index).all()
+
+
+def test_tide_and_gensal_match_melt(tmp_path):
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2000-02-27', '2000-03-03').append(pd.date_range('2000-12-30', '2001-01-02'))
+    rows = [[d.month, d.day] + list(np.round(rng.uniform(-2, 2, 12), 2)) + [d.year, 'Galves']
+            for d in dates]
+    fil = str(tmp_path / 'tide')
+    write_rows(fil, rows)
+    _assert_same(tbt.read.tide(fil), melt_tide(fil))
+    _assert_same(tbt.read.gensal(fil), melt_tide(fil))
+
+
+def _wind_rows(site, dates, rng):
+    rows = []
+    for d in dates:
+        rows.append([d.year, d.month, d.day, site, 1] + list(rng.integers(0, 36, 24)))
+        rows.append([d.year, d.month, d.day, site, 2] + list(np.round(rng.uniform(0, 30, 24), 1)))
+    return rows
+
+
+def test_single_site_wind_matches_melt(tmp_path):
+    rng = np.random.default_rng(1)
+    fil = str(tmp_path / 'wind')
+    write_rows(fil, _wind_rows(101, pd.date_range('2004-02-27', '2004-03-02'), rng))
+    df = pd.read_csv(fil, sep=r'\s+', names=WIND_COLS)
+    _assert_same(tbt.read.wind(fil), melt_wind(df))
+
+
+def test_multi_site_wind_matches_melt_per_site(tmp_path):
+    rng = np.random.default_rng(2)
+    dates = pd.date_range('2004-12-30', '2005-01-02')
+    fil = str(tmp_path / 'wind')
+    write_rows(fil, _wind_rows(101, dates, rng) + _wind_rows(202, dates, rng))
+    df = pd.read_csv(fil, sep=r'\s+', names=WIND_COLS)
+    wind = tbt.read.wind(fil)
+    assert list(wind.columns) == [(101, 'dir'), (101, 'spd'), (202, 'dir'), (202, 'spd')]
+    for site in [101, 202]:
+        _assert_same(wind[site], melt_wind(df[df['site'] == site]))
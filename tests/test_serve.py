@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+from tbtools import serve
+
+
+def test_symlinked_runs_are_served(tmp_path):
+    root = tmp_path / 'runs'
+    root.mkdir()
+    (root / 'base').mkdir()
+    (tmp_path / 'elsewhere').mkdir()
+    os.symlink(str(tmp_path / 'elsewhere'), str(root / 'linked'))
+    server = serve.Server(str(root))
+    assert server.runs() == ['base', 'linked']
+    for run in server.runs():
+        assert server._run_path(run) == os.path.join(server.root, run)
+
+
+@pytest.mark.parametrize('run', ['..', '.', '../runs/base', 'base/..', '/etc', 'missing'])
+def test_names_outside_root_are_refused(tmp_path, run):
+    (tmp_path / 'base').mkdir()
+    with pytest.raises(KeyError):
+        serve.Server(str(tmp_path))._run_path(run)
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import tbtools as tbt
+
+VALUES = np.arange(4 * 11, dtype=np.float64).reshape(4, 11) / 7.
+
+
+@pytest.mark.parametrize('compact', [False, True])
+@pytest.mark.parametrize('mmap', [False, True])
+def test_load_run_matches_read(tmp_path, daily, compact, mmap):
+    fil = daily('avesalD.w', VALUES)
+    handles = tbt.shared.load_run(str(tmp_path), compact=compact,
+                                  mmap_dir=str(tmp_path) if mmap else None)
+    assert list(handles) == ['avesalD']
+    try:
+        sal = tbt.shared.attach(handles['avesalD'])
+        expected = tbt.read._daily(fil, compact)
+        pd.testing.assert_frame_equal(sal, expected, check_freq=False, check_index_type=False)
+    finally:
+        del sal
+        tbt.shared.release(handles['avesalD'])
+
+
+def test_load_run_does_not_read_whole_file(tmp_path, daily, monkeypatch):
+    daily('avesalD.w', VALUES)
+    monkeypatch.setattr(tbt.read, '_daily', None)
+    handles = tbt.shared.load_run(str(tmp_path))
+    try:
+        assert np.allclose(tbt.shared.attach(handles['avesalD']).values, np.round(VALUES, 4))
+    finally:
+        tbt.shared.release_all()
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tbtools import skill
+
+TIMES = pd.date_range('2010-01-01', periods=200, freq='h')
+SIGNAL = np.sin(2 * np.pi * np.arange(200) / 25.)
+
+
+def _model(values):
+    return {'base': pd.DataFrame({'10505': values}, index=TIMES)}
+
+
+def test_score_finds_known_lag_and_bias():
+    #the model runs 3 hours behind the observations and 0.5 too high
+    model = np.full(200, np.nan)
+    model[3:] = SIGNAL[:-3] + 0.5
+    obs = {'MIDG': pd.DataFrame({'Salinity': SIGNAL}, index=TIMES)}
+    s = skill.score(_model(model), obs, [('10505', 'MIDG')], 'salinity')
+    row = s.loc[('base', '10505', 'MIDG')]
+    assert row['n'] == 197
+    assert row['bias'] == pytest.approx(0.5 + SIGNAL[:-3].mean() - SIGNAL[3:].mean())
+    assert row['lag'] == 3
+    assert row['lag_corr'] == pytest.approx(1.)
+
+
+def test_extfd_style_observations():
+    #read.extfd frames keep the date as a column, 'S' returns (frame, header)
+    frame = pd.DataFrame({'Date': TIMES[::2], 'Station': 'MIDG', 'Salinity': SIGNAL[::2]})
+    times, M, O = skill.align(_model(SIGNAL), {'MIDG': (frame, [])}, [('10505', 'MIDG')],
+                              tolerance='0min')
+    assert np.allclose(O[0, ::2], SIGNAL[::2])
+    assert np.isnan(O[0, 1::2]).all()
+
+
+def test_missing_observation_column():
+    obs = {'MIDG': pd.DataFrame({'tide_mm': SIGNAL}, index=TIMES)}
+    with pytest.raises(KeyError, match='salinity'):
+        skill.score(_model(SIGNAL), obs, [('10505', 'MIDG')])
+    obs = {'MIDG': pd.Series(SIGNAL)}
+    with pytest.raises(ValueError, match='datetime'):
+        skill.score(_model(SIGNAL), obs, [('10505', 'MIDG')])
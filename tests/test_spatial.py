@@ -0,0 +1,29 @@
+import os
+import pickle
+import numpy as np
+import pytest
+import tbtools as tbt
+from test_coords import write_input
+
+pytest.importorskip('scipy')
+
+
+def test_node_index_persists_without_pickle(tmp_path):
+    write_input(str(tmp_path / 'input'))
+    idx = tbt.spatial.node_index(str(tmp_path))
+    saved = str(tmp_path / tbt.spatial.INDEX_FILE)
+    assert os.path.exists(saved)
+    with np.load(saved, allow_pickle=False) as z:
+        assert z['nodes'].tolist() == [1, 2, 3, 4]
+    again = tbt.spatial.node_index(str(tmp_path))
+    nodes, dist = again.nearest([650990.], [3100990.])
+    assert nodes.tolist() == idx.nearest([650990.], [3100990.])[0].tolist() == [4]
+
+
+def test_pickled_index_is_not_loaded(tmp_path):
+    write_input(str(tmp_path / 'input'))
+    saved = str(tmp_path / tbt.spatial.INDEX_FILE)
+    with open(saved, 'wb') as f:
+        pickle.dump({'key': None}, f)
+    assert tbt.spatial.load(saved) is None
+    assert tbt.spatial.node_index(str(tmp_path)).nearest([650000.], [3100000.])[0].tolist() == [1]
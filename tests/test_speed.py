@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+import tbtools as tbt
+
+
+def test_speed_pairs_blocks(daily):
+    vx = daily('velx', [[3., 0.], [0., 1.]])
+    vy = daily('vely', [[4., 0.], [2., 0.]])
+    speed = [s.tolist() for d, s in tbt.read._speed(vx, vy)]
+    assert speed == [[5., 0.], [2., 1.]]
+
+
+def test_speed_raises_on_different_lengths(daily):
+    vx = daily('velx', np.ones((3, 2)))
+    vy = daily('vely', np.ones((2, 2)))
+    with pytest.raises(ValueError):
+        list(tbt.read._speed(vx, vy))
+    with pytest.raises(ValueError):
+        list(tbt.read._speed(vy, vx))
+
+
+def test_speed_raises_on_different_nodes(daily):
+    vx = daily('velx', np.ones((2, 3)))
+    vy = daily('vely', np.ones((2, 2)))
+    with pytest.raises(ValueError):
+        list(tbt.read._speed(vx, vy))
@@ -0,0 +1,41 @@
+import warnings
+import numpy as np
+import pytest
+import tbtools as tbt
+
+
+def test_percentile_matches_numpy(daily):
+    rng = np.random.default_rng(0)
+    values = rng.uniform(5, 30, (365, 3))
+    clim = tbt.stats.climatology(daily('avesalD.w', values), by='all')
+    p = clim.percentile(50).values[0]
+    assert np.allclose(p, np.percentile(values, 50, axis=0), atol=0.25)
+
+
+def test_velocity_needs_bins(daily):
+    fil = daily('velx', np.zeros((3, 2)))
+    with pytest.raises(ValueError):
+        tbt.stats.climatology(fil)
+
+
+def test_values_outside_bins_are_not_clamped(daily):
+    rng = np.random.default_rng(1)
+    values = rng.normal(0, 2, (400, 2))
+    clim = tbt.stats.climatology(daily('velx', values), bins=np.linspace(0, 5, 51), by='all')
+    assert clim.under.sum() == (values < 0).sum()
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        p10 = clim.percentile(10)
+    assert np.isnan(p10.values).all()
+    assert w
+    wide = tbt.stats.climatology(daily('vely', values), bins=np.linspace(-10, 10, 401), by='all')
+    assert np.allclose(wide.percentile(10).values[0], np.percentile(values, 10, axis=0), atol=0.1)
+
+
+def test_merge_counts_outside(daily):
+    values = np.array([[-1., 1.], [2., 9.]])
+    bins = np.linspace(0, 5, 6)
+    a = tbt.stats.climatology(daily('velx', values[:1]), bins=bins, by='all')
+    b = tbt.stats.climatology(daily('vely', values[1:]), bins=bins, by='all')
+    m = tbt.stats.combine([a, b])
+    assert m.under.tolist() == [[1, 0]] and m.over.tolist() == [[0, 1]]
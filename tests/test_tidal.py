@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tbtools import tidal
+
+CONST = {'M2': (0.45, 230.1), 'S2': (0.12, 80.), 'K1': (0.38, 312.5), 'O1': (0.36, 302.0)}
+
+
+def _record(const, start, end, datum=0.):
+    times, values = zip(*tidal.synthesize(const, start, end, datum=datum, step=1))
+    return pd.DataFrame({'gauge': np.concatenate(values)},
+                        index=pd.DatetimeIndex(np.concatenate(times)))
+
+
+def test_greenwich_recovers_synthesized_constants():
+    df = _record(CONST, '2010-01-01', '2010-03-31', datum=1.5)
+    g = tidal.greenwich(tidal.harmonic(df, list(CONST)))
+    for c, (amp, pha) in CONST.items():
+        assert abs(g.loc[c, 'amplitude'] - amp) < 0.01
+        assert abs((g.loc[c, 'phase'] - pha + 180) % 360 - 180) < 2.
+
+
+def test_synthesize_accepts_harmonic_output():
+    df = _record(CONST, '2010-01-01', '2010-03-31', datum=1.5)
+    const = tidal.harmonic(df, list(CONST))
+    again = _record(const, '2010-04-01', '2010-04-30',
+                    datum=const.loc['Z0', ('gauge', 'amplitude')])
+    truth = _record(CONST, '2010-04-01', '2010-04-30', datum=1.5)
+    assert np.abs(again.values - truth.values).max() < 0.02
+
+
+def test_month_record_drops_unresolvable_constituents():
+    const = dict(CONST, K2=(0.03, 90.), P1=(0.12, 310.))
+    df = _record(const, '2010-01-01', '2010-01-30')
+    with pytest.warns(UserWarning, match='K2, P1'):
+        fit = tidal.harmonic(df)
+    assert list(fit.index) == ['Z0'] + [c for c in tidal.DEFAULT if c not in ['K2', 'P1']]
+    assert tidal.resolvable(pd.date_range('2010-01-01', '2010-07-03', freq='h')) == tidal.DEFAULT
+    #the resolved constituents are not disturbed by an arbitrary S2/K2 split
+    assert abs(fit.loc['M2', ('gauge', 'amplitude')] - 0.45) < 0.02
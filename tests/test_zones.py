@@ -0,0 +1,51 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip('scipy')
+from tbtools import zones
+from test_coords import write_input
+
+#nodes 1-4 of test_coords.MESH: element 1 is (1, 2, 3), element 2 is (2, 4, 3)
+LOWER = [(649000., 3099000.), (652000., 3099000.), (649000., 3101500.)]
+
+
+def test_cache_file_without_npz_suffix_is_reused(tmp_path, monkeypatch):
+    fil = str(tmp_path / 'input')
+    write_input(fil)
+    cache = str(tmp_path / 'zones.cache')
+    first = zones.operator(fil, {'lower': LOWER}, cache)
+    assert sorted(os.listdir(str(tmp_path))) == ['input', 'zones.cache']
+    monkeypatch.setattr(zones, 'weights', None)
+    again = zones.operator(fil, {'lower': LOWER}, cache)
+    assert again.names == ['lower']
+    assert np.allclose(again.weights.toarray(), first.weights.toarray())
+
+
+def write_graded(fil):
+    '''test_coords.MESH with node 4 moved so element 2 is three times element 1'''
+    write_input(fil)
+    with open(fil) as f:
+        text = f.read()
+    with open(fil, 'w') as f:
+        f.write(text.replace('4 651000. 3101000.', '4 653000. 3101000.'))
+
+
+def test_zone_means_are_area_weighted(tmp_path, daily):
+    fil = str(tmp_path / 'input')
+    write_graded(fil)
+    box = [(640000., 3090000.), (660000., 3090000.), (660000., 3110000.), (640000., 3110000.)]
+    op = zones.operator(fil, {'all': box, 'lower': LOWER,
+                              'none': [(0., 0.), (1., 0.), (0., 1.)]})
+    #element 1 (nodes 1, 2, 3) has area 0.5 km2 and element 2 (nodes 2, 4, 3)
+    #1.5 km2, each element's area is split equally between its corners
+    assert np.allclose(op.area, [2e6, 0.5e6, 0.])
+    nodes = np.array([1., 2., 3., 10.])
+    expected = [(0.5 * (1 + 2 + 3) + 1.5 * (2 + 10 + 3)) / 3 / 2., (1 + 2 + 3) / 3.]
+    means = op(nodes)
+    assert np.allclose(means[['all', 'lower']].values, expected)
+    assert np.isnan(means['none'])
+    series = op.series(daily('avesalD.w', [nodes, 2 * nodes]))
+    assert np.allclose(series[['all', 'lower']].values, [expected, 2 * np.array(expected)])
+    speed = op.series(daily('velx', [3 * nodes]), daily('vely', [4 * nodes]))
+    assert np.allclose(speed[['all', 'lower']].values, [5 * np.array(expected)])